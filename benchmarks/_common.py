@@ -0,0 +1,48 @@
+"""Shared helpers for the offline benchmarks."""
+
+import os
+import random
+import statistics
+import sys
+from typing import Any, Dict, List
+
+# Benchmarks run from a source checkout, like test_mens_warehouse.py.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), "src"))
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    """Return p50/p90/p99/max of ``samples`` in milliseconds."""
+    if not samples:
+        return {"p50": 0.0, "p90": 0.0, "p99": 0.0, "max": 0.0}
+    ordered = sorted(samples)
+
+    def pick(q: float) -> float:
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+
+    return {
+        "p50": statistics.median(ordered) * 1000,
+        "p90": pick(0.90),
+        "p99": pick(0.99),
+        "max": ordered[-1] * 1000,
+    }
+
+
+def format_row(label: str, stats: Dict[str, float], extra: str = "") -> str:
+    """Format one result line for console output."""
+    cols = "  ".join(f"{key}={value:8.2f}ms" for key, value in stats.items())
+    return f"{label:<28} {cols}  {extra}".rstrip()
+
+
+def make_hints(templates: List[Dict[str, Any]], count: int, seed: int = 1) -> List[str]:
+    """Misspelled, reordered and truncated fragments of real template names."""
+    rng = random.Random(seed)
+    hints = []
+    for _ in range(count):
+        words = rng.choice(templates)["name"].lower().split()
+        rng.shuffle(words)
+        hint = " ".join(words[: rng.randint(1, len(words))])
+        if len(hint) > 4 and rng.random() < 0.5:
+            i = rng.randrange(len(hint))
+            hint = hint[:i] + hint[i + 1:]
+        hints.append(hint)
+    return hints
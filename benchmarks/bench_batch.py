@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""Batch meme generation throughput versus concurrency limit.
+
+Drives ImgflipClient.generate_memes_batch against a local stub of
+``/caption_image`` with simulated upstream latency. The result cache and the
+upstream rate limit are disabled so every meme costs one upstream call and
+only the concurrency limit bounds throughput.
+"""
+
+import argparse
+import asyncio
+import time
+
+import _common  # noqa: F401  (adds src/ to sys.path)
+from fake_imgflip import fake_imgflip_process
+
+from imgflip_meme_mcp.flow_control import FlowController
+from imgflip_meme_mcp.imgflip_client import ImgflipClient
+from imgflip_meme_mcp.result_cache import MemeResultCache
+from imgflip_meme_mcp.transport import HttpTransport
+
+
+async def main(args: argparse.Namespace) -> None:
+    with fake_imgflip_process(latency=args.latency) as url:
+        client = ImgflipClient(
+            base_url=url,
+            transport=HttpTransport(url),
+            result_cache=MemeResultCache(max_size=0),
+            flow=FlowController(rate=0, max_concurrency=64),
+        )
+        client.username, client.password = "bench", "bench"
+        print(f"{args.memes} memes/batch, {args.latency * 1000:.0f}ms upstream latency")
+
+        for concurrency in args.concurrency:
+            batch = [
+                {"template_id": "100000", "top_text": f"meme {i}"}
+                for i in range(args.memes)
+            ]
+            start = time.perf_counter()
+            results = await client.generate_memes_batch(batch, concurrency)
+            elapsed = time.perf_counter() - start
+            failed = sum(not result.get("success") for result in results)
+            print(
+                f"concurrency={concurrency:<4} {args.memes / elapsed:8.1f} memes/s"
+                f"  batch={elapsed * 1000:8.1f}ms  failed={failed}"
+            )
+        await client.aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--memes", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument(
+        "--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32]
+    )
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""Caption latency during a simulated Imgflip outage, with and without breaker.
+
+The fake API answers every request with a 500 after ``--latency`` seconds.
+Each scenario sends waves of caption requests and reports their latency and
+how many reached the server. The breaker scenario then heals the server and
+reports how long the circuit takes to close again.
+"""
+
+import argparse
+import asyncio
+import time
+from typing import List
+
+import _common  # noqa: F401  (adds src/ to sys.path)
+from _common import format_row, percentiles
+from fake_imgflip import FakeImgflipServer
+
+from imgflip_meme_mcp.circuit_breaker import CLOSED, CircuitBreaker
+from imgflip_meme_mcp.flow_control import FlowController
+from imgflip_meme_mcp.imgflip_client import ImgflipClient
+from imgflip_meme_mcp.result_cache import MemeResultCache
+from imgflip_meme_mcp.transport import HttpTransport
+
+
+async def outage(
+    label: str, args: argparse.Namespace, breaker: CircuitBreaker
+) -> None:
+    async with FakeImgflipServer(latency=args.latency, error_rate=1.0) as server:
+        client = ImgflipClient(
+            base_url=server.url,
+            transport=HttpTransport(server.url),
+            result_cache=MemeResultCache(max_size=0),
+            flow=FlowController(rate=0, max_concurrency=64),
+            breaker=breaker,
+        )
+        client.username, client.password = "bench", "bench"
+        samples: List[float] = []
+
+        async def one(i: int) -> None:
+            start = time.perf_counter()
+            await client.generate_meme("100000", f"{label} {i}")
+            samples.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for wave in range(args.waves):
+            await asyncio.gather(
+                *(one(wave * args.concurrency + i) for i in range(args.concurrency))
+            )
+        elapsed = time.perf_counter() - start
+        print(format_row(
+            label, percentiles(samples),
+            f"upstream={server.request_count}/{len(samples)} {elapsed:.1f}s",
+        ))
+
+        if breaker.enabled:
+            server.error_rate = 0.0
+            server.latency = 0.0
+            healed = time.perf_counter()
+            while breaker.state != CLOSED:
+                await client.generate_meme("100000", f"probe {time.perf_counter()}")
+                await asyncio.sleep(0.01)
+            print(f"{'':<28} closed again {time.perf_counter() - healed:.2f}s "
+                  f"after recovery; {breaker.stats()}")
+        await client.aclose()
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--waves", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--recovery", type=float, default=1.0)
+    args = parser.parse_args()
+
+    await outage("no breaker", args, CircuitBreaker(failure_threshold=0))
+    await outage(
+        "breaker",
+        args,
+        CircuitBreaker("fake", failure_threshold=5, recovery_time=args.recovery),
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
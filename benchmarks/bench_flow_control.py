@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""Rate limiting, Retry-After handling and priorities against a throttling stub.
+
+The fake API answers 429 with a Retry-After header once callers exceed
+``--max-rps``. Each scenario fires a burst of caption requests and reports
+successes, 429s seen by the server, latency percentiles, and how long
+interactive calls wait while a large batch is queued.
+"""
+
+import argparse
+import asyncio
+import time
+from typing import List
+
+import _common  # noqa: F401  (adds src/ to sys.path)
+from _common import format_row, percentiles
+from fake_imgflip import FakeImgflipServer
+
+from imgflip_meme_mcp.flow_control import BATCH, INTERACTIVE, FlowController
+from imgflip_meme_mcp.imgflip_client import ImgflipClient
+from imgflip_meme_mcp.result_cache import MemeResultCache
+from imgflip_meme_mcp.transport import HttpTransport
+
+
+def make_client(url: str, flow: FlowController) -> ImgflipClient:
+    client = ImgflipClient(
+        base_url=url,
+        transport=HttpTransport(url),
+        result_cache=MemeResultCache(max_size=0),
+        flow=flow,
+    )
+    client.username, client.password = "bench", "bench"
+    return client
+
+
+async def burst(label: str, args: argparse.Namespace, flow: FlowController) -> None:
+    async with FakeImgflipServer(
+        latency=args.latency, max_rps=args.max_rps, retry_after=args.retry_after
+    ) as server:
+        client = make_client(server.url, flow)
+        batch_samples: List[float] = []
+        interactive_samples: List[float] = []
+
+        async def one(i: int, priority: int, samples: List[float]) -> bool:
+            start = time.perf_counter()
+            result = await client.generate_meme(
+                "100000", f"{label} {i}", priority=priority
+            )
+            samples.append(time.perf_counter() - start)
+            return bool(result.get("success"))
+
+        async def interactive_trickle() -> List[bool]:
+            results = []
+            for i in range(args.interactive):
+                await asyncio.sleep(0.05)
+                results.append(await one(i, INTERACTIVE, interactive_samples))
+            return results
+
+        start = time.perf_counter()
+        batch = asyncio.gather(
+            *(one(i, BATCH, batch_samples) for i in range(args.requests))
+        )
+        results, interactive = await asyncio.gather(batch, interactive_trickle())
+        elapsed = time.perf_counter() - start
+        ok = sum(results) + sum(interactive)
+        total = args.requests + args.interactive
+        print(format_row(
+            f"{label} batch",
+            percentiles(batch_samples),
+            f"ok={ok}/{total} 429s={server.throttled_count} {elapsed:.1f}s",
+        ))
+        print(format_row(f"{label} interactive", percentiles(interactive_samples)))
+        await client.aclose()
+
+
+async def main(args: argparse.Namespace) -> None:
+    unlimited = FlowController(rate=0, max_concurrency=10_000, max_retries=args.retries)
+    limited = FlowController(
+        rate=args.max_rps * 0.9, burst=args.max_rps * 0.5,
+        max_concurrency=64, max_retries=args.retries,
+    )
+    await burst("no-limiter", args, unlimited)
+    await burst("limiter", args, limited)
+    print(f"limiter stats: {limited.stats()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--interactive", type=int, default=20)
+    parser.add_argument("--max-rps", type=float, default=100.0)
+    parser.add_argument("--retry-after", type=float, default=0.5)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--retries", type=int, default=3)
+    asyncio.run(main(parser.parse_args()))
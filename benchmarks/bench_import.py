@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""Import time of the server module and latency of the stdio handshake.
+
+Runs ``python -X importtime`` on ``imgflip_meme_mcp.server`` in fresh
+interpreters and splits the total into what the MCP SDK costs on its own and
+what this package adds on top, comparing the lazy server with importing the
+client and matcher stack eagerly as it used to. Then spawns the stdio server
+and times ``initialize`` plus ``tools/list``, which is what every per-session
+stdio spawn pays before it can answer. Exits non-zero when the package's own
+import time exceeds ``--budget-ms`` or the server import loads a module that
+should only load on the first tool call.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, Set, Tuple
+
+import _common
+from _common import format_row, percentiles
+
+SRC = os.path.abspath(os.path.join(os.path.dirname(_common.__file__), "..", "src"))
+
+SDK = "import mcp.server, mcp.server.stdio, mcp.types, pydantic"
+LAZY = "import imgflip_meme_mcp.server"
+EAGER = "import imgflip_meme_mcp.server, imgflip_meme_mcp.template_matcher"
+
+# Modules the handshake must not need; they load with the first tool call.
+DEFERRED = (
+    "imgflip_meme_mcp.imgflip_client",
+    "imgflip_meme_mcp.template_matcher",
+    "imgflip_meme_mcp.transport",
+    "imgflip_meme_mcp.shared_cache",
+    "imgflip_meme_mcp.offload",
+    "sqlite3",
+    "multiprocessing",
+    "numpy",
+    "yaml",
+)
+
+
+def _env() -> Dict[str, str]:
+    return dict(
+        os.environ,
+        PYTHONPATH=SRC,
+        IMGFLIP_CACHE_DIR="",
+        IMGFLIP_API_URL="http://127.0.0.1:9",
+        IMGFLIP_LOOP_LAG_INTERVAL="0",
+    )
+
+
+def import_times(code: str) -> Dict[str, Tuple[int, int]]:
+    """Self and cumulative microseconds per module imported by ``code``."""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        env=_env(), capture_output=True, text=True, check=True,
+    ).stderr
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = (int(own), int(cumulative))
+    return times
+
+
+def measure_imports(
+    label: str, code: str, sdk: Set[str], runs: int, budget: float
+) -> bool:
+    """Print one row for ``code``; returns False if over budget."""
+    totals, own = [], []
+    added: Dict[str, int] = {}
+    for _ in range(runs):
+        times = import_times(code)
+        totals.append(sum(t[0] for t in times.values()) / 1e6)
+        extra = {name: t[0] for name, t in times.items() if name not in sdk}
+        own.append(sum(extra.values()) / 1e6)
+        for name, us in extra.items():
+            added[name] = added.get(name, 0) + us
+    own_ms = percentiles(own)["p50"]
+    print(format_row(label, percentiles(totals), f"own={own_ms:.1f}ms"))
+    heaviest = sorted(added.items(), key=lambda item: item[1], reverse=True)[:5]
+    print("    heaviest own: " + ", ".join(
+        f"{name} {us / runs / 1000:.1f}ms" for name, us in heaviest
+    ))
+    return own_ms <= budget
+
+
+def handshake() -> float:
+    """Spawn the stdio server; seconds until ``tools/list`` is answered."""
+    messages = [
+        {"jsonrpc": "2.0", "id": 1, "method": "initialize", "params": {
+            "protocolVersion": "2024-11-05",
+            "capabilities": {},
+            "clientInfo": {"name": "bench_import", "version": "0"},
+        }},
+        {"jsonrpc": "2.0", "method": "notifications/initialized"},
+        {"jsonrpc": "2.0", "id": 2, "method": "tools/list"},
+    ]
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "imgflip_meme_mcp.server"],
+        env=_env(), stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL, text=True,
+    )
+    try:
+        for message in messages:
+            process.stdin.write(json.dumps(message) + "\n")
+        process.stdin.flush()
+        while True:
+            line = process.stdout.readline()
+            if not line:
+                raise RuntimeError("server exited before answering tools/list")
+            response = json.loads(line)
+            if response.get("id") == 2:
+                elapsed = time.perf_counter() - start
+                if len(response["result"]["tools"]) < 4:
+                    raise RuntimeError(f"unexpected tools/list answer: {line}")
+                return elapsed
+    finally:
+        process.stdin.close()
+        process.wait(timeout=10)
+
+
+def main(args: argparse.Namespace) -> None:
+    sdk = set(import_times(SDK))
+    lazy = import_times(LAZY)
+    loaded = [name for name in DEFERRED if name in lazy and name not in sdk]
+
+    within = measure_imports("import server", LAZY, sdk, args.runs, args.budget_ms)
+    measure_imports("import server + matcher", EAGER, sdk, args.runs, float("inf"))
+    print(format_row(
+        "spawn to tools/list", percentiles([handshake() for _ in range(args.runs)])
+    ))
+
+    failures = []
+    if loaded:
+        failures.append("server import loads " + ", ".join(loaded))
+    if not within:
+        failures.append(f"own import time over the {args.budget_ms:.0f}ms budget")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument(
+        "--budget-ms",
+        type=float,
+        default=30.0,
+        # Measured at 9-15ms; the rest is headroom for slow or busy machines.
+        help="maximum import time of this package on top of the MCP SDK",
+    )
+    main(parser.parse_args())
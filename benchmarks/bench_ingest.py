@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""Ingestion time and memory of large template dumps.
+
+Writes a synthetic catalog as JSON, JSON Lines and CSV, then for each file
+measures the time to stream it into a CatalogBuilder and the peak memory
+while doing so, compared with ``json.load`` into a list of dicts. Also
+reports the memory the loaded catalog keeps: slotted TemplateRecords versus
+the dicts they replace.
+"""
+
+import argparse
+import csv
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Tuple
+
+import _common  # noqa: F401  (adds src/ to sys.path)
+from fake_imgflip import synthetic_templates
+
+from imgflip_meme_mcp.ingest import CatalogBuilder
+
+
+def measure(load: Callable[[], Any]) -> Tuple[Any, float, float, float]:
+    """Run ``load``; returns its result, seconds, peak MB and retained MB.
+
+    Timing and memory come from separate runs, as tracing slows parsing.
+    """
+    start = time.perf_counter()
+    load()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    result = load()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak / 2**20, retained / 2**20
+
+
+def write_dumps(directory: str, size: int) -> Tuple[str, str, str]:
+    templates = synthetic_templates(size)
+    json_path = os.path.join(directory, "templates.json")
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump(templates, f)
+    jsonl_path = os.path.join(directory, "templates.jsonl")
+    with open(jsonl_path, "w", encoding="utf-8") as f:
+        for template in templates:
+            f.write(json.dumps(template) + "\n")
+    csv_path = os.path.join(directory, "templates.csv")
+    with open(csv_path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(templates[0]))
+        writer.writeheader()
+        writer.writerows(templates)
+    return json_path, jsonl_path, csv_path
+
+
+def main(args: argparse.Namespace) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        json_path, jsonl_path, csv_path = write_dumps(directory, args.size)
+        print(f"{args.size} templates, JSON dump "
+              f"{os.path.getsize(json_path) / 2**20:.1f} MB")
+
+        def load_dicts() -> Any:
+            with open(json_path, encoding="utf-8") as f:
+                return json.load(f)
+
+        rows = [("json.load dicts", load_dicts)]
+        for label, path in (
+            ("stream JSON", json_path),
+            ("stream JSON Lines", jsonl_path),
+            ("stream CSV", csv_path),
+        ):
+            def load(path: str = path) -> Any:
+                builder = CatalogBuilder()
+                builder.add_file(path)
+                return builder.templates
+
+            rows.append((label, load))
+
+        for label, load in rows:
+            result, elapsed, peak, retained = measure(load)
+            assert len(result) == args.size
+            print(f"{label:<20} {elapsed:6.2f}s  peak={peak:7.1f} MB  "
+                  f"retained={retained:7.1f} MB")
+            del result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=100_000)
+    main(parser.parse_args())
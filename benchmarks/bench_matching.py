@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""Per-hint latency of TemplateMatcher.find_best_match on synthetic catalogs.
+
+Compares the candidate-pruned fuzzy engine with the previous full scan that
+scored every template with SequenceMatcher, and counts hints where the two
+disagree on the top match's score.
+"""
+
+import argparse
+import asyncio
+import re
+import time
+from difflib import SequenceMatcher
+from typing import Any, Dict, List, Optional
+
+import _common  # noqa: F401  (adds src/ to sys.path)
+from _common import format_row, make_hints, percentiles
+from fake_imgflip import synthetic_templates
+
+from imgflip_meme_mcp.alias_registry import AliasRegistry
+from imgflip_meme_mcp.catalog import TemplateCatalog
+from imgflip_meme_mcp.imgflip_client import ImgflipClient
+from imgflip_meme_mcp.snapshot import CatalogSnapshot
+from imgflip_meme_mcp.template_matcher import TemplateMatcher
+
+
+def legacy_similarity(hint: str, template_name: str) -> float:
+    """The scorer find_best_match used before candidate pruning."""
+    if hint in template_name or template_name in hint:
+        return 0.9
+    sequence_score = SequenceMatcher(None, hint, template_name).ratio()
+    hint_words = set(re.findall(r"\w+", hint.lower()))
+    template_words = set(re.findall(r"\w+", template_name.lower()))
+    if hint_words and template_words:
+        word_score = len(hint_words & template_words) / len(hint_words | template_words)
+    else:
+        word_score = 0.0
+    return 0.6 * sequence_score + 0.4 * word_score
+
+
+def legacy_best_match(
+    hint: str, templates: List[Dict[str, Any]]
+) -> Optional[Dict[str, Any]]:
+    """Full-scan fallback of the previous find_best_match."""
+    best_match, best_score = None, 0.0
+    for template in templates:
+        score = legacy_similarity(hint, template["name"].lower())
+        if score > best_score and score > 0.3:
+            best_score, best_match = score, template
+    return best_match
+
+
+async def bench_size(size: int, hint_count: int, legacy_hints: int) -> None:
+    templates = synthetic_templates(size)
+
+    async def fetch(current: Optional[CatalogSnapshot]) -> CatalogSnapshot:
+        return CatalogSnapshot(templates)
+
+    start = time.perf_counter()
+    client = ImgflipClient(catalog=TemplateCatalog(fetch))
+    await client.catalog.get()
+    build = time.perf_counter() - start
+    matcher = TemplateMatcher(client, alias_registry=AliasRegistry([]))
+    hints = make_hints(templates, hint_count)
+
+    samples = []
+    results = []
+    for hint in hints:
+        start = time.perf_counter()
+        results.append(await matcher.find_best_match(hint))
+        samples.append(time.perf_counter() - start)
+    print(format_row(f"pruned n={size}", percentiles(samples), f"index={build:.2f}s"))
+
+    legacy_samples = []
+    worse = 0
+    for hint, result in list(zip(hints, results))[:legacy_hints]:
+        start = time.perf_counter()
+        expected = legacy_best_match(hint.lower().strip(), templates)
+        legacy_samples.append(time.perf_counter() - start)
+        got = legacy_similarity(hint, result["name"].lower()) if result else 0.0
+        want = legacy_similarity(hint, expected["name"].lower()) if expected else 0.0
+        worse += got < want
+    print(format_row(
+        f"full-scan n={size}",
+        percentiles(legacy_samples),
+        f"worse={worse}/{len(legacy_samples)}",
+    ))
+
+
+async def main(args: argparse.Namespace) -> None:
+    for size in args.sizes:
+        legacy_hints = max(3, min(args.hints, 2_000_000 // (size * 10)))
+        await bench_size(size, args.hints, legacy_hints)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 10_000, 100_000])
+    parser.add_argument("--hints", type=int, default=200)
+    asyncio.run(main(parser.parse_args()))
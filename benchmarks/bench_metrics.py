@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""Overhead of the request-path instrumentation.
+
+Times a tool call with five stages, with and without instrumentation, and
+how long rendering the Prometheus exposition takes once it is populated.
+"""
+
+import argparse
+import time
+
+import _common  # noqa: F401  (adds src/ to sys.path)
+
+from imgflip_meme_mcp.metrics import get_metrics, stage, track_tool
+
+STAGES = ("validate", "catalog", "alias", "generate", "format")
+
+
+def bare(iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for _ in STAGES:
+            pass
+    return time.perf_counter() - start
+
+
+def instrumented(iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        with track_tool("generate_meme"):
+            for name in STAGES:
+                with stage(name):
+                    pass
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=100_000)
+    args = parser.parse_args()
+
+    get_metrics().slow_log.threshold = 0
+    baseline = bare(args.iterations)
+    elapsed = instrumented(args.iterations)
+    per_call = (elapsed - baseline) / args.iterations * 1e6
+    print(f"tool call + {len(STAGES)} stages: {per_call:.2f}us overhead per call "
+          f"({per_call / (len(STAGES) + 1):.2f}us per timer)")
+
+    start = time.perf_counter()
+    text = get_metrics().registry.render()
+    print(f"render: {(time.perf_counter() - start) * 1000:.2f}ms "
+          f"for {len(text.splitlines())} lines")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""Event loop lag while large catalogs are scored, per offload mode.
+
+Runs broad ``search_meme_templates`` queries and fuzzy ``find_best_match``
+calls against a large synthetic catalog from several concurrent callers,
+while a probe task sleeps in short steps and records how late it wakes up:
+the delay every other session's I/O would see. With ``off`` the scans run on
+the loop and lag grows with scan time; ``thread`` and ``process`` keep it
+flat. Also reports scoring throughput and how many abandoned calls were
+cancelled.
+"""
+
+import argparse
+import asyncio
+import os
+import time
+from typing import List, Optional
+
+import _common  # noqa: F401  (adds src/ to sys.path)
+from _common import format_row, make_hints, percentiles
+from fake_imgflip import synthetic_templates
+
+from imgflip_meme_mcp.alias_registry import AliasRegistry
+from imgflip_meme_mcp.catalog import TemplateCatalog
+from imgflip_meme_mcp.imgflip_client import ImgflipClient
+from imgflip_meme_mcp.offload import ScoringPool
+from imgflip_meme_mcp.snapshot import CatalogSnapshot
+from imgflip_meme_mcp.template_matcher import TemplateMatcher
+
+QUERIES = ["drake", "cat", "brain", "the", "is", "bling", "doge", "kid"]
+
+
+async def probe(stop: asyncio.Event, interval: float, lags: List[float]) -> None:
+    """Sleep ``interval`` repeatedly and record how late each wake-up is."""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(max(0.0, time.perf_counter() - start - interval))
+
+
+async def bench_mode(mode: str, templates: list, args: argparse.Namespace) -> None:
+    async def fetch(current: Optional[CatalogSnapshot]) -> CatalogSnapshot:
+        return CatalogSnapshot(templates)
+
+    os.environ["IMGFLIP_HINT_CACHE_SIZE"] = "0"
+    client = ImgflipClient(catalog=TemplateCatalog(fetch))
+    await client.catalog.get()
+    pool = ScoringPool(threshold=0, mode=mode)
+    matcher = TemplateMatcher(
+        client, alias_registry=AliasRegistry([]), scoring_pool=pool
+    )
+    hints = make_hints(templates, 1000)
+    # Warm the pool and indexes, which are built on first use.
+    await matcher.search_templates("drake", 10)
+    await matcher.find_best_match(hints[0])
+
+    done = 0
+
+    async def caller(offset: int) -> None:
+        nonlocal done
+        i = offset
+        while time.perf_counter() < deadline:
+            if i % 2:
+                await matcher.search_templates(QUERIES[i % len(QUERIES)], 10)
+            else:
+                await matcher.find_best_match(hints[i % len(hints)])
+            done += 1
+            i += args.callers
+
+    async def abandoned(i: int) -> None:
+        try:
+            await asyncio.wait_for(matcher.search_templates(QUERIES[i], 10), 0.001)
+        except asyncio.TimeoutError:
+            pass
+
+    stop = asyncio.Event()
+    lags: List[float] = []
+    probe_task = asyncio.create_task(probe(stop, args.interval, lags))
+    deadline = time.perf_counter() + args.duration
+    await asyncio.gather(*(caller(n) for n in range(args.callers)))
+    await asyncio.gather(*(abandoned(i) for i in range(len(QUERIES))))
+    stop.set()
+    await probe_task
+    pool.shutdown()
+    await client.aclose()
+
+    stats = pool.stats()
+    print(format_row(
+        f"{mode} lag n={len(templates)}",
+        percentiles(lags),
+        f"{done / args.duration:7.1f} calls/s  cancelled={stats['cancelled']}",
+    ))
+
+
+async def main(args: argparse.Namespace) -> None:
+    templates = synthetic_templates(args.size)
+    print(f"{os.cpu_count()} CPUs, {args.callers} concurrent callers")
+    for mode in args.modes:
+        await bench_mode(mode, templates, args)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=100_000)
+    parser.add_argument(
+        "--modes", nargs="+", default=["off", "thread", "process"],
+        choices=["off", "thread", "process"],
+    )
+    parser.add_argument("--callers", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--interval", type=float, default=0.005)
+    asyncio.run(main(parser.parse_args()))
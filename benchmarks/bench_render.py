@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""Local meme rendering versus ``/caption_image`` round trips.
+
+Times ImgflipClient.generate_meme one meme at a time and reports throughput
+with several memes in flight, for:
+
+- ``caption_image``: the Imgflip API, stubbed with ``--latency`` per call;
+- ``local cold``: every meme uses a template not seen before, which is
+  downloaded from a local stub, written to the disk cache and decoded;
+- ``local disk``: templates come from the disk cache but are decoded for
+  every meme (no decoded-image cache);
+- ``local decoded``: templates are already decoded in the LRU, so a render
+  only draws the captions and encodes the JPEG.
+
+Captions differ per meme, so neither the result cache nor existing output
+files are reused.
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from io import BytesIO
+from typing import Any, Awaitable, Callable, List
+
+import _common  # noqa: F401  (adds src/ to sys.path)
+from _common import format_row, percentiles
+from fake_imgflip import FakeImgflipServer, synthetic_templates
+from PIL import Image
+
+from imgflip_meme_mcp.imgflip_client import ImgflipClient
+from imgflip_meme_mcp.render import MemeRenderer
+from imgflip_meme_mcp.result_cache import MemeResultCache
+from imgflip_meme_mcp.transport import HttpTransport
+
+os.environ["IMGFLIP_RATE_LIMIT"] = "0"
+
+CAPTIONS = (
+    "one does not simply",
+    "walk into a benchmark without measuring the baseline first",
+)
+
+
+def template_jpeg(size: int) -> bytes:
+    """A noisy JPEG about as costly to decode as a real template photo."""
+    image = Image.merge("RGB", [
+        Image.effect_noise((size, size), 60),
+        Image.linear_gradient("L").resize((size, size)),
+        Image.effect_noise((size, size), 30),
+    ])
+    output = BytesIO()
+    image.save(output, format="JPEG", quality=85)
+    return output.getvalue()
+
+
+async def run(
+    label: str, generate: Callable[[int], Awaitable[Any]], args: argparse.Namespace
+) -> None:
+    """Time ``generate(i)`` sequentially, then ``--concurrency`` at a time."""
+    samples = []
+    for i in range(args.memes):
+        start = time.perf_counter()
+        await generate(i)
+        samples.append(time.perf_counter() - start)
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def limited(i: int) -> Any:
+        async with semaphore:
+            return await generate(i)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(limited(args.memes + i) for i in range(args.memes)))
+    throughput = args.memes / (time.perf_counter() - start)
+    print(format_row(label, percentiles(samples), f"{throughput:7.1f} memes/s"))
+
+
+def checked(result: dict) -> dict:
+    if not result.get("success"):
+        raise RuntimeError(result.get("error_message"))
+    return result
+
+
+async def main(args: argparse.Namespace) -> None:
+    image = template_jpeg(args.image_size)
+    async with FakeImgflipServer([], image=image) as images:
+        templates: List[dict] = synthetic_templates(4 * args.memes)
+        for template in templates:
+            template["url"] = f"{images.url}/images/{template['id']}.jpg"
+        async with FakeImgflipServer(templates, latency=args.latency) as api:
+            with tempfile.TemporaryDirectory() as directory:
+                client = ImgflipClient(
+                    base_url=api.url,
+                    transport=HttpTransport(api.url),
+                    result_cache=MemeResultCache(max_size=0),
+                )
+                client.username, client.password = "bench", "bench"
+                await client.catalog.get()
+                print(
+                    f"{args.image_size}px templates ({len(image) // 1024} KB JPEG), "
+                    f"{args.latency * 1000:.0f}ms API latency, "
+                    f"concurrency={args.concurrency}"
+                )
+
+                async def caption(i: int) -> Any:
+                    return checked(await client.generate_meme(
+                        templates[0]["id"], f"{CAPTIONS[0]} {i}", CAPTIONS[1],
+                        render="imgflip",
+                    ))
+
+                await run("caption_image", caption, args)
+
+                image_dir = os.path.join(directory, "images")
+
+                def local(renderer: MemeRenderer, spread: bool) -> Callable:
+                    async def generate(i: int) -> Any:
+                        template = templates[i if spread else i % 4]
+                        return checked(await client.render_meme(
+                            template["id"], f"{CAPTIONS[0]} {i}", CAPTIONS[1]
+                        ))
+
+                    client.renderer = renderer
+                    return generate
+
+                def renderer(name: str, cache_size: int) -> MemeRenderer:
+                    return MemeRenderer(
+                        os.path.join(directory, name),
+                        image_dir=image_dir,
+                        cache_size=cache_size,
+                        prewarm=0,
+                    )
+
+                await run("local cold", local(renderer("cold", 16), True), args)
+                await run("local disk", local(renderer("disk", 0), True), args)
+                warm = renderer("warm", 16)
+                for template in templates[:4]:
+                    await warm.template_image(template)
+                await run("local decoded", local(warm, False), args)
+                await client.aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--memes", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--image-size", type=int, default=600)
+    asyncio.run(main(parser.parse_args()))
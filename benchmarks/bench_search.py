@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""Latency of ranked template search, first and later pages.
+
+Compares TemplateMatcher.search, which ranks only as many results as the
+requested page needs, with the previous approach that scored every substring
+match, sorted them all and sliced the first ``limit``. Common single-word
+queries match a large share of a big catalog, which is the costly case.
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Any, Dict, List, Optional
+
+import _common  # noqa: F401  (adds src/ to sys.path)
+from _common import format_row, percentiles
+from fake_imgflip import synthetic_templates
+
+from imgflip_meme_mcp.alias_registry import AliasRegistry
+from imgflip_meme_mcp.catalog import TemplateCatalog
+from imgflip_meme_mcp.fuzzy import similarity
+from imgflip_meme_mcp.imgflip_client import ImgflipClient
+from imgflip_meme_mcp.offload import ScoringPool
+from imgflip_meme_mcp.snapshot import CatalogSnapshot
+from imgflip_meme_mcp.template_index import TemplateIndex, tokenize
+from imgflip_meme_mcp.template_matcher import TemplateMatcher
+
+QUERIES = ["drake", "cat", "brain", "is", "kid", "bling", "doge", "spongebob"]
+
+
+def legacy_search(index: TemplateIndex, query: str, limit: int) -> List[Dict[str, Any]]:
+    """search_templates before top-k selection."""
+    query_lower = query.lower()
+    query_words = tokenize(query_lower)
+    scored = []
+    for position in index.substring_positions(query_lower):
+        score = similarity(
+            query_lower, query_words, index.names[position], index.tokens[position]
+        )
+        scored.append((score, index.templates[position]))
+    scored.sort(key=lambda x: x[0], reverse=True)
+    return [template for _, template in scored[:limit]]
+
+
+async def bench_size(size: int, args: argparse.Namespace) -> None:
+    templates = synthetic_templates(size)
+
+    async def fetch(current: Optional[CatalogSnapshot]) -> CatalogSnapshot:
+        return CatalogSnapshot(templates)
+
+    client = ImgflipClient(catalog=TemplateCatalog(fetch))
+    index = await client.catalog.get_index()
+    matcher = TemplateMatcher(
+        client, alias_registry=AliasRegistry([]), scoring_pool=ScoringPool(mode="off")
+    )
+    await matcher.search(QUERIES[0])
+
+    samples = []
+    for i in range(args.queries):
+        start = time.perf_counter()
+        legacy_search(index, QUERIES[i % len(QUERIES)], args.limit)
+        samples.append(time.perf_counter() - start)
+    print(format_row(f"sort-all n={size}", percentiles(samples)))
+
+    for offset in args.offsets:
+        samples = []
+        for i in range(args.queries):
+            start = time.perf_counter()
+            await matcher.search(QUERIES[i % len(QUERIES)], args.limit, offset)
+            samples.append(time.perf_counter() - start)
+        print(format_row(f"top-k n={size} offset={offset}", percentiles(samples)))
+    await client.aclose()
+
+
+async def main(args: argparse.Namespace) -> None:
+    for size in args.sizes:
+        await bench_size(size, args)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--queries", type=int, default=80)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--offsets", type=int, nargs="+", default=[0, 100, 1000])
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""Cold vs warm start: time until the first template search is answered.
+
+Each run is a fresh Python process, as with per-session stdio servers. A cold
+start has no catalog snapshot and must fetch ``/get_memes``; a warm start
+loads the snapshot written by the previous run before any network I/O.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import _common
+from _common import format_row, percentiles
+from fake_imgflip import fake_imgflip_process
+
+PROBE = """
+import asyncio, json, sys, time
+start = time.perf_counter()
+sys.path.insert(0, {src!r})
+from imgflip_meme_mcp.imgflip_client import ImgflipClient
+
+async def main():
+    client = ImgflipClient()
+    results = await client.search_templates("drake")
+    return time.perf_counter() - start, len(results)
+
+elapsed, found = asyncio.run(main())
+print(json.dumps({{"elapsed": elapsed, "found": found}}))
+"""
+
+
+def _run_probe(env: dict) -> float:
+    """Start a fresh interpreter and return its time to first search result."""
+    src = os.path.join(os.path.dirname(_common.__file__), "..", "src")
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE.format(src=os.path.abspath(src))],
+        env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    if not result["found"]:
+        raise RuntimeError("probe search returned no templates")
+    return result["elapsed"]
+
+
+def main(args: argparse.Namespace) -> None:
+    with fake_imgflip_process(templates=args.templates, latency=args.latency) as url:
+        cold, warm = [], []
+        for _ in range(args.runs):
+            with tempfile.TemporaryDirectory() as cache_dir:
+                env = dict(os.environ, IMGFLIP_API_URL=url, IMGFLIP_CACHE_DIR=cache_dir)
+                cold.append(_run_probe(env))
+                warm.append(_run_probe(env))
+        print(format_row("cold start (network)", percentiles(cold)))
+        print(format_row("warm start (snapshot)", percentiles(warm)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--templates", type=int, default=100)
+    parser.add_argument(
+        "--latency", type=float, default=0.15,
+        help="simulated upstream latency in seconds",
+    )
+    main(parser.parse_args())
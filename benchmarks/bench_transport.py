@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""Throughput and latency of ImgflipClient against the local fake Imgflip API.
+
+Compares the pooled async transport with the previous approach of running a
+blocking ``requests.post`` per call on the default thread pool (skipped when
+``requests`` is not installed).
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Awaitable, Callable, List
+
+import _common  # noqa: F401  (adds src/ to sys.path)
+from _common import format_row, percentiles
+from fake_imgflip import fake_imgflip_process
+
+from imgflip_meme_mcp.flow_control import FlowController
+from imgflip_meme_mcp.imgflip_client import ImgflipClient
+from imgflip_meme_mcp.result_cache import MemeResultCache
+from imgflip_meme_mcp.transport import HttpTransport
+
+
+async def _drive(
+    call: Callable[[], Awaitable[object]], total: int, concurrency: int
+) -> List[float]:
+    """Run ``call`` ``total`` times with at most ``concurrency`` in flight."""
+    semaphore = asyncio.Semaphore(concurrency)
+    samples: List[float] = []
+
+    async def one() -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            await call()
+            samples.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(one() for _ in range(total)))
+    return samples
+
+
+def _legacy_call(url: str) -> Callable[[], Awaitable[object]]:
+    """Build the old requests-in-executor caption call, if available."""
+    import requests
+
+    def post() -> object:
+        return requests.post(
+            f"{url}/caption_image",
+            data={"template_id": "1", "text0": "a", "text1": "b"},
+            timeout=30,
+        ).json()
+
+    async def call() -> object:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, post)
+
+    return call
+
+
+async def main(args: argparse.Namespace) -> None:
+    with fake_imgflip_process(latency=args.latency) as url:
+        client = ImgflipClient(
+            base_url=url,
+            transport=HttpTransport(url),
+            result_cache=MemeResultCache(max_size=0),
+            flow=FlowController(rate=0, max_concurrency=64),
+        )
+        client.username, client.password = "bench", "bench"
+
+        async def pooled() -> object:
+            return await client.generate_meme("100000", "top", "bottom")
+
+        variants = [("pooled-httpx", pooled)]
+        try:
+            variants.append(("requests-in-executor", _legacy_call(url)))
+        except ImportError:
+            print("requests not installed; skipping legacy comparison")
+
+        for concurrency in args.concurrency:
+            for label, call in variants:
+                start = time.perf_counter()
+                samples = await _drive(call, args.requests, concurrency)
+                elapsed = time.perf_counter() - start
+                print(format_row(
+                    f"{label} c={concurrency}",
+                    percentiles(samples),
+                    f"{args.requests / elapsed:8.1f} req/s",
+                ))
+        await client.aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.005)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50])
+    asyncio.run(main(parser.parse_args()))
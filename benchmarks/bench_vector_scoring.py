@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""Fuzzy matching with NumPy TF-IDF candidate ranking versus posting counts.
+
+For each catalog size, resolves the same hints with candidates ranked from
+posting-list counters (the pure-Python path) and from TF-IDF cosine scores
+(the NumPy path). Ranking quality is
+checked against an exhaustive scan that scores every template exactly:
+``worse`` counts hints whose match scores lower than the best possible.
+"""
+
+import argparse
+import time
+from typing import List, Optional, Tuple
+
+import _common  # noqa: F401  (adds src/ to sys.path)
+from _common import format_row, make_hints, percentiles
+from fake_imgflip import synthetic_templates
+
+from imgflip_meme_mcp.fuzzy import FuzzyMatcher, similarity
+from imgflip_meme_mcp.template_index import TemplateIndex, tokenize
+
+Match = Optional[Tuple[float, int]]
+
+
+def exhaustive(index: TemplateIndex, hint: str) -> float:
+    """Best exact score over the whole catalog."""
+    hint_words = tokenize(hint)
+    return max(
+        similarity(hint, hint_words, name, words)
+        for name, words in zip(index.names, index.tokens)
+    )
+
+
+def quality(index: TemplateIndex, hints: List[str], matches: List[Match]) -> str:
+    worse = 0
+    for hint, match in zip(hints, matches):
+        best = exhaustive(index, hint)
+        got = match[0] if match else 0.0
+        worse += got + 1e-9 < best and best > 0.3
+    return f"worse={worse}/{len(hints)}"
+
+
+def timed(matcher: FuzzyMatcher, hints: List[str]) -> Tuple[List[Match], List[float]]:
+    matches, samples = [], []
+    for hint in hints:
+        start = time.perf_counter()
+        matches.append(matcher.best_match(hint))
+        samples.append(time.perf_counter() - start)
+    return matches, samples
+
+
+def bench_size(size: int, args: argparse.Namespace) -> None:
+    index = TemplateIndex(synthetic_templates(size))
+    start = time.perf_counter()
+    if index.vectors() is None:
+        raise SystemExit("NumPy is not installed")
+    build = time.perf_counter() - start
+    hints = [hint.lower().strip() for hint in make_hints(index.templates, args.hints)]
+    checked = hints[:args.quality_hints]
+
+    postings = FuzzyMatcher(index)
+    postings.vectors = None
+    matches, samples = timed(postings, hints)
+    print(format_row(
+        f"postings n={size}", percentiles(samples),
+        quality(index, checked, matches[:len(checked)]),
+    ))
+
+    vectors = FuzzyMatcher(index)
+    vectors.vectors = index.vectors()
+    matches, samples = timed(vectors, hints)
+    print(format_row(
+        f"tfidf n={size}", percentiles(samples),
+        f"{quality(index, checked, matches[:len(checked)])}  build={build:.2f}s",
+    ))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--hints", type=int, default=300)
+    parser.add_argument("--quality-hints", type=int, default=50)
+    args = parser.parse_args()
+    for size in args.sizes:
+        bench_size(size, args)
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""Throughput of the HTTP server with 1, 2 and 4 worker processes.
+
+Starts ``imgflip-mcp --transport http --workers N`` against the fake API with
+a large synthetic catalog, then drives ``generate_meme`` over stateless
+JSON-RPC from several load-generator processes. Hints are distinct, so the
+fuzzy matcher does real work on every call. Also reports how many catalog
+fetches reached the fake API, which stays at one however many workers run.
+Scaling is bounded by the number of CPU cores available.
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import List, Tuple
+
+import _common  # noqa: F401  (adds src/ to sys.path)
+import httpx
+from _common import make_hints, percentiles
+from fake_imgflip import fake_imgflip_process, synthetic_templates
+
+SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+
+
+async def _drive(
+    url: str, hints: List[str], concurrency: int, duration: float
+) -> List[float]:
+    samples: List[float] = []
+    deadline = time.perf_counter() + duration
+    headers = {"Accept": "application/json, text/event-stream"}
+
+    async with httpx.AsyncClient(timeout=60) as client:
+
+        async def worker(offset: int) -> None:
+            i = offset
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                response = await client.post(url, headers=headers, json={
+                    "jsonrpc": "2.0",
+                    "id": i,
+                    "method": "tools/call",
+                    "params": {"name": "generate_meme", "arguments": {
+                        "template_hint": hints[i % len(hints)],
+                        "top_text": f"{os.getpid()} {i}",
+                    }},
+                })
+                response.raise_for_status()
+                samples.append(time.perf_counter() - start)
+                i += concurrency
+
+        await asyncio.gather(*(worker(n) for n in range(concurrency)))
+    return samples
+
+
+def load_process(args: Tuple[str, List[str], int, float]) -> List[float]:
+    """One load generator; returns request latencies in seconds."""
+    return asyncio.run(_drive(*args))
+
+
+def wait_for(url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"server at {url} did not start")
+
+
+def run(
+    workers: int, api_url: str, hints: List[str], args: argparse.Namespace
+) -> None:
+    port = 18700 + workers
+    env = dict(
+        os.environ,
+        PYTHONPATH=SRC,
+        IMGFLIP_API_URL=api_url,
+        IMGFLIP_USERNAME="bench",
+        IMGFLIP_PASSWORD="bench",
+        IMGFLIP_CACHE_DIR=tempfile.mkdtemp(prefix="imgflip-bench-"),
+        IMGFLIP_RATE_LIMIT="0",
+        IMGFLIP_SESSION_CONCURRENCY="0",
+        IMGFLIP_SLOW_REQUEST_SECONDS="0",
+    )
+    server = subprocess.Popen(
+        [
+            sys.executable, "-m", "imgflip_meme_mcp.server", "--transport", "http",
+            "--port", str(port), "--workers", str(workers),
+            "--stateless", "--json-response",
+        ],
+        env=env,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_for(f"http://127.0.0.1:{port}/healthz")
+        url = f"http://127.0.0.1:{port}/mcp"
+        # Warm every worker's catalog before measuring.
+        load_process((url, hints, args.concurrency, 2.0))
+
+        jobs = [
+            (url, hints[n::args.clients], args.concurrency, args.duration)
+            for n in range(args.clients)
+        ]
+        context = multiprocessing.get_context("spawn")
+        with context.Pool(args.clients) as pool:
+            samples = [s for result in pool.map(load_process, jobs) for s in result]
+        stats = percentiles(samples)
+        fetches = httpx.get(f"{api_url}/_stats").json()["paths"].get("/get_memes", 0)
+        print(
+            f"workers={workers:<3} {len(samples) / args.duration:8.1f} req/s  "
+            f"p50={stats['p50']:8.2f}ms  p99={stats['p99']:8.2f}ms  "
+            f"catalog fetches={fetches}"
+        )
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--templates", type=int, default=10_000)
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10.0)
+    args = parser.parse_args()
+
+    hints = make_hints(synthetic_templates(args.templates), 20_000)
+    print(f"{os.cpu_count()} CPUs, {args.templates} templates, "
+          f"{args.clients}x{args.concurrency} concurrent clients")
+    for workers in args.workers:
+        with fake_imgflip_process(templates=args.templates) as api_url:
+            run(workers, api_url, hints, args)
+
+
+if __name__ == "__main__":
+    main()
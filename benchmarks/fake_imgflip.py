@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""Local fake Imgflip API for offline benchmarks.
+
+Serves ``GET /get_memes`` and ``POST /caption_image`` over HTTP/1.1 with
+keep-alive, using only the standard library so it can run in-process next to
+the code under test or standalone via ``python benchmarks/fake_imgflip.py``.
+``GET /_stats`` reports request counters per path.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import random
+import socket
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+from urllib.parse import parse_qs
+
+
+def synthetic_templates(count: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """Build a deterministic synthetic template catalog of ``count`` entries."""
+    rng = random.Random(seed)
+    words = [
+        "drake", "hotline", "bling", "distracted", "boyfriend", "two", "buttons",
+        "change", "my", "mind", "this", "is", "fine", "woman", "yelling", "at",
+        "cat", "surprised", "pikachu", "expanding", "brain", "uno", "reverse",
+        "always", "has", "been", "one", "does", "not", "simply", "success", "kid",
+        "bad", "luck", "brian", "guarantee", "it", "warehouse", "left", "exit",
+        "ramp", "gru", "plan", "monkey", "puppet", "spongebob", "mocking", "doge",
+        "batman", "slapping", "robin", "roll", "safe", "tuxedo", "pooh", "buff",
+    ]
+    templates = []
+    for i in range(count):
+        name = " ".join(rng.choice(words).title() for _ in range(rng.randint(2, 4)))
+        templates.append({
+            "id": str(100000 + i),
+            "name": f"{name} {i}" if count > len(words) else name,
+            "url": f"https://i.imgflip.com/{i}.jpg",
+            "width": 500,
+            "height": 500,
+            "box_count": 2,
+            "captions": rng.randint(0, 100000),
+        })
+    return templates
+
+
+class FakeImgflipServer:
+    """Minimal keep-alive HTTP server imitating the Imgflip API."""
+
+    def __init__(
+        self,
+        templates: Optional[List[Dict[str, Any]]] = None,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        throttle_rate: float = 0.0,
+        max_rps: float = 0.0,
+        retry_after: float = 1.0,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        image: bytes = b"",
+    ):
+        self.templates = templates if templates is not None else synthetic_templates(100)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.max_rps = max_rps
+        self.retry_after = retry_after
+        # Served for GET /images/<anything>, standing in for template images.
+        self.image = image
+        self.throttled_count = 0
+        self._allowance = max_rps
+        self._allowance_at = time.monotonic()
+        self.host = host
+        self.port = port
+        self.request_count = 0
+        self.connection_count = 0
+        self.path_counts: Dict[str, int] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._handlers: Set["asyncio.Task[None]"] = set()
+        self._memes_body = b""
+
+    @property
+    def url(self) -> str:
+        """Base URL for pointing ``ImgflipClient`` at this server."""
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self) -> "FakeImgflipServer":
+        """Start listening; picks a free port when ``port`` is 0."""
+        self._memes_body = json.dumps(
+            {"success": True, "data": {"memes": self.templates}}
+        ).encode()
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self) -> None:
+        """Stop the server and close all connections."""
+        if self._server is not None:
+            self._server.close()
+            for task in list(self._handlers):
+                task.cancel()
+            await asyncio.gather(*self._handlers, return_exceptions=True)
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self) -> "FakeImgflipServer":
+        return await self.start()
+
+    async def __aexit__(self, *exc: Any) -> None:
+        await self.stop()
+
+    async def _handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """Serve requests on one connection until the client closes it."""
+        self.connection_count += 1
+        task = asyncio.current_task()
+        self._handlers.add(task)
+        try:
+            while True:
+                request = await self._read_request(reader)
+                if request is None:
+                    break
+                method, path, headers, body = request
+                self.request_count += 1
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+                status, payload, extra = self.respond(method, path, headers, body)
+                self._write_response(writer, status, payload, extra)
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass
+        finally:
+            self._handlers.discard(task)
+            writer.close()
+
+    async def _read_request(
+        self, reader: asyncio.StreamReader
+    ) -> Optional[Tuple[str, str, Dict[str, str], bytes]]:
+        """Parse one HTTP/1.1 request, or return None on EOF."""
+        line = await reader.readline()
+        if not line:
+            return None
+        method, target, _ = line.decode("latin-1").split(" ", 2)
+        headers = {}
+        while True:
+            header = await reader.readline()
+            if header in (b"\r\n", b"\n", b""):
+                break
+            key, _, value = header.decode("latin-1").partition(":")
+            headers[key.strip().lower()] = value.strip()
+        length = int(headers.get("content-length", "0"))
+        body = await reader.readexactly(length) if length else b""
+        return method, target.split("?", 1)[0], headers, body
+
+    def _write_response(
+        self,
+        writer: asyncio.StreamWriter,
+        status: int,
+        payload: bytes,
+        extra: Dict[str, str],
+    ) -> None:
+        """Write a JSON response with keep-alive headers."""
+        lines = [
+            f"HTTP/1.1 {status} {'OK' if status < 400 else 'Error'}",
+            "Content-Type: application/json",
+            f"Content-Length: {len(payload)}",
+            "Connection: keep-alive",
+        ]
+        lines.extend(f"{key}: {value}" for key, value in extra.items())
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + payload)
+
+    def _throttled(self) -> bool:
+        """Whether to answer 429: randomly, or over ``max_rps`` requests/sec."""
+        if self.throttle_rate and random.random() < self.throttle_rate:
+            return True
+        if not self.max_rps:
+            return False
+        now = time.monotonic()
+        self._allowance = min(
+            self.max_rps, self._allowance + (now - self._allowance_at) * self.max_rps
+        )
+        self._allowance_at = now
+        if self._allowance < 1:
+            return True
+        self._allowance -= 1
+        return False
+
+    def respond(
+        self, method: str, path: str, headers: Dict[str, str], body: bytes
+    ) -> Tuple[int, bytes, Dict[str, str]]:
+        """Return ``(status, body, extra_headers)`` for a request."""
+        if path == "/_stats":
+            # Request counters for benchmarks running the fake out of process.
+            return 200, json.dumps({
+                "requests": self.request_count,
+                "connections": self.connection_count,
+                "paths": self.path_counts,
+            }).encode(), {}
+        self.path_counts[path] = self.path_counts.get(path, 0) + 1
+        if self._throttled():
+            self.throttled_count += 1
+            return 429, b'{"success": false, "error_message": "rate limited"}', {
+                "Retry-After": f"{self.retry_after:g}",
+            }
+        if self.error_rate and random.random() < self.error_rate:
+            return 500, b'{"success": false, "error_message": "injected"}', {}
+        if method == "GET" and path == "/get_memes":
+            return 200, self._memes_body, {}
+        if method == "GET" and path.startswith("/images/") and self.image:
+            return 200, self.image, {}
+        if method == "POST" and path == "/caption_image":
+            form = {key: values[0] for key, values in parse_qs(body.decode()).items()}
+            meme_id = f"{form.get('template_id', '0')}-{self.request_count}"
+            return 200, json.dumps({
+                "success": True,
+                "data": {
+                    "url": f"https://i.imgflip.com/{meme_id}.jpg",
+                    "page_url": f"https://imgflip.com/i/{meme_id}",
+                },
+            }).encode(), {}
+        return 404, b'{"success": false, "error_message": "not found"}', {}
+
+
+@contextlib.contextmanager
+def fake_imgflip_process(
+    templates: int = 100,
+    latency: float = 0.0,
+    error_rate: float = 0.0,
+    throttle_rate: float = 0.0,
+    max_rps: float = 0.0,
+):
+    """Run the fake API in a subprocess so it does not share the caller's CPU."""
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    proc = subprocess.Popen(
+        [
+            sys.executable, __file__, "--port", str(port),
+            "--templates", str(templates), "--latency", str(latency),
+            "--error-rate", str(error_rate), "--throttle-rate", str(throttle_rate),
+            "--max-rps", str(max_rps),
+        ],
+        stdout=subprocess.DEVNULL,
+    )
+    try:
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline:
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+                break
+            except OSError:
+                time.sleep(0.05)
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+async def _serve_forever(args: argparse.Namespace) -> None:
+    server = FakeImgflipServer(
+        templates=synthetic_templates(args.templates),
+        latency=args.latency,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        max_rps=args.max_rps,
+        port=args.port,
+    )
+    await server.start()
+    print(f"Fake Imgflip API listening on {server.url}")
+    print(
+        f"Run the server against it with IMGFLIP_API_URL={server.url} "
+        "IMGFLIP_RATE_LIMIT=0 (the default limit of 20 requests/s would cap "
+        "throughput)"
+    )
+    await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--templates", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--max-rps", type=float, default=0.0)
+    try:
+        asyncio.run(_serve_forever(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""Offline benchmark suite with results comparable across commits.
+
+Runs every scenario against an in-process fake Imgflip API and synthetic
+catalogs of each ``--sizes`` entry:
+
+- ``match``: TemplateMatcher.find_best_match on misspelled/partial hints
+- ``search``: TemplateMatcher.search_templates on single-word queries
+- ``generate``: ImgflipClient.generate_meme against the fake API
+- ``call_tool``: server.call_tool("generate_meme") end to end
+
+Hint and result caches are disabled so each operation does its full work.
+Each scenario runs ``--repeat`` times and the fastest run is reported, which
+keeps results steadier between runs.
+Results (throughput and latency percentiles per scenario and size) are
+printed and optionally written as JSON; ``--compare`` diffs them against a
+previous run and flags regressions beyond ``--threshold``::
+
+    python benchmarks/suite.py --output before.json
+    git checkout my-branch
+    python benchmarks/suite.py --compare before.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+
+import _common  # noqa: F401  (adds src/ to sys.path)
+from _common import make_hints, percentiles
+from fake_imgflip import FakeImgflipServer, synthetic_templates
+
+# Must be set before the server module builds its client and caches.
+os.environ.update({
+    "IMGFLIP_USERNAME": "bench",
+    "IMGFLIP_PASSWORD": "bench",
+    "IMGFLIP_CACHE_DIR": "",
+    "IMGFLIP_HINT_CACHE_SIZE": "0",
+    "IMGFLIP_RESULT_CACHE_SIZE": "0",
+    "IMGFLIP_RESULT_CACHE_PATH": "",
+    "IMGFLIP_SLOW_REQUEST_SECONDS": "0",
+    "IMGFLIP_RATE_LIMIT": "0",
+    "IMGFLIP_BREAKER_FAILURES": "0",
+})
+
+from imgflip_meme_mcp.alias_registry import AliasRegistry  # noqa: E402
+from imgflip_meme_mcp.imgflip_client import ImgflipClient  # noqa: E402
+from imgflip_meme_mcp.template_matcher import TemplateMatcher  # noqa: E402
+from imgflip_meme_mcp.transport import HttpTransport  # noqa: E402
+
+# Returns True when the operation succeeded.
+Operation = Callable[[int], Awaitable[bool]]
+
+
+async def measure(
+    name: str, size: int, operation: Operation, count: int, concurrency: int
+) -> Dict[str, Any]:
+    """Run ``operation`` ``count`` times, ``concurrency`` at a time."""
+    semaphore = asyncio.Semaphore(concurrency)
+    samples: List[float] = []
+    errors = 0
+
+    async def one(i: int) -> None:
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                ok = await operation(i)
+            except Exception:
+                ok = False
+            samples.append(time.perf_counter() - start)
+            errors += not ok
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(count)))
+    elapsed = time.perf_counter() - start
+    return {
+        "scenario": name,
+        "size": size,
+        "count": count,
+        "concurrency": concurrency,
+        "errors": errors,
+        "throughput": count / elapsed if elapsed else 0.0,
+        **percentiles(samples),
+    }
+
+
+async def run_size(size: int, args: argparse.Namespace) -> List[Dict[str, Any]]:
+    """All scenarios against one synthetic catalog size."""
+    from imgflip_meme_mcp import server
+
+    templates = synthetic_templates(size)
+    hints = make_hints(templates, args.operations)
+    words = sorted({w for t in templates[:200] for w in t["name"].lower().split()})
+    results = []
+    async with FakeImgflipServer(
+        templates, latency=args.latency, error_rate=args.error_rate
+    ) as fake:
+        client = ImgflipClient(base_url=fake.url, transport=HttpTransport(fake.url))
+        matcher = TemplateMatcher(client, alias_registry=AliasRegistry([]))
+        await client.catalog.get()
+        server.imgflip_client, server.template_matcher = client, matcher
+
+        async def match(i: int) -> bool:
+            await matcher.find_best_match(hints[i % len(hints)])
+            return True
+
+        async def search(i: int) -> bool:
+            await matcher.search_templates(words[i % len(words)], 10)
+            return True
+
+        async def generate(i: int) -> bool:
+            result = await client.generate_meme(
+                templates[i % size]["id"], f"top {i}", "bottom"
+            )
+            return bool(result.get("success"))
+
+        async def call_tool(i: int) -> bool:
+            content = await server.call_tool("generate_meme", {
+                "template_hint": hints[i % len(hints)],
+                "top_text": f"top {i}",
+            })
+            # "No template found" is a valid answer; only count failures.
+            text = content[0].text
+            return not text.startswith(("Failed to generate", "Error calling"))
+
+        scenarios = [
+            ("match", match, 1),
+            ("search", search, 1),
+            ("generate", generate, args.concurrency),
+            ("call_tool", call_tool, args.concurrency),
+        ]
+        for name, operation, concurrency in scenarios:
+            if args.scenarios and name not in args.scenarios:
+                continue
+            runs = [
+                await measure(name, size, operation, args.operations, concurrency)
+                for _ in range(args.repeat)
+            ]
+            result = max(runs, key=lambda run: run["throughput"])
+            print(format_result(result), flush=True)
+            results.append(result)
+        await client.aclose()
+    return results
+
+
+def format_result(result: Dict[str, Any]) -> str:
+    return (
+        f"{result['scenario']:<10} n={result['size']:<7} "
+        f"{result['throughput']:9.1f} ops/s  p50={result['p50']:8.2f}ms  "
+        f"p90={result['p90']:8.2f}ms  p99={result['p99']:8.2f}ms  "
+        f"errors={result['errors']}"
+    )
+
+
+def git_revision() -> Optional[str]:
+    """Current commit, suffixed with ``-dirty`` for uncommitted changes."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        revision = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=root, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            cwd=root, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return revision + ("-dirty" if dirty else "")
+
+
+def compare(
+    baseline: Dict[str, Any], results: Sequence[Dict[str, Any]], threshold: float
+) -> int:
+    """Print changes against ``baseline``; returns the number of regressions."""
+    previous = {(r["scenario"], r["size"]): r for r in baseline["results"]}
+    print(f"\nchanges vs {baseline.get('revision') or 'baseline'} "
+          f"(regression threshold {threshold:.0%}):")
+    regressions = 0
+    for result in results:
+        before = previous.get((result["scenario"], result["size"]))
+        if before is None:
+            continue
+        changes = []
+        regressed = False
+        for key, higher_is_better in (("throughput", True), ("p50", False),
+                                      ("p99", False)):
+            if not before[key]:
+                continue
+            change = result[key] / before[key] - 1
+            changes.append(f"{key} {change:+7.1%}")
+            if (-change if higher_is_better else change) > threshold:
+                regressed = True
+        regressions += regressed
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{result['scenario']:<10} n={result['size']:<7} "
+              f"{'  '.join(changes)}{flag}")
+    return regressions
+
+
+async def main(args: argparse.Namespace) -> int:
+    results: List[Dict[str, Any]] = []
+    for size in args.sizes:
+        results.extend(await run_size(size, args))
+
+    report = {
+        "revision": git_revision(),
+        "created_at": time.time(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": {
+            "operations": args.operations,
+            "concurrency": args.concurrency,
+            "repeat": args.repeat,
+            "latency": args.latency,
+            "error_rate": args.error_rate,
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(json.load(f), results, args.threshold)
+        if regressions and args.fail_on_regression:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 10_000])
+    parser.add_argument("--operations", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument(
+        "--scenarios", nargs="+", choices=["match", "search", "generate", "call_tool"]
+    )
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--compare", help="JSON results of a previous run")
+    parser.add_argument("--threshold", type=float, default=0.10)
+    parser.add_argument("--fail-on-regression", action="store_true")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,166 @@
+"""File-backed registry of template aliases with hot reload."""
+
+import asyncio
+import json
+import os
+import sys
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+DEFAULT_ALIASES_PATH = os.path.join(
+    os.path.dirname(__file__), "data", "aliases.json"
+)
+ALIAS_FILE_EXTENSIONS = (".json", ".yaml", ".yml", ".toml")
+
+Aliases = Dict[str, List[str]]
+
+
+def _parse_yaml(text: str) -> Any:
+    try:
+        import yaml
+    except ImportError:
+        raise ValueError("PyYAML is required to load YAML alias files")
+    try:
+        return yaml.safe_load(text)
+    except yaml.YAMLError as e:
+        raise ValueError(str(e))
+
+
+def _parse_toml(text: str) -> Any:
+    try:
+        import tomllib
+    except ImportError:
+        try:
+            import tomli as tomllib
+        except ImportError:
+            raise ValueError("tomli is required to load TOML alias files")
+    return tomllib.loads(text)
+
+
+def parse_alias_file(path: str) -> Aliases:
+    """Parse one alias file into ``{alias: [template_id, ...]}``.
+
+    The file holds a mapping of alias to template id (or list of ids), either
+    at the top level or under an ``aliases`` key.
+    """
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    extension = os.path.splitext(path)[1].lower()
+    if extension in (".yaml", ".yml"):
+        data = _parse_yaml(text)
+    elif extension == ".toml":
+        data = _parse_toml(text)
+    else:
+        data = json.loads(text)
+
+    if isinstance(data, dict) and isinstance(data.get("aliases"), dict):
+        data = data["aliases"]
+    if not isinstance(data, dict):
+        raise ValueError("expected a mapping of alias to template ids")
+
+    aliases: Aliases = {}
+    for alias, template_ids in data.items():
+        if isinstance(template_ids, (str, int)):
+            template_ids = [template_ids]
+        if not isinstance(template_ids, list) or not template_ids:
+            raise ValueError(
+                f"alias {alias!r} must map to a template id or list of ids"
+            )
+        aliases[str(alias).lower().strip()] = [str(i) for i in template_ids]
+    return aliases
+
+
+def expand_paths(paths: Sequence[str], extensions: Tuple[str, ...]) -> List[str]:
+    """Expand directories into their files with ``extensions``, sorted by name."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(
+                os.path.join(path, name)
+                for name in sorted(os.listdir(path))
+                if name.endswith(extensions)
+            )
+        else:
+            files.append(path)
+    return files
+
+
+class AliasRegistry:
+    """Aliases merged from files or directories, reloaded when they change.
+
+    Later paths override aliases defined by earlier ones. The alias table is
+    replaced as a whole on reload, so readers holding the previous table are
+    unaffected. A file that fails to parse keeps the previous table in place.
+    """
+
+    def __init__(self, paths: Sequence[str]):
+        self.paths = list(paths)
+        self.version = 0
+        self._aliases: Aliases = {}
+        self._stamp: Tuple[Any, ...] = ()
+        self.reload()
+
+    @classmethod
+    def from_env(cls) -> "AliasRegistry":
+        """Packaged aliases overridden by paths in ``IMGFLIP_ALIASES``."""
+        extra = [p for p in os.getenv("IMGFLIP_ALIASES", "").split(os.pathsep) if p]
+        return cls([DEFAULT_ALIASES_PATH] + extra)
+
+    @property
+    def aliases(self) -> Aliases:
+        """The current alias table. Treat it as read-only."""
+        return self._aliases
+
+    def _current_stamp(self) -> Tuple[Any, ...]:
+        """Modification stamp covering every watched file and directory."""
+        stamp = []
+        for path in self.paths + expand_paths(self.paths, ALIAS_FILE_EXTENSIONS):
+            try:
+                st = os.stat(path)
+                stamp.append((path, st.st_mtime_ns, st.st_size))
+            except OSError:
+                stamp.append((path, None, None))
+        return tuple(stamp)
+
+    def reload(self) -> bool:
+        """Reload all alias files; returns True if the table was replaced."""
+        stamp = self._current_stamp()
+        aliases: Aliases = {}
+        path = ""
+        try:
+            for path in expand_paths(self.paths, ALIAS_FILE_EXTENSIONS):
+                aliases.update(parse_alias_file(path))
+        except (OSError, ValueError) as e:
+            print(
+                f"Error loading aliases from {path}, keeping previous table: {e}",
+                file=sys.stderr,
+            )
+            self._stamp = stamp
+            return False
+
+        self._stamp = stamp
+        self._aliases = aliases
+        self.version += 1
+        return True
+
+    def changed(self) -> bool:
+        """Whether any watched file changed since the last load."""
+        return self._current_stamp() != self._stamp
+
+    async def watch(self, interval: float = 2.0) -> None:
+        """Poll the alias files and reload them off the event loop on change."""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(interval)
+            if await loop.run_in_executor(None, self.changed):
+                await loop.run_in_executor(None, self.reload)
+
+
+_default_registry: Optional[AliasRegistry] = None
+
+
+def get_alias_registry() -> AliasRegistry:
+    """Return the process-wide alias registry built from the environment."""
+    global _default_registry
+    if _default_registry is None:
+        _default_registry = AliasRegistry.from_env()
+    return _default_registry
@@ -0,0 +1,124 @@
+"""Compiled alias table for one-pass hint matching."""
+
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+from .template_index import TemplateIndex, normalize
+
+# (negative length, declaration order): smaller sorts first and wins.
+_Rank = Tuple[int, int]
+
+
+class AliasIndex:
+    """Aliases compiled against one catalog version.
+
+    Each alias is resolved to its template up front; aliases whose ids are not
+    in the catalog are dropped. Aliases are compiled into an Aho-Corasick
+    automaton, so every alias occurring inside a hint is found in a single
+    pass over the hint, and the longest one wins (earliest declared on ties).
+    If no alias occurs in the hint, a hint that is itself part of an alias
+    resolves to the shortest such alias, again earliest declared on ties.
+    """
+
+    def __init__(self, aliases: Dict[str, List[str]], index: TemplateIndex):
+        self.aliases: List[str] = []
+        self.templates: List[Dict[str, Any]] = []
+        self.unresolved: Dict[str, List[str]] = {}
+
+        for alias, template_ids in aliases.items():
+            template = _resolve(template_ids, index)
+            if template is None:
+                self.unresolved[alias] = list(template_ids)
+                continue
+            self.aliases.append(normalize(alias))
+            self.templates.append(template)
+
+        self._goto: List[Dict[str, int]] = [{}]
+        self._best: List[Optional[int]] = [None]
+        self._containing: Dict[str, int] = {}
+        self._build()
+
+    def __len__(self) -> int:
+        return len(self.aliases)
+
+    def _rank(self, alias_id: int) -> _Rank:
+        return (-len(self.aliases[alias_id]), alias_id)
+
+    def _better(
+        self, current: Optional[int], candidate: Optional[int]
+    ) -> Optional[int]:
+        """The better of two alias ids under the longest-then-earliest rule."""
+        if current is None:
+            return candidate
+        if candidate is None:
+            return current
+        return min(current, candidate, key=self._rank)
+
+    def _build(self) -> None:
+        """Build the trie, failure links and reverse substring table."""
+        goto, best = self._goto, self._best
+        for alias_id, alias in enumerate(self.aliases):
+            node = 0
+            for char in alias:
+                child = goto[node].get(char)
+                if child is None:
+                    child = len(goto)
+                    goto[node][char] = child
+                    goto.append({})
+                    best.append(None)
+                node = child
+            best[node] = self._better(best[node], alias_id)
+
+            # Every substring of the alias maps to the shortest alias holding it.
+            for start in range(len(alias)):
+                for end in range(start + 1, len(alias) + 1):
+                    part = alias[start:end]
+                    current = self._containing.get(part)
+                    if current is None or (len(alias), alias_id) < (
+                        len(self.aliases[current]), current
+                    ):
+                        self._containing[part] = alias_id
+
+        # Breadth-first failure links; fold each node's fallback outputs into
+        # ``best`` so matching only needs to look at the current node.
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in goto[node].items():
+                queue.append(child)
+                state = fail[node]
+                while state and char not in goto[state]:
+                    state = fail[state]
+                fallback = goto[state].get(char, 0)
+                fail[child] = fallback if fallback != child else 0
+                best[child] = self._better(best[child], best[fail[child]])
+        self._fail = fail
+
+    def match(self, hint: str) -> Optional[Dict[str, Any]]:
+        """Return the template for the best alias matching a normalized hint."""
+        goto, fail, best = self._goto, self._fail, self._best
+        winner: Optional[int] = None
+        node = 0
+        for char in hint:
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            winner = self._better(winner, best[node])
+
+        if winner is None:
+            winner = self._containing.get(hint)
+        if winner is None:
+            return None
+        return self.templates[winner]
+
+
+def _resolve(
+    template_ids: List[str], index: TemplateIndex
+) -> Optional[Dict[str, Any]]:
+    """First template from ``template_ids`` present in the catalog."""
+    for template_id in template_ids:
+        template = index.get(template_id)
+        if template is not None:
+            return template
+    return None
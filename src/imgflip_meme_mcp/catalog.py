@@ -0,0 +1,264 @@
+"""Process-wide meme template catalog with TTL refresh."""
+
+import asyncio
+import os
+import random
+import sys
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from .snapshot import (
+    CatalogSnapshot,
+    default_snapshot_path,
+    load_snapshot,
+    lock_file,
+    save_snapshot,
+    unlock_file,
+)
+from .template_index import TemplateIndex
+
+# Called with the current snapshot (for conditional requests); returns a new
+# snapshot, or None when the upstream catalog has not changed.
+TemplateFetcher = Callable[
+    [Optional[CatalogSnapshot]], Awaitable[Optional[CatalogSnapshot]]
+]
+
+
+class TemplateCatalog:
+    """Shared, self-refreshing cache of Imgflip meme templates.
+
+    ``get()`` fetches the templates on first use. Once the TTL expires the
+    stale copy keeps being served while a single background task revalidates
+    it, and concurrent callers share that in-flight fetch. Failed fetches keep
+    the previous templates and are retried with jittered exponential backoff
+    rather than caching an empty result.
+
+    Indexes for a new catalog version are built in a thread and swapped in
+    once complete, so refreshes do not stall the event loop.
+
+    When ``snapshot_path`` is set, the last good catalog is loaded from disk
+    on first use, before any network I/O, and rewritten after every refresh
+    that changed it. Processes sharing the snapshot take turns refreshing
+    under a file lock, and a process that finds a snapshot newer than its own
+    and still within the TTL adopts it instead of fetching, so several workers
+    cause a single upstream fetch per TTL.
+    """
+
+    def __init__(
+        self,
+        fetcher: TemplateFetcher,
+        ttl: Optional[float] = None,
+        retry_base: float = 1.0,
+        retry_max: float = 300.0,
+        snapshot_path: Optional[str] = None,
+    ):
+        self._fetcher = fetcher
+        if ttl is None:
+            ttl = float(os.getenv("IMGFLIP_TEMPLATE_TTL", "3600"))
+        self.ttl = ttl
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.snapshot_path = snapshot_path
+        self.version = 0
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._index = TemplateIndex([])
+        self._fetched_at = 0.0
+        self._failures = 0
+        self._retry_at = 0.0
+        self._inflight: Optional["asyncio.Task[None]"] = None
+        # Seeds the catalog from the snapshot file on first use.
+        self._seeded = not snapshot_path
+        self._seeding: Optional["asyncio.Task[None]"] = None
+        # mtime of the snapshot file as this process last read or wrote it.
+        self._disk_mtime: Optional[float] = None
+
+    @property
+    def templates(self) -> Optional[List[Dict[str, Any]]]:
+        """Currently cached templates, or None if nothing has loaded yet."""
+        return self._snapshot.templates if self._snapshot else None
+
+    @property
+    def snapshot(self) -> Optional[CatalogSnapshot]:
+        """The current catalog snapshot, including its HTTP validators."""
+        return self._snapshot
+
+    @property
+    def index(self) -> TemplateIndex:
+        """Lookup and search indexes for the current templates."""
+        return self._index
+
+    def is_stale(self) -> bool:
+        """Whether the cached templates are missing or older than the TTL."""
+        if self._snapshot is None:
+            return True
+        return time.monotonic() - self._fetched_at >= self.ttl
+
+    async def _seed(self) -> None:
+        """Load the snapshot file once, joining a load already in flight."""
+        loop = asyncio.get_running_loop()
+        task = self._seeding
+        if task is None or task.get_loop() is not loop:
+            task = loop.create_task(self._load_snapshot(self.snapshot_path))
+            self._seeding = task
+        await asyncio.shield(task)
+
+    async def _load_snapshot(self, path: str) -> None:
+        """Seed the catalog from disk, keeping the snapshot's original age."""
+        try:
+            loop = asyncio.get_running_loop()
+            snapshot = await loop.run_in_executor(None, load_snapshot, path)
+            if snapshot is None or self._snapshot is not None:
+                return
+            self._disk_mtime = _mtime(path)
+            age = max(0.0, time.time() - snapshot.saved_at)
+            await self._set_snapshot(snapshot)
+            self._fetched_at = time.monotonic() - age
+        finally:
+            self._seeded = True
+
+    async def _set_snapshot(self, snapshot: CatalogSnapshot) -> None:
+        """Build a new catalog version's indexes in a thread, then swap it in."""
+        loop = asyncio.get_running_loop()
+        index = await loop.run_in_executor(None, TemplateIndex, snapshot.templates)
+        self._snapshot = snapshot
+        self._index = index
+        self.version += 1
+
+    async def get(self) -> List[Dict[str, Any]]:
+        """Return the templates, fetching or revalidating them as needed."""
+        if not self._seeded:
+            await self._seed()
+        backing_off = time.monotonic() < self._retry_at
+        if self._snapshot is None:
+            if backing_off:
+                return []
+            return await self.refresh()
+        if self.is_stale() and not backing_off:
+            self._start_refresh()
+        return self._snapshot.templates
+
+    async def get_index(self) -> TemplateIndex:
+        """Return the indexes, fetching or revalidating the catalog as needed."""
+        await self.get()
+        return self._index
+
+    async def refresh(self) -> List[Dict[str, Any]]:
+        """Fetch the templates now, joining any fetch already in flight."""
+        await asyncio.shield(self._start_refresh())
+        return self.templates or []
+
+    def _start_refresh(self) -> "asyncio.Task[None]":
+        """Start a background fetch unless one is already running."""
+        loop = asyncio.get_running_loop()
+        task = self._inflight
+        if task is None or task.done() or task.get_loop() is not loop:
+            task = loop.create_task(self._do_refresh())
+            self._inflight = task
+        return task
+
+    async def _do_refresh(self) -> None:
+        """Refresh under the cross-process lock when a snapshot is shared."""
+        if not self.snapshot_path:
+            await self._fetch_and_swap()
+            return
+        loop = asyncio.get_running_loop()
+        lock_path = self.snapshot_path + ".lock"
+        try:
+            lock = await loop.run_in_executor(None, lock_file, lock_path)
+        except OSError as e:
+            print(f"Error locking template snapshot: {e}", file=sys.stderr)
+            lock = None
+        try:
+            if not await self._adopt_newer_snapshot():
+                await self._fetch_and_swap()
+        finally:
+            if lock is not None:
+                unlock_file(lock)
+
+    async def _adopt_newer_snapshot(self) -> bool:
+        """Swap in a fresh snapshot another process saved; True if adopted."""
+        path = self.snapshot_path
+        current_saved_at = self._snapshot.saved_at if self._snapshot else 0.0
+        modified = _mtime(path)
+        if (
+            modified is None
+            or modified == self._disk_mtime
+            or time.time() - modified >= self.ttl
+        ):
+            return False
+
+        loop = asyncio.get_running_loop()
+        snapshot = await loop.run_in_executor(None, load_snapshot, path)
+        self._disk_mtime = modified
+        if snapshot is None or snapshot.saved_at <= current_saved_at:
+            return False
+        age = max(0.0, time.time() - snapshot.saved_at)
+        if age >= self.ttl:
+            return False
+        if self._snapshot is None or (
+            snapshot.content_hash is None
+            or snapshot.content_hash != self._snapshot.content_hash
+        ):
+            await self._set_snapshot(snapshot)
+        else:
+            self._snapshot.saved_at = snapshot.saved_at
+        self._fetched_at = time.monotonic() - age
+        self._failures = 0
+        self._retry_at = 0.0
+        return True
+
+    async def _fetch_and_swap(self) -> None:
+        """Fetch the templates and swap them in, or schedule a retry."""
+        try:
+            snapshot = await self._fetcher(self._snapshot)
+        except Exception as e:
+            self._failures += 1
+            delay = min(self.retry_max, self.retry_base * 2 ** (self._failures - 1))
+            self._retry_at = time.monotonic() + delay * random.uniform(0.5, 1.0)
+            print(f"Error fetching templates: {e}", file=sys.stderr)
+            return
+
+        self._fetched_at = time.monotonic()
+        self._failures = 0
+        self._retry_at = 0.0
+        if snapshot is None:
+            # Not modified upstream; the current snapshot is fresh again.
+            if self._snapshot is not None:
+                self._snapshot.saved_at = time.time()
+                await self._save_snapshot()
+            return
+
+        await self._set_snapshot(snapshot)
+        await self._save_snapshot()
+
+    async def _save_snapshot(self) -> None:
+        """Persist the current snapshot without blocking the event loop."""
+        if not self.snapshot_path or self._snapshot is None:
+            return
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(
+                None, save_snapshot, self.snapshot_path, self._snapshot
+            )
+            self._disk_mtime = _mtime(self.snapshot_path)
+        except OSError as e:
+            print(f"Error saving template snapshot: {e}", file=sys.stderr)
+
+
+def _mtime(path: str) -> Optional[float]:
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return None
+
+
+_catalogs: Dict[str, TemplateCatalog] = {}
+
+
+def get_catalog(key: str, fetcher: TemplateFetcher) -> TemplateCatalog:
+    """Return the process-wide catalog for ``key``, creating it on first use."""
+    catalog = _catalogs.get(key)
+    if catalog is None:
+        catalog = TemplateCatalog(fetcher, snapshot_path=default_snapshot_path(key))
+        _catalogs[key] = catalog
+    return catalog
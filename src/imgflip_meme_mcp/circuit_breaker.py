@@ -0,0 +1,176 @@
+"""Circuit breaker that fails fast while the Imgflip API is down."""
+
+import os
+import sys
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List, Tuple
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Called with (breaker name, old state, new state).
+TransitionListener = Callable[[str, str, str], None]
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling upstream while the circuit is open."""
+
+    def __init__(self, name: str, retry_in: float):
+        self.name = name
+        self.retry_in = retry_in
+        super().__init__(
+            f"{name} is unavailable; failing fast for another {retry_in:.0f}s"
+        )
+
+
+class CircuitBreaker:
+    """Closed/open/half-open breaker around calls to one upstream host.
+
+    After ``failure_threshold`` consecutive failures the circuit opens and
+    every call is rejected with :class:`CircuitOpenError` without touching the
+    network. Once ``recovery_time`` seconds have passed the circuit goes
+    half-open and lets up to ``probes`` calls through: a success closes it
+    again, a failure reopens it for another ``recovery_time``. A non-positive
+    ``failure_threshold`` disables the breaker.
+
+    Callers bracket each upstream call with :meth:`before_call` and one of
+    :meth:`on_success`, :meth:`on_failure` or :meth:`on_release`.
+    """
+
+    def __init__(
+        self,
+        name: str = "upstream",
+        failure_threshold: int = 5,
+        recovery_time: float = 30.0,
+        probes: int = 1,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_time = recovery_time
+        self.probes = max(1, probes)
+        self.state = CLOSED
+        self.failures = 0
+        self.rejected = 0
+        self.transitions: "Counter[Tuple[str, str]]" = Counter()
+        self._opened_at = 0.0
+        self._probing = 0
+        self._listeners: List[TransitionListener] = []
+
+    @classmethod
+    def from_env(cls, name: str) -> "CircuitBreaker":
+        """Build a breaker from ``IMGFLIP_BREAKER_*`` settings."""
+        return cls(
+            name=name,
+            failure_threshold=int(os.getenv("IMGFLIP_BREAKER_FAILURES", "5")),
+            recovery_time=float(os.getenv("IMGFLIP_BREAKER_RECOVERY", "30")),
+            probes=int(os.getenv("IMGFLIP_BREAKER_PROBES", "1")),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.failure_threshold > 0
+
+    def add_listener(self, listener: TransitionListener) -> None:
+        """Call ``listener`` on every state transition."""
+        self._listeners.append(listener)
+
+    def retry_in(self) -> float:
+        """Seconds until an open circuit lets a probe through."""
+        if self.state != OPEN:
+            return 0.0
+        return max(0.0, self._opened_at + self.recovery_time - time.monotonic())
+
+    def check(self) -> None:
+        """Raise :class:`CircuitOpenError` if a call would be rejected now.
+
+        Unlike :meth:`before_call` this does not take a probe slot, so it can
+        be used to fail fast before doing any other work.
+        """
+        if self.state == OPEN and self.retry_in() > 0:
+            self.rejected += 1
+            raise CircuitOpenError(self.name, self.retry_in())
+        if self.state == HALF_OPEN and self._probing >= self.probes:
+            self.rejected += 1
+            raise CircuitOpenError(self.name, 0.0)
+
+    def before_call(self) -> None:
+        """Admit one upstream call or raise :class:`CircuitOpenError`."""
+        if not self.enabled:
+            return
+        self.check()
+        if self.state == OPEN:
+            self._transition(HALF_OPEN)
+        if self.state == HALF_OPEN:
+            self._probing += 1
+
+    def on_success(self) -> None:
+        """Record that the upstream answered; closes a half-open circuit."""
+        self.failures = 0
+        if self.state == HALF_OPEN:
+            self._probing = max(0, self._probing - 1)
+            self._transition(CLOSED)
+
+    def on_failure(self) -> None:
+        """Record an upstream failure; may open the circuit."""
+        if not self.enabled:
+            return
+        self.failures += 1
+        if self.state == HALF_OPEN:
+            self._probing = max(0, self._probing - 1)
+            self._open()
+        elif self.state == CLOSED and self.failures >= self.failure_threshold:
+            self._open()
+
+    def on_release(self) -> None:
+        """End a call without an outcome, e.g. when it was cancelled."""
+        if self.state == HALF_OPEN:
+            self._probing = max(0, self._probing - 1)
+
+    def _open(self) -> None:
+        self._opened_at = time.monotonic()
+        self._transition(OPEN)
+
+    def _transition(self, state: str) -> None:
+        previous = self.state
+        if previous == state:
+            return
+        self.state = state
+        if state != HALF_OPEN:
+            self._probing = 0
+        self.transitions[(previous, state)] += 1
+        print(
+            f"Circuit breaker {self.name}: {previous} -> {state}",
+            file=sys.stderr,
+        )
+        for listener in self._listeners:
+            try:
+                listener(self.name, previous, state)
+            except Exception as e:
+                print(f"Error in circuit breaker listener: {e}", file=sys.stderr)
+
+    def stats(self) -> Dict[str, Any]:
+        """Current state, counters and transition counts."""
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "rejected": self.rejected,
+            "retry_in": self.retry_in(),
+            "transitions": {
+                f"{old}->{new}": count
+                for (old, new), count in sorted(self.transitions.items())
+            },
+        }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def get_circuit_breaker(key: str) -> CircuitBreaker:
+    """Return the process-wide circuit breaker for ``key``."""
+    breaker = _breakers.get(key)
+    if breaker is None:
+        breaker = CircuitBreaker.from_env(key)
+        _breakers[key] = breaker
+    return breaker
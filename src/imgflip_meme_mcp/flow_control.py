@@ -0,0 +1,262 @@
+"""Client-side rate limiting and adaptive concurrency for Imgflip calls."""
+
+import asyncio
+import contextlib
+import heapq
+import itertools
+import os
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from .metrics import stage
+
+# Lower values are served first.
+INTERACTIVE = 0
+BATCH = 10
+
+
+class TokenBucket:
+    """Token bucket allowing ``rate`` requests per second with bursts.
+
+    ``pause_until`` withholds every token until a deadline, as requested by a
+    ``Retry-After`` header. A non-positive ``rate`` disables the rate limit.
+    """
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+
+    def pause_until(self, deadline: float) -> None:
+        """Withhold tokens until the monotonic ``deadline``."""
+        self._paused_until = max(self._paused_until, deadline)
+
+    def try_acquire(self) -> float:
+        """Take a token and return 0, or return the seconds until one is due."""
+        now = time.monotonic()
+        if now < self._paused_until:
+            return self._paused_until - now
+        if self.rate <= 0:
+            return 0.0
+        elapsed = now - self._updated
+        self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+        self._updated = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+
+class AdaptiveConcurrencyLimiter:
+    """AIMD concurrency limit and rate limit behind one priority queue.
+
+    Each success raises the limit by about one per limit's worth of requests
+    (additive increase); an overload signal such as a 429 or timeout halves
+    it (multiplicative decrease), at most once per ``cooldown`` seconds.
+    A caller is admitted once a slot under the limit and a token from
+    ``bucket`` are both free; waiters are admitted lowest priority value
+    first, then in arrival order, so queued batch work never holds tokens
+    that an interactive call could use.
+    """
+
+    def __init__(
+        self,
+        initial: int = 8,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        backoff: float = 0.5,
+        cooldown: float = 1.0,
+        bucket: Optional[TokenBucket] = None,
+    ):
+        self.limit = float(max(min_limit, min(initial, max_limit)))
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.cooldown = cooldown
+        self.bucket = bucket
+        self.in_flight = 0
+        self._last_decrease = 0.0
+        self._waiters: List[Tuple[int, int, "asyncio.Future[None]"]] = []
+        self._sequence = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    @property
+    def queued(self) -> int:
+        """Number of callers waiting for admission."""
+        return sum(1 for _, _, future in self._waiters if not future.done())
+
+    def _take_token(self) -> float:
+        return self.bucket.try_acquire() if self.bucket is not None else 0.0
+
+    async def acquire(self, priority: int = INTERACTIVE) -> None:
+        """Wait for admission."""
+        if self.in_flight < int(self.limit) and not self.queued:
+            if self._take_token() == 0:
+                self.in_flight += 1
+                return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), future))
+        self._admit()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Admitted just as we were cancelled; hand the slot on.
+                self.release()
+            raise
+
+    def release(
+        self, success: Optional[bool] = None, overloaded: bool = False
+    ) -> None:
+        """Free a slot and adapt the limit to the outcome of the call."""
+        self.in_flight -= 1
+        if overloaded:
+            now = time.monotonic()
+            if now - self._last_decrease >= self.cooldown:
+                self.limit = max(float(self.min_limit), self.limit * self.backoff)
+                self._last_decrease = now
+        elif success:
+            self.limit = min(float(self.max_limit), self.limit + 1.0 / self.limit)
+        self._admit()
+
+    def _admit(self) -> None:
+        """Admit the highest-priority waiters while slots and tokens allow."""
+        waiters = self._waiters
+        while waiters and self.in_flight < int(self.limit):
+            if waiters[0][2].done():
+                heapq.heappop(waiters)
+                continue
+            delay = self._take_token()
+            if delay > 0:
+                self._schedule(delay)
+                return
+            _, _, future = heapq.heappop(waiters)
+            self.in_flight += 1
+            future.set_result(None)
+
+    def _schedule(self, delay: float) -> None:
+        """Retry admission once the next token is due."""
+        if self._timer is not None and not self._timer.cancelled():
+            if self._timer.when() <= asyncio.get_running_loop().time() + delay:
+                return
+            self._timer.cancel()
+        self._timer = asyncio.get_running_loop().call_later(delay, self._on_timer)
+
+    def _on_timer(self) -> None:
+        self._timer = None
+        self._admit()
+
+
+class Slot:
+    """One admitted upstream call; records its outcome for the limiter."""
+
+    def __init__(self) -> None:
+        self.success: Optional[bool] = None
+        self.overloaded = False
+
+    def ok(self) -> None:
+        self.success = True
+
+    def failed(self, overloaded: bool = False) -> None:
+        self.success = False
+        self.overloaded = overloaded
+
+
+class FlowController:
+    """Rate limit, adaptive concurrency and retry policy for one API host."""
+
+    def __init__(
+        self,
+        rate: float = 20.0,
+        burst: float = 40.0,
+        max_concurrency: int = 32,
+        max_retries: int = 3,
+        retry_base: float = 0.25,
+        retry_max: float = 10.0,
+    ):
+        self.bucket = TokenBucket(rate, burst)
+        self.limiter = AdaptiveConcurrencyLimiter(
+            initial=min(8, max_concurrency),
+            max_limit=max_concurrency,
+            bucket=self.bucket,
+        )
+        self.max_retries = max_retries
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.retries = 0
+        self.throttled = 0
+
+    @classmethod
+    def from_env(cls) -> "FlowController":
+        """Build a controller from ``IMGFLIP_RATE_*`` and related settings."""
+        return cls(
+            rate=float(os.getenv("IMGFLIP_RATE_LIMIT", "20")),
+            burst=float(os.getenv("IMGFLIP_RATE_BURST", "40")),
+            max_concurrency=int(os.getenv("IMGFLIP_MAX_CONCURRENCY", "32")),
+            max_retries=int(os.getenv("IMGFLIP_MAX_RETRIES", "3")),
+        )
+
+    @contextlib.asynccontextmanager
+    async def slot(self, priority: int = INTERACTIVE) -> AsyncIterator[Slot]:
+        """Admit one upstream call, waiting for concurrency and rate budget."""
+        with stage("queue"):
+            await self.limiter.acquire(priority)
+        slot = Slot()
+        try:
+            yield slot
+        finally:
+            self.limiter.release(slot.success, slot.overloaded)
+
+    def throttle(self, retry_after: Optional[float]) -> None:
+        """Record a 429/503 and pause all callers for ``retry_after`` seconds."""
+        self.throttled += 1
+        if retry_after:
+            self.bucket.pause_until(time.monotonic() + retry_after)
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Delay before retry ``attempt`` (1-based): Retry-After or full jitter."""
+        if retry_after is not None:
+            return min(self.retry_max, retry_after)
+        ceiling = min(self.retry_max, self.retry_base * 2 ** (attempt - 1))
+        return random.uniform(0, ceiling)
+
+    def stats(self) -> Dict[str, float]:
+        """Current limiter state and retry counters."""
+        return {
+            "concurrency_limit": self.limiter.limit,
+            "in_flight": self.limiter.in_flight,
+            "queued": self.limiter.queued,
+            "retries": self.retries,
+            "throttled": self.throttled,
+        }
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a ``Retry-After`` header (delta-seconds or date)."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+_controllers: Dict[str, FlowController] = {}
+
+
+def get_flow_controller(key: str) -> FlowController:
+    """Return the process-wide flow controller for ``key``."""
+    controller = _controllers.get(key)
+    if controller is None:
+        controller = FlowController.from_env()
+        _controllers[key] = controller
+    return controller
@@ -0,0 +1,286 @@
+"""Candidate-pruned fuzzy matching of hints against template names."""
+
+import heapq
+import itertools
+import os
+from collections import Counter
+from difflib import SequenceMatcher
+from typing import FrozenSet, List, Optional, Sequence, Tuple
+
+from .offload import CancelToken
+from .template_index import TemplateIndex, tokenize, trigrams
+
+SUBSTRING_SCORE = 0.9
+SEQUENCE_WEIGHT = 0.6
+WORD_WEIGHT = 0.4
+
+# Catalog size from which candidates are ranked with NumPy (when installed).
+VECTOR_THRESHOLD = int(os.getenv("IMGFLIP_VECTOR_THRESHOLD", "5000"))
+
+
+def word_overlap(hint_words: FrozenSet[str], template_words: FrozenSet[str]) -> float:
+    """Jaccard similarity of two word sets."""
+    if hint_words and template_words:
+        return len(hint_words & template_words) / len(hint_words | template_words)
+    return 0.0
+
+
+def similarity(
+    hint: str,
+    hint_words: FrozenSet[str],
+    template_name: str,
+    template_words: FrozenSet[str],
+) -> float:
+    """Score a normalized hint against a lowercased template name."""
+    # Direct substring match gets high score
+    if hint in template_name or template_name in hint:
+        return SUBSTRING_SCORE
+
+    sequence_score = SequenceMatcher(None, hint, template_name).ratio()
+    word_score = word_overlap(hint_words, template_words)
+    return SEQUENCE_WEIGHT * sequence_score + WORD_WEIGHT * word_score
+
+
+class FuzzyMatcher:
+    """Finds the best-scoring template without scoring the whole catalog.
+
+    Candidates are shortlisted from the index: the first template whose name
+    contains the hint or is contained in it, plus the templates with the best
+    character-trigram Dice coefficient and the best word overlap with the
+    hint. Catalogs of ``VECTOR_THRESHOLD`` templates or more rank candidates
+    by TF-IDF cosine over the same trigrams and words instead, scored for the
+    whole catalog in one NumPy operation (see :mod:`.vector_index`). The
+    shortlist is then scored with :func:`similarity`, skipping
+    ``SequenceMatcher`` whenever its cheap upper bounds show a candidate
+    cannot beat the current best.
+    """
+
+    def __init__(self, index: TemplateIndex, shortlist_size: int = 64):
+        self.index = index
+        self.shortlist_size = shortlist_size
+        self.vectors = index.vectors() if len(index) >= VECTOR_THRESHOLD else None
+
+    def shortlist(self, hint: str, hint_words: FrozenSet[str]) -> List[int]:
+        """Candidate positions for ``hint``, most similar first."""
+        return self._with_substring_match(hint, self._ranked(hint, hint_words))
+
+    def _ranked(self, hint: str, hint_words: FrozenSet[str]) -> List[int]:
+        if self.vectors is not None:
+            return self.vectors.top(hint, hint_words, 2 * self.shortlist_size)
+        return self._ranked_by_postings(hint, hint_words)
+
+    def _ranked_by_postings(
+        self, hint: str, hint_words: FrozenSet[str]
+    ) -> List[int]:
+        """Best trigram Dice and word overlap candidates, counted from postings."""
+        index = self.index
+        hint_grams = trigrams(hint)
+        counts: Counter = Counter()
+        for gram in hint_grams:
+            counts.update(index.trigram_postings.get(gram, ()))
+        word_counts: Counter = Counter()
+        for word in hint_words:
+            word_counts.update(index.postings.get(word, ()))
+
+        # Rank by trigram Dice coefficient and, separately, by word overlap,
+        # mirroring the two components of similarity().
+        grams = len(hint_grams)
+        gram_counts = index.trigram_counts
+        by_trigrams = heapq.nlargest(
+            self.shortlist_size,
+            counts,
+            key=lambda p: (2 * counts[p] / (grams + gram_counts[p]), -p),
+        )
+        words = len(hint_words)
+        tokens = index.tokens
+        by_words = heapq.nlargest(
+            self.shortlist_size,
+            word_counts,
+            key=lambda p: (
+                word_counts[p] / (words + len(tokens[p]) - word_counts[p]), -p
+            ),
+        )
+        return list(dict.fromkeys(by_trigrams + by_words))
+
+    def _with_substring_match(self, hint: str, candidates: List[int]) -> List[int]:
+        """``candidates`` with the first substring match, if any, in front."""
+        index = self.index
+        # Every substring match scores the same, so only the first can win.
+        substring_positions = [
+            position
+            for position in (
+                next(index.iter_substring_positions(hint), None),
+                min(index.names_within(hint), default=None),
+            )
+            if position is not None
+        ]
+        if substring_positions:
+            substring = min(substring_positions)
+            if substring not in candidates:
+                candidates.insert(0, substring)
+        return candidates
+
+    def best_match(
+        self,
+        hint: str,
+        threshold: float = 0.3,
+        token: Optional[CancelToken] = None,
+    ) -> Optional[Tuple[float, int]]:
+        """Return ``(score, position)`` of the best template above ``threshold``.
+
+        Ties go to the template that appears first in the catalog. ``token``
+        is checked between the shortlist and the scoring pass.
+        """
+        index = self.index
+        if not len(index):
+            return None
+
+        hint_words = tokenize(hint)
+        candidates = self.shortlist(hint, hint_words)
+        if token is not None:
+            token.check()
+        return self._best_of(hint, hint_words, candidates, threshold)
+
+    def best_matches(
+        self,
+        hints: Sequence[str],
+        threshold: float = 0.3,
+        token: Optional[CancelToken] = None,
+    ) -> List[Optional[Tuple[float, int]]]:
+        """:meth:`best_match` for each of ``hints``.
+
+        Hints are scored one at a time: a catalog-wide score vector per hint
+        stays cache-sized, where a matrix of several was measured slower.
+        """
+        return [self.best_match(hint, threshold, token) for hint in hints]
+
+    def _best_of(
+        self,
+        hint: str,
+        hint_words: FrozenSet[str],
+        candidates: List[int],
+        threshold: float,
+    ) -> Optional[Tuple[float, int]]:
+        """Exact best ``(score, position)`` among ``candidates``."""
+        index = self.index
+        best_score = threshold
+        best_position: Optional[int] = None
+        for position in candidates:
+            name = index.names[position]
+            template_words = index.tokens[position]
+            if hint in name or name in hint:
+                score = SUBSTRING_SCORE
+            else:
+                word_score = word_overlap(hint_words, template_words)
+                matcher = SequenceMatcher(None, hint, name)
+                word_part = WORD_WEIGHT * word_score
+                # real_quick_ratio >= quick_ratio >= ratio, cheapest first.
+                if not self._beats(
+                    SEQUENCE_WEIGHT * matcher.real_quick_ratio() + word_part,
+                    position, best_score, best_position,
+                ) or not self._beats(
+                    SEQUENCE_WEIGHT * matcher.quick_ratio() + word_part,
+                    position, best_score, best_position,
+                ):
+                    continue
+                score = SEQUENCE_WEIGHT * matcher.ratio() + word_part
+            if self._beats(score, position, best_score, best_position):
+                best_score, best_position = score, position
+
+        if best_position is None:
+            return None
+        return best_score, best_position
+
+    def top_matches(
+        self,
+        query: str,
+        count: int,
+        threshold: float = 0.3,
+        token: Optional[CancelToken] = None,
+    ) -> List[Tuple[float, int]]:
+        """The ``count`` best ``(score, position)`` pairs for ``query``, best first.
+
+        Ranks substring matches and fuzzy matches scoring above ``threshold``
+        together. Equal scores go to the name closest in length to the query,
+        so an exact name beats longer names that merely contain it, and then
+        to the earlier template. Fuzzy candidates come from the fixed-size
+        shortlist of :meth:`shortlist`, so the ranked set does not depend on
+        ``count`` and a smaller ``count`` always gives a prefix of a larger
+        one. The best ``count`` are kept in a bounded heap, skipping
+        ``SequenceMatcher`` for candidates whose upper bound cannot enter it.
+        """
+        index = self.index
+        if count <= 0 or not len(index):
+            return []
+        names = index.names
+
+        def rank(score: float, position: int) -> Tuple[float, int, int]:
+            return (score, -abs(len(names[position]) - len(query)), -position)
+
+        # Min-heap of rank() tuples: the worst kept match is on top.
+        heap: List[Tuple[float, int, int]] = []
+        seen = set()
+
+        def offer(score: float, position: int) -> None:
+            item = rank(score, position)
+            if len(heap) < count:
+                heapq.heappush(heap, item)
+            elif item > heap[0]:
+                heapq.heapreplace(heap, item)
+
+        def can_enter(score: float, position: int) -> bool:
+            return len(heap) < count or rank(score, position) > heap[0]
+
+        # Substring matches all score the same, and names containing the
+        # query are never shorter than it, so only the ``count`` shortest of
+        # those can rank.
+        substrings = itertools.chain(
+            itertools.islice(
+                index.iter_substring_positions(query, shortest_first=True), count
+            ),
+            index.names_within(query),
+        )
+        for position in substrings:
+            if position not in seen:
+                seen.add(position)
+                offer(SUBSTRING_SCORE, position)
+
+        query_words = tokenize(query)
+        for checked, position in enumerate(self._ranked(query, query_words)):
+            if token is not None and checked % 64 == 0:
+                token.check()
+            if position in seen:
+                continue
+            seen.add(position)
+            name = index.names[position]
+            if query in name or name in query:
+                offer(SUBSTRING_SCORE, position)
+                continue
+            word_part = WORD_WEIGHT * word_overlap(query_words, index.tokens[position])
+            matcher = SequenceMatcher(None, query, name)
+            if not can_enter(
+                SEQUENCE_WEIGHT * matcher.real_quick_ratio() + word_part, position
+            ) or not can_enter(
+                SEQUENCE_WEIGHT * matcher.quick_ratio() + word_part, position
+            ):
+                continue
+            score = SEQUENCE_WEIGHT * matcher.ratio() + word_part
+            if score > threshold:
+                offer(score, position)
+
+        return [
+            (score, -negative) for score, _, negative in sorted(heap, reverse=True)
+        ]
+
+    @staticmethod
+    def _beats(
+        score: float, position: int, best_score: float, best_position: Optional[int]
+    ) -> bool:
+        """Whether ``score`` at ``position`` outranks the current best."""
+        if score > best_score:
+            return True
+        return (
+            score == best_score
+            and best_position is not None
+            and position < best_position
+        )
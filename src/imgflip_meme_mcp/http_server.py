@@ -0,0 +1,201 @@
+"""Streamable HTTP and SSE transports serving many MCP sessions in one process."""
+
+import contextlib
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import time
+from typing import Any, AsyncIterator, Callable, Dict, Optional, Tuple
+
+from mcp.server.lowlevel import Server
+from mcp.server.sse import SseServerTransport
+from mcp.server.streamable_http_manager import StreamableHTTPSessionManager
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.routing import Mount, Route
+from starlette.types import Receive, Scope, Send
+
+from .metrics import get_metrics
+
+
+class _StreamableHTTPEndpoint:
+    """ASGI endpoint handing requests to the session manager."""
+
+    def __init__(self, manager: StreamableHTTPSessionManager):
+        self.manager = manager
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await self.manager.handle_request(scope, receive, send)
+
+
+def build_http_app(
+    app: Server, json_response: bool = False, stateless: bool = False
+) -> Starlette:
+    """ASGI app serving ``app`` to any number of concurrent clients.
+
+    Routes:
+
+    - ``/mcp``: streamable HTTP transport
+    - ``/sse`` and ``/messages/``: legacy SSE transport
+    - ``/metrics``: Prometheus metrics; ``/debug/slow``: slowest tool calls
+    - ``/healthz``: liveness check
+
+    All sessions share the process-wide catalog, caches and connection pool.
+    """
+    manager = StreamableHTTPSessionManager(
+        app=app, json_response=json_response, stateless=stateless
+    )
+    sse = SseServerTransport("/messages/")
+
+    async def handle_sse(request: Request) -> Response:
+        async with sse.connect_sse(
+            request.scope, request.receive, request._send
+        ) as (read_stream, write_stream):
+            await app.run(
+                read_stream, write_stream, app.create_initialization_options()
+            )
+        return Response()
+
+    async def metrics(request: Request) -> Response:
+        return Response(
+            get_metrics().registry.render(),
+            media_type="text/plain; version=0.0.4",
+        )
+
+    async def slow_requests(request: Request) -> Response:
+        return Response(
+            json.dumps(get_metrics().slow_log.slowest(), indent=2),
+            media_type="application/json",
+        )
+
+    async def healthz(request: Request) -> Response:
+        return Response("ok", media_type="text/plain")
+
+    @contextlib.asynccontextmanager
+    async def lifespan(_: Any) -> AsyncIterator[None]:
+        async with manager.run():
+            yield
+
+    return Starlette(
+        routes=[
+            Route("/mcp", endpoint=_StreamableHTTPEndpoint(manager)),
+            Route("/sse", endpoint=handle_sse, methods=["GET"]),
+            Mount("/messages/", app=sse.handle_post_message),
+            Route("/metrics", endpoint=metrics, methods=["GET"]),
+            Route("/debug/slow", endpoint=slow_requests, methods=["GET"]),
+            Route("/healthz", endpoint=healthz, methods=["GET"]),
+        ],
+        lifespan=lifespan,
+    )
+
+
+async def serve_http(
+    app: Server,
+    host: str,
+    port: int,
+    json_response: bool = False,
+    stateless: bool = False,
+    sock: Optional[socket.socket] = None,
+) -> None:
+    """Serve ``app`` over HTTP until cancelled, on ``sock`` if given."""
+    import uvicorn
+
+    config = uvicorn.Config(
+        build_http_app(app, json_response=json_response, stateless=stateless),
+        host=host,
+        port=port,
+        log_level="warning",
+    )
+    await uvicorn.Server(config).serve(sockets=[sock] if sock is not None else None)
+
+
+def worker_environment(workers: int) -> Dict[str, str]:
+    """Environment defaults that let ``workers`` processes share state.
+
+    Hint resolutions and generated memes go to SQLite files in the cache
+    directory unless configured otherwise, and the upstream rate limit and
+    burst are split between the workers so their sum stays as configured.
+    """
+    from .snapshot import default_cache_dir
+
+    env: Dict[str, str] = {}
+    cache_dir = default_cache_dir()
+    if cache_dir is not None:
+        if "IMGFLIP_HINT_CACHE_PATH" not in os.environ:
+            env["IMGFLIP_HINT_CACHE_PATH"] = os.path.join(cache_dir, "hints.sqlite")
+        if "IMGFLIP_RESULT_CACHE_PATH" not in os.environ:
+            env["IMGFLIP_RESULT_CACHE_PATH"] = os.path.join(cache_dir, "memes.sqlite")
+    for name, default in (("IMGFLIP_RATE_LIMIT", "20"), ("IMGFLIP_RATE_BURST", "40")):
+        total = float(os.getenv(name, default))
+        env[name] = repr(total / workers) if total > 0 else repr(total)
+    return env
+
+
+def run_workers(
+    workers: int,
+    host: str,
+    port: int,
+    target: Callable[..., None],
+    args: Tuple[Any, ...],
+) -> None:
+    """Pre-bind ``host:port`` and serve it from ``workers`` processes.
+
+    Each worker is a fresh interpreter (spawned, not forked, so no event loop,
+    connection or SQLite handle crosses processes) that runs
+    ``target(sock, number, *args)`` on the shared listening socket, where
+    ``number`` is the worker's index from 0; the kernel spreads
+    connections between them. Workers that exit unexpectedly are restarted.
+    Returns after SIGINT or SIGTERM once all workers have stopped.
+    """
+    sock = socket.create_server((host, port))
+    sock.set_inheritable(True)
+    os.environ.update(worker_environment(workers))
+    context = multiprocessing.get_context("spawn")
+    processes: Dict[int, Any] = {}
+    stopping = False
+
+    def start(number: int) -> None:
+        process = context.Process(
+            target=target,
+            args=(sock, number) + args,
+            name=f"imgflip-worker-{number}",
+        )
+        process.start()
+        processes[number] = process
+
+    def stop(signum: int, frame: Any) -> None:
+        nonlocal stopping
+        stopping = True
+
+    previous = {
+        signum: signal.signal(signum, stop)
+        for signum in (signal.SIGINT, signal.SIGTERM)
+    }
+    print(
+        f"Serving on http://{host}:{port} with {workers} workers", file=sys.stderr
+    )
+    try:
+        for number in range(workers):
+            start(number)
+        while not stopping:
+            time.sleep(0.5)
+            for number, process in list(processes.items()):
+                if not process.is_alive() and not stopping:
+                    print(
+                        f"Worker {number} exited with {process.exitcode}; restarting",
+                        file=sys.stderr,
+                    )
+                    start(number)
+    finally:
+        for process in processes.values():
+            if process.is_alive():
+                process.terminate()
+        for process in processes.values():
+            process.join(10)
+        for signum, handler in previous.items():
+            signal.signal(signum, handler)
+        sock.close()
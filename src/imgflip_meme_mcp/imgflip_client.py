@@ -1,12 +1,31 @@
 """Imgflip API client for meme generation."""
 
-import os
 import asyncio
-from typing import Dict, List, Optional, Any
-import requests
-from dotenv import load_dotenv
+import os
+from typing import TYPE_CHECKING, AsyncIterator, Dict, List, Optional, Any, Tuple
+import httpx
+
+from .catalog import TemplateCatalog, get_catalog
+from .circuit_breaker import CircuitBreaker, CircuitOpenError, get_circuit_breaker
+from .flow_control import (
+    BATCH,
+    INTERACTIVE,
+    FlowController,
+    get_flow_controller,
+    parse_retry_after,
+)
+from .ingest import CatalogBuilder, TemplateSources, to_records
+from .metrics import upstream_call
+from .result_cache import MemeResultCache, caption_key, get_result_cache
+from .snapshot import CatalogSnapshot, content_hash
+from .transport import HttpTransport, get_transport
+
+if TYPE_CHECKING:
+    from .render import MemeRenderer
 
-load_dotenv()
+# imgflip: always /caption_image; local: draw with Pillow; auto: /caption_image,
+# rendering locally when the API cannot be reached.
+RENDER_MODES = ("imgflip", "local", "auto")
 
 
 class ImgflipClient:
@@ -14,78 +33,326 @@ class ImgflipClient:
     
     BASE_URL = "https://api.imgflip.com"
     
-    def __init__(self):
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        transport: Optional[HttpTransport] = None,
+        catalog: Optional[TemplateCatalog] = None,
+        result_cache: Optional[MemeResultCache] = None,
+        flow: Optional[FlowController] = None,
+        breaker: Optional[CircuitBreaker] = None,
+        sources: Optional[TemplateSources] = None,
+        renderer: Optional["MemeRenderer"] = None,
+    ):
         self.username = os.getenv("IMGFLIP_USERNAME")
         self.password = os.getenv("IMGFLIP_PASSWORD")
-        self._template_cache = None
+        self.base_url = base_url or os.getenv("IMGFLIP_API_URL") or self.BASE_URL
+        self.transport = transport or get_transport(self.base_url)
+        self.flow = flow or get_flow_controller(self.base_url)
+        self.breaker = breaker or get_circuit_breaker(self.base_url)
+        self.catalog = catalog or get_catalog(self.base_url, self._fetch_templates)
+        self.result_cache = result_cache or get_result_cache()
+        # Templates merged into the catalog besides the API's
+        self.sources = sources if sources is not None else TemplateSources.from_env()
+        # Local renderer, loaded on first use since Pillow is optional
+        self.renderer = renderer
+        self.render_mode = os.getenv("IMGFLIP_RENDER_MODE", "auto")
+        self._inflight_captions: Dict[str, "asyncio.Task[Dict[str, Any]]"] = {}
     
     async def get_popular_templates(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
         """Get popular meme templates from Imgflip."""
-        if self._template_cache is None:
-            await self._fetch_templates()
-        
-        templates = self._template_cache or []
+        templates = await self.catalog.get()
         if limit:
             templates = templates[:limit]
         
         return templates
     
-    async def _fetch_templates(self) -> None:
-        """Fetch templates from Imgflip API and cache them."""
-        try:
-            loop = asyncio.get_event_loop()
-            response = await loop.run_in_executor(
-                None, 
-                lambda: requests.get(f"{self.BASE_URL}/get_memes", timeout=10)
+    async def _fetch_templates(
+        self, current: Optional[CatalogSnapshot] = None
+    ) -> Optional[CatalogSnapshot]:
+        """Fetch templates from the Imgflip API, raising on failure.
+        
+        Returns None when the catalog is unchanged since ``current``, either
+        because the server answered 304 or because the body hash matches.
+        Templates from ``self.sources`` are merged in after the API's; local
+        sources that changed force a full rebuild, and remote ones are read
+        on every refresh.
+        """
+        fingerprint = self.sources.fingerprint() if self.sources else None
+        if self.sources.has_urls or (
+            current is not None and current.sources != fingerprint
+        ):
+            current = None
+        
+        headers = {}
+        if current is not None:
+            if current.etag:
+                headers["If-None-Match"] = current.etag
+            if current.last_modified:
+                headers["If-Modified-Since"] = current.last_modified
+        
+        response = await self._request(
+            "GET", "/get_memes", idempotent=True, headers=headers, timeout=10
+        )
+        if response.status_code == 304 and current is not None:
+            return None
+        response.raise_for_status()
+        
+        body_hash = content_hash(response.content)
+        if fingerprint is not None:
+            body_hash = content_hash(f"{body_hash}:{fingerprint}".encode())
+        if current is not None and current.content_hash == body_hash:
+            return None
+        
+        data = response.json()
+        if not data.get("success"):
+            raise ValueError(data.get("error_message", "get_memes was not successful"))
+        builder = CatalogBuilder()
+        builder.add(to_records(data["data"]["memes"]))
+        if self.sources:
+            await self.sources.merge_into(builder)
+        return CatalogSnapshot(
+            templates=builder.templates,
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+            content_hash=body_hash,
+            sources=fingerprint,
+        )
+    
+    async def _request(
+        self,
+        method: str,
+        path: str,
+        priority: int = INTERACTIVE,
+        idempotent: bool = False,
+        **kwargs: Any,
+    ) -> httpx.Response:
+        """Send a request through the flow controller, retrying when safe.
+        
+        Throttled responses (429/503) are retried after their Retry-After for
+        any request, since the server did not act on them. Network errors and
+        other 5xx responses are only retried for idempotent requests.
+        
+        Network errors and 5xx responses count as failures for the circuit
+        breaker; while it is open this raises CircuitOpenError immediately.
+        """
+        attempt = 0
+        while True:
+            attempt += 1
+            can_retry = attempt <= self.flow.max_retries
+            retry_after = None
+            self.breaker.before_call()
+            healthy: Optional[bool] = None
+            try:
+                async with self.flow.slot(priority) as slot:
+                    try:
+                        with upstream_call(method, path) as call:
+                            response = await self.transport.request(
+                                method, path, **kwargs
+                            )
+                            call.status = str(response.status_code)
+                    except httpx.TransportError:
+                        healthy = False
+                        slot.failed(overloaded=True)
+                        if not (idempotent and can_retry):
+                            raise
+                    else:
+                        status = response.status_code
+                        healthy = status < 500
+                        if status in (429, 503):
+                            retry_after = parse_retry_after(
+                                response.headers.get("Retry-After")
+                            )
+                            self.flow.throttle(retry_after)
+                            slot.failed(overloaded=True)
+                            if not can_retry:
+                                return response
+                        elif status >= 500:
+                            slot.failed()
+                            if not (idempotent and can_retry):
+                                return response
+                        else:
+                            slot.ok()
+                            return response
+            finally:
+                if healthy is None:
+                    self.breaker.on_release()
+                elif healthy:
+                    self.breaker.on_success()
+                else:
+                    self.breaker.on_failure()
+            self.flow.retries += 1
+            await asyncio.sleep(self.flow.backoff(attempt, retry_after))
+    
+    async def aclose(self) -> None:
+        """Close pooled upstream connections."""
+        await self.transport.aclose()
+    
+    async def generate_meme(
+        self,
+        template_id: str,
+        top_text: str,
+        bottom_text: str = "",
+        priority: int = INTERACTIVE,
+        render: Optional[str] = None,
+        inline: bool = False,
+    ) -> Dict[str, Any]:
+        """Generate a meme with the Imgflip API or the local renderer.
+        
+        ``render`` is one of RENDER_MODES, ``self.render_mode`` by default.
+        In ``auto`` mode a meme the API could not caption because it is
+        unreachable, failing or not configured is rendered locally instead.
+        ``inline`` adds the image itself to local renders.
+        """
+        mode = render or self.render_mode
+        if mode not in RENDER_MODES:
+            raise ValueError(f"Unknown render mode: {mode!r}")
+        if mode == "local":
+            return await self.render_meme(template_id, top_text, bottom_text, inline)
+        
+        result = await self._caption(template_id, top_text, bottom_text, priority)
+        if (
+            mode == "auto"
+            and result.get("upstream_unavailable")
+            and self.local_renderer() is not None
+        ):
+            rendered = await self.render_meme(
+                template_id, top_text, bottom_text, inline
             )
-            response.raise_for_status()
-            
-            data = response.json()
-            if data.get("success"):
-                self._template_cache = data["data"]["memes"]
-            else:
-                self._template_cache = []
+            if rendered["success"]:
+                rendered["data"]["fallback_reason"] = result["error_message"]
+                return rendered
+        return result
+    
+    def local_renderer(self) -> Optional["MemeRenderer"]:
+        """The local renderer, or None when Pillow is not installed."""
+        if self.renderer is None:
+            try:
+                from .render import get_renderer
+            except ImportError:
+                return None
+            self.renderer = get_renderer()
+        return self.renderer
+    
+    async def render_meme(
+        self,
+        template_id: str,
+        top_text: str,
+        bottom_text: str = "",
+        inline: bool = False,
+    ) -> Dict[str, Any]:
+        """Render a meme locally from the cached template image."""
+        renderer = self.local_renderer()
+        if renderer is None:
+            return {
+                "success": False,
+                "error_message": (
+                    "Local rendering needs Pillow; install the render extra."
+                ),
+            }
+        try:
+            index = await self.catalog.get_index()
+            template = index.get(template_id)
+            if template is None:
+                return {
+                    "success": False,
+                    "error_message": f"Unknown template id {template_id}",
+                }
+            renderer.warm(index.templates)
+            data = await renderer.render(template, top_text, bottom_text, inline)
         except Exception as e:
-            print(f"Error fetching templates: {e}")
-            self._template_cache = []
+            return {
+                "success": False,
+                "error_message": f"Local rendering failed: {str(e)}",
+            }
+        return {"success": True, "data": data}
     
-    async def generate_meme(self, template_id: str, top_text: str, bottom_text: str = "") -> Dict[str, Any]:
-        """Generate a meme using the Imgflip API."""
+    async def _caption(
+        self,
+        template_id: str,
+        top_text: str,
+        bottom_text: str,
+        priority: int,
+    ) -> Dict[str, Any]:
+        """Caption a meme with the Imgflip API, sharing identical requests."""
         if not self.username or not self.password:
             return {
                 "success": False,
-                "error_message": "Imgflip credentials not configured. Please set IMGFLIP_USERNAME and IMGFLIP_PASSWORD environment variables."
+                "error_message": "Imgflip credentials not configured. Please set IMGFLIP_USERNAME and IMGFLIP_PASSWORD environment variables.",
+                "upstream_unavailable": True,
             }
         
+        key = caption_key(self.username, template_id, top_text, bottom_text)
+        cached = self.result_cache.get(key)
+        if cached is not None:
+            return {"success": True, "data": cached}
+        
         try:
-            loop = asyncio.get_event_loop()
-            response = await loop.run_in_executor(
-                None,
-                lambda: requests.post(
-                    f"{self.BASE_URL}/caption_image",
-                    data={
-                        "template_id": template_id,
-                        "username": self.username,
-                        "password": self.password,
-                        "text0": top_text,
-                        "text1": bottom_text
-                    },
-                    timeout=30
-                )
+            self.breaker.check()
+        except CircuitOpenError as e:
+            return self._circuit_open_result(e)
+        
+        # Identical concurrent requests share a single upstream call
+        task = self._inflight_captions.get(key)
+        if task is None or task.get_loop() is not asyncio.get_running_loop():
+            task = asyncio.ensure_future(
+                self._caption_image(key, template_id, top_text, bottom_text, priority)
+            )
+            self._inflight_captions[key] = task
+            task.add_done_callback(lambda _: self._inflight_captions.pop(key, None))
+        result = await asyncio.shield(task)
+        return dict(result)
+    
+    async def _caption_image(
+        self,
+        key: str,
+        template_id: str,
+        top_text: str,
+        bottom_text: str,
+        priority: int,
+    ) -> Dict[str, Any]:
+        """POST to /caption_image and cache a successful result."""
+        try:
+            response = await self._request(
+                "POST",
+                "/caption_image",
+                priority=priority,
+                data={
+                    "template_id": template_id,
+                    "username": self.username,
+                    "password": self.password,
+                    "text0": top_text,
+                    "text1": bottom_text
+                },
+                timeout=30
             )
             response.raise_for_status()
             
-            return response.json()
+            result = response.json()
+            if result.get("success"):
+                self.result_cache.set(key, result["data"])
+            return result
         
-        except requests.exceptions.Timeout:
+        except CircuitOpenError as e:
+            return self._circuit_open_result(e)
+        except httpx.TimeoutException:
             return {
                 "success": False,
-                "error_message": "Request timed out. Please try again."
+                "error_message": "Request timed out. Please try again.",
+                "upstream_unavailable": True,
             }
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPStatusError as e:
+            status = e.response.status_code
             return {
                 "success": False,
-                "error_message": f"Network error: {str(e)}"
+                "error_message": f"Network error: {str(e)}",
+                "upstream_unavailable": status >= 500 or status == 429,
+            }
+        except httpx.HTTPError as e:
+            return {
+                "success": False,
+                "error_message": f"Network error: {str(e)}",
+                "upstream_unavailable": True,
             }
         except Exception as e:
             return {
@@ -93,30 +360,76 @@ class ImgflipClient:
                 "error_message": f"Unexpected error: {str(e)}"
             }
     
-    async def search_templates(self, query: str) -> List[Dict[str, Any]]:
-        """Search for templates by name (basic implementation)."""
-        if self._template_cache is None:
-            await self._fetch_templates()
-        
-        if not self._template_cache:
-            return []
+    @staticmethod
+    def _circuit_open_result(error: CircuitOpenError) -> Dict[str, Any]:
+        """Error result for a caption request rejected by the circuit breaker."""
+        return {
+            "success": False,
+            "error_message": (
+                f"Imgflip API is unavailable after repeated failures; "
+                f"try again in {max(1, round(error.retry_in))}s. "
+                "Template search still works from the cached catalog."
+            ),
+            "upstream_unavailable": True,
+        }
+    
+    async def generate_memes_batch(
+        self,
+        requests: List[Dict[str, str]],
+        concurrency: Optional[int] = None,
+        render: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """Generate several memes concurrently, returning results in order.
         
-        query_lower = query.lower()
-        matching_templates = []
+        Each request has ``template_id``, ``top_text`` and optional
+        ``bottom_text``. Failures are reported per item, like generate_meme.
+        """
+        results: List[Dict[str, Any]] = [{} for _ in requests]
+        async for position, result in self.iter_memes_batch(
+            requests, concurrency, render
+        ):
+            results[position] = result
+        return results
+    
+    async def iter_memes_batch(
+        self,
+        requests: List[Dict[str, str]],
+        concurrency: Optional[int] = None,
+        render: Optional[str] = None,
+    ) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+        """Yield ``(position, result)`` for a batch as each meme finishes."""
+        if concurrency is None:
+            concurrency = int(os.getenv("IMGFLIP_BATCH_CONCURRENCY", "8"))
+        semaphore = asyncio.Semaphore(max(1, concurrency))
         
-        for template in self._template_cache:
-            if query_lower in template["name"].lower():
-                matching_templates.append(template)
+        async def generate(
+            position: int, request: Dict[str, str]
+        ) -> Tuple[int, Dict[str, Any]]:
+            async with semaphore:
+                return position, await self.generate_meme(
+                    template_id=request["template_id"],
+                    top_text=request["top_text"],
+                    bottom_text=request.get("bottom_text") or "",
+                    priority=BATCH,
+                    render=render,
+                )
         
-        return matching_templates
+        tasks = [
+            asyncio.ensure_future(generate(position, request))
+            for position, request in enumerate(requests)
+        ]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+    
+    async def search_templates(self, query: str) -> List[Dict[str, Any]]:
+        """Search for templates whose name contains ``query``."""
+        index = await self.catalog.get_index()
+        return index.substring_search(query.lower())
     
     def get_template_by_id(self, template_id: str) -> Optional[Dict[str, Any]]:
-        """Get a specific template by ID."""
-        if not self._template_cache:
-            return None
-        
-        for template in self._template_cache:
-            if template["id"] == template_id:
-                return template
-        
-        return None
\ No newline at end of file
+        """Get a specific template by ID from the cached catalog."""
+        return self.catalog.index.get(template_id)
\ No newline at end of file
@@ -0,0 +1,353 @@
+"""Merging template sources into one compact catalog.
+
+Besides the templates ``/get_memes`` returns, the catalog can take templates
+from local dumps (JSON, JSON Lines or CSV files), from URLs fetched page by
+page, and from user-supplied custom templates. Files are parsed incrementally
+and every source feeds a single :class:`CatalogBuilder`, which dedupes by id
+as records arrive, so no per-source lists are built along the way.
+"""
+
+import asyncio
+import csv
+import hashlib
+import io
+import json
+import os
+import re
+import sys
+from collections.abc import Mapping
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, List, Sequence
+
+from .alias_registry import expand_paths
+
+TEMPLATE_FILE_EXTENSIONS = (".json", ".jsonl", ".ndjson", ".csv")
+
+# Characters read at a time when streaming a JSON array.
+_CHUNK_SIZE = 1 << 16
+
+# What may follow a truncated number up to the end of the buffer.
+_NUMBER_TAIL = re.compile(r"[0-9eE+\-.]*\Z")
+
+
+class TemplateRecord(Mapping):
+    """One meme template, stored in slots instead of a per-template dict.
+
+    Reads like the ``/get_memes`` dicts it replaces (``record["name"]``,
+    ``record.get("url")``, ``dict(record)``) at a fraction of the memory.
+    """
+
+    __slots__ = ("id", "name", "url", "width", "height", "box_count", "captions")
+
+    def __init__(
+        self,
+        id: str,
+        name: str,
+        url: str = "",
+        width: int = 0,
+        height: int = 0,
+        box_count: int = 2,
+        captions: int = 0,
+    ):
+        self.id = id
+        self.name = name
+        self.url = url
+        self.width = width
+        self.height = height
+        self.box_count = box_count
+        self.captions = captions
+
+    @classmethod
+    def from_mapping(cls, data: Mapping) -> "TemplateRecord":
+        """Build a record from a template dict; raises ValueError if invalid."""
+        if isinstance(data, TemplateRecord):
+            return data
+        try:
+            template_id = str(data["id"]).strip()
+            name = str(data["name"]).strip()
+            return cls(
+                template_id,
+                name,
+                str(data.get("url") or ""),
+                int(data.get("width") or 0),
+                int(data.get("height") or 0),
+                int(data.get("box_count") or 2),
+                int(data.get("captions") or 0),
+            )
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"invalid template {data!r}: {e}") from e
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self.__slots__:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.__slots__)
+
+    def __len__(self) -> int:
+        return len(self.__slots__)
+
+    def __repr__(self) -> str:
+        return f"TemplateRecord(id={self.id!r}, name={self.name!r})"
+
+    def __getstate__(self) -> tuple:
+        return tuple(getattr(self, key) for key in self.__slots__)
+
+    def __setstate__(self, state: tuple) -> None:
+        for key, value in zip(self.__slots__, state):
+            setattr(self, key, value)
+
+
+def to_records(templates: Iterable[Mapping]) -> Iterator[TemplateRecord]:
+    """Records for ``templates``, skipping and reporting invalid entries."""
+    for template in templates:
+        try:
+            yield TemplateRecord.from_mapping(template)
+        except ValueError as e:
+            print(f"Skipping template: {e}", file=sys.stderr)
+
+
+def _iter_json_array(f: io.TextIOBase) -> Iterator[Any]:
+    """Yield the items of a top-level JSON array, reading it in chunks."""
+    decoder = json.JSONDecoder()
+    buffer = ""
+    eof = False
+    while not buffer and not eof:
+        chunk = f.read(_CHUNK_SIZE)
+        eof = not chunk
+        buffer = chunk.lstrip()
+    if not buffer.startswith("["):
+        raise ValueError("expected a JSON array")
+    position = 1
+    while True:
+        # Skip separators, pulling in more text as needed.
+        while True:
+            while position < len(buffer) and buffer[position] in " \t\r\n,":
+                position += 1
+            if position < len(buffer) or eof:
+                break
+            buffer, position = f.read(_CHUNK_SIZE), 0
+            eof = not buffer
+        if position >= len(buffer):
+            raise ValueError("unterminated JSON array")
+        if buffer[position] == "]":
+            return
+        try:
+            item, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            chunk = f.read(_CHUNK_SIZE)
+            eof = not chunk
+            buffer, position = buffer[position:] + chunk, 0
+            continue
+        if not eof and _NUMBER_TAIL.match(buffer, end):
+            # A number followed only by number characters may continue in
+            # the next chunk (``1.5e`` then ``-07``); decode it again.
+            chunk = f.read(_CHUNK_SIZE)
+            eof = not chunk
+            buffer, position = buffer[position:] + chunk, 0
+            continue
+        yield item
+        position = end
+
+
+def _templates_in_document(data: Any) -> List[Any]:
+    """The template list of a parsed JSON document.
+
+    Accepts a bare list, a saved ``/get_memes`` response (``data.memes``) or
+    an object with a ``memes`` or ``templates`` list.
+    """
+    if isinstance(data, dict):
+        inner = data.get("data")
+        if isinstance(inner, dict) and isinstance(inner.get("memes"), list):
+            return inner["memes"]
+        for key in ("memes", "templates"):
+            if isinstance(data.get(key), list):
+                return data[key]
+    if isinstance(data, list):
+        return data
+    raise ValueError("expected a list of templates")
+
+
+def iter_template_file(path: str) -> Iterator[TemplateRecord]:
+    """Stream the templates of one JSON, JSON Lines or CSV file.
+
+    JSON Lines and CSV files are read a line at a time and a JSON file whose
+    top level is an array is decoded item by item, so memory does not grow
+    with the file. Other JSON documents are parsed whole.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    with open(path, encoding="utf-8", newline="") as f:
+        if extension in (".jsonl", ".ndjson"):
+            rows: Iterable[Any] = (json.loads(line) for line in f if line.strip())
+        elif extension == ".csv":
+            rows = csv.DictReader(f)
+        else:
+            start = f.read(1)
+            while start.isspace():
+                start = f.read(1)
+            f.seek(0)
+            if start == "[":
+                rows = _iter_json_array(f)
+            else:
+                rows = _templates_in_document(json.load(f))
+        yield from to_records(rows)
+
+
+async def iter_template_url(
+    url: str, timeout: float = 30.0
+) -> AsyncIterator[TemplateRecord]:
+    """Fetch templates from ``url``, page by page if it contains ``{page}``.
+
+    ``{page}`` is replaced with 1, 2, ... until a page returns no templates.
+    Bodies ending in ``.jsonl`` or served as ``application/x-ndjson`` are
+    read a line at a time; others are parsed as JSON documents.
+    """
+    import httpx
+
+    pages = "{page}" in url
+    async with httpx.AsyncClient(timeout=timeout, follow_redirects=True) as client:
+        page = 1
+        while True:
+            page_url = url.replace("{page}", str(page))
+            count = 0
+            async with client.stream("GET", page_url) as response:
+                response.raise_for_status()
+                content_type = response.headers.get("Content-Type", "")
+                if page_url.split("?")[0].endswith((".jsonl", ".ndjson")) or (
+                    "ndjson" in content_type
+                ):
+                    async for line in response.aiter_lines():
+                        if line.strip():
+                            for record in to_records([json.loads(line)]):
+                                count += 1
+                                yield record
+                else:
+                    document = json.loads(await response.aread())
+                    for record in to_records(_templates_in_document(document)):
+                        count += 1
+                        yield record
+            if not pages or count == 0:
+                return
+            page += 1
+
+
+class CatalogBuilder:
+    """Merges template records into one list, deduplicated by id.
+
+    Records added with ``override`` replace an earlier record with the same
+    id in place; others are dropped when their id is already present.
+    """
+
+    def __init__(self) -> None:
+        self.templates: List[TemplateRecord] = []
+        self._positions: Dict[str, int] = {}
+        self.duplicates = 0
+
+    def add(self, records: Iterable[TemplateRecord], override: bool = False) -> int:
+        """Merge ``records``; returns how many were added or replaced."""
+        templates, positions = self.templates, self._positions
+        merged = 0
+        for record in records:
+            position = positions.get(record.id)
+            if position is None:
+                positions[record.id] = len(templates)
+                templates.append(record)
+            elif override:
+                templates[position] = record
+            else:
+                self.duplicates += 1
+                continue
+            merged += 1
+        return merged
+
+    def add_file(self, path: str, override: bool = False) -> int:
+        return self.add(iter_template_file(path), override)
+
+    async def add_url(self, url: str, override: bool = False) -> int:
+        merged = 0
+        async for record in iter_template_url(url):
+            merged += self.add((record,), override)
+        return merged
+
+
+class TemplateSources:
+    """Extra template sources configured alongside the Imgflip API.
+
+    ``paths`` are files, directories or URLs whose templates are added after
+    the API's, skipping ids already present. ``custom`` entries are applied
+    last and replace templates with the same id.
+    """
+
+    def __init__(self, paths: Sequence[str] = (), custom: Sequence[str] = ()):
+        self.paths = list(paths)
+        self.custom = list(custom)
+
+    @classmethod
+    def from_env(cls) -> "TemplateSources":
+        """``IMGFLIP_TEMPLATE_SOURCES`` and ``IMGFLIP_CUSTOM_TEMPLATES``."""
+        return cls(
+            _split_sources(os.getenv("IMGFLIP_TEMPLATE_SOURCES", "")),
+            _split_sources(os.getenv("IMGFLIP_CUSTOM_TEMPLATES", "")),
+        )
+
+    def __bool__(self) -> bool:
+        return bool(self.paths or self.custom)
+
+    @property
+    def has_urls(self) -> bool:
+        """Whether any source is remote, so unchanged files prove nothing."""
+        return any(_is_url(path) for path in self.paths + self.custom)
+
+    def fingerprint(self) -> str:
+        """Hash of every source's path, modification time and size."""
+        stamp = []
+        for group in (self.paths, self.custom):
+            for path in expand_paths(
+                [p for p in group if not _is_url(p)], TEMPLATE_FILE_EXTENSIONS
+            ):
+                try:
+                    st = os.stat(path)
+                    stamp.append((path, st.st_mtime_ns, st.st_size))
+                except OSError:
+                    stamp.append((path, None, None))
+            stamp.extend((url, None, None) for url in group if _is_url(url))
+        return hashlib.sha256(repr(stamp).encode()).hexdigest()
+
+    async def merge_into(self, builder: CatalogBuilder) -> None:
+        """Add every source to ``builder``, reporting and skipping bad ones."""
+        loop = asyncio.get_running_loop()
+        for group, override in ((self.paths, False), (self.custom, True)):
+            for source in group:
+                try:
+                    if _is_url(source):
+                        await builder.add_url(source, override)
+                        continue
+                    for path in expand_paths([source], TEMPLATE_FILE_EXTENSIONS):
+                        await loop.run_in_executor(
+                            None, builder.add_file, path, override
+                        )
+                except Exception as e:
+                    print(
+                        f"Error loading templates from {source}: {e}",
+                        file=sys.stderr,
+                    )
+
+
+def _is_url(source: str) -> bool:
+    return source.startswith(("http://", "https://"))
+
+
+def _split_sources(value: str) -> List[str]:
+    """Split a list of sources separated by ``;`` or newlines.
+
+    URLs contain ``:``, so entries are separated by ``;`` or newlines rather
+    than ``os.pathsep``.
+    """
+    return [
+        part.strip()
+        for line in value.splitlines()
+        for part in line.split(";")
+        if part.strip()
+    ]
@@ -0,0 +1,529 @@
+"""Low-overhead latency metrics with Prometheus export and optional tracing."""
+
+import asyncio
+import bisect
+import heapq
+import itertools
+import json
+import os
+import sys
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+LAG_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5,
+)
+
+# (name, type, help, labels, value) reported by a collector at scrape time.
+Sample = Tuple[str, str, str, Dict[str, str], float]
+Collector = Callable[[], Iterable[Sample]]
+
+
+class Counter:
+    """Monotonically increasing value."""
+
+    __slots__ = ("value",)
+
+    def __init__(self) -> None:
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+
+class Gauge:
+    """Value that can go up and down."""
+
+    __slots__ = ("value",)
+
+    def __init__(self) -> None:
+        self.value = 0.0
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+
+
+class Histogram:
+    """Fixed-bucket histogram of observed durations in seconds."""
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricFamily:
+    """One named metric with a child per combination of label values."""
+
+    def __init__(
+        self,
+        name: str,
+        kind: str,
+        help_text: str,
+        label_names: Sequence[str],
+        factory: Callable[[], Any],
+    ):
+        self.name = name
+        self.kind = kind
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self.children: Dict[Tuple[str, ...], Any] = {}
+        self._factory = factory
+
+    def labels(self, *values: str) -> Any:
+        """The child metric for ``values``, created on first use."""
+        child = self.children.get(values)
+        if child is None:
+            child = self._factory()
+            self.children[values] = child
+        return child
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Iterable[Tuple[str, str]]) -> str:
+    pairs = ",".join(f'{name}="{_escape(str(value))}"' for name, value in labels)
+    return "{" + pairs + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class MetricsRegistry:
+    """Process-wide metric families plus collectors sampled at scrape time."""
+
+    def __init__(self) -> None:
+        self._families: Dict[str, MetricFamily] = {}
+        self._collectors: List[Collector] = []
+
+    def _family(
+        self,
+        name: str,
+        kind: str,
+        help_text: str,
+        labels: Sequence[str],
+        factory: Callable[[], Any],
+    ) -> MetricFamily:
+        family = self._families.get(name)
+        if family is None:
+            family = MetricFamily(name, kind, help_text, labels, factory)
+            self._families[name] = family
+        return family
+
+    def counter(
+        self, name: str, help_text: str, labels: Sequence[str] = ()
+    ) -> MetricFamily:
+        return self._family(name, "counter", help_text, labels, Counter)
+
+    def gauge(
+        self, name: str, help_text: str, labels: Sequence[str] = ()
+    ) -> MetricFamily:
+        return self._family(name, "gauge", help_text, labels, Gauge)
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> MetricFamily:
+        return self._family(
+            name, "histogram", help_text, labels, lambda: Histogram(buckets)
+        )
+
+    def add_collector(self, collector: Collector) -> None:
+        """Report the samples returned by ``collector`` on every scrape."""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        lines: List[str] = []
+        for family in self._families.values():
+            lines.append(f"# HELP {family.name} {family.help}")
+            lines.append(f"# TYPE {family.name} {family.kind}")
+            for values, child in sorted(family.children.items()):
+                labels = list(zip(family.label_names, values))
+                if family.kind == "histogram":
+                    cumulative = 0
+                    bounds = list(child.buckets) + [float("inf")]
+                    for bound, count in zip(bounds, child.counts):
+                        cumulative += count
+                        le = _format_labels(labels + [("le", _format_value(bound))])
+                        lines.append(f"{family.name}_bucket{le} {cumulative}")
+                    label_text = _format_labels(labels)
+                    lines.append(
+                        f"{family.name}_sum{label_text} {_format_value(child.sum)}"
+                    )
+                    lines.append(f"{family.name}_count{label_text} {child.count}")
+                else:
+                    lines.append(
+                        f"{family.name}{_format_labels(labels)} "
+                        f"{_format_value(child.value)}"
+                    )
+
+        # Samples of one metric must be contiguous, so group collector output.
+        grouped: Dict[str, List[Sample]] = {}
+        for collector in self._collectors:
+            try:
+                samples = list(collector())
+            except Exception as e:
+                print(f"Error collecting metrics: {e}", file=sys.stderr)
+                continue
+            for sample in samples:
+                grouped.setdefault(sample[0], []).append(sample)
+        for name, samples in grouped.items():
+            _, kind, help_text, _, _ = samples[0]
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for _, _, _, labels, value in samples:
+                lines.append(
+                    f"{name}{_format_labels(sorted(labels.items()))} "
+                    f"{_format_value(value)}"
+                )
+        return "\n".join(lines) + "\n"
+
+
+class RequestTrace:
+    """Timing of one tool call, broken down by stage."""
+
+    __slots__ = ("tool", "started", "wall_time", "duration", "outcome", "stages")
+
+    def __init__(self, tool: str):
+        self.tool = tool
+        self.started = time.perf_counter()
+        self.wall_time = time.time()
+        self.duration = 0.0
+        self.outcome = "ok"
+        self.stages: List[Tuple[str, float]] = []
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "tool": self.tool,
+            "started_at": self.wall_time,
+            "duration": self.duration,
+            "outcome": self.outcome,
+            "stages": [{"stage": name, "duration": d} for name, d in self.stages],
+        }
+
+
+class SlowRequestLog:
+    """The ``size`` slowest tool calls seen, with their stage breakdown.
+
+    Calls slower than ``threshold`` seconds are also printed to stderr as they
+    finish; a non-positive threshold turns that off.
+    """
+
+    def __init__(self, size: int = 20, threshold: float = 1.0):
+        self.size = size
+        self.threshold = threshold
+        self._heap: List[Tuple[float, int, RequestTrace]] = []
+        self._sequence = itertools.count()
+
+    def offer(self, trace: RequestTrace) -> None:
+        if self.threshold > 0 and trace.duration >= self.threshold:
+            stages = ", ".join(f"{name}={d * 1000:.1f}ms" for name, d in trace.stages)
+            print(
+                f"Slow {trace.tool} call: {trace.duration * 1000:.1f}ms ({stages})",
+                file=sys.stderr,
+            )
+        if self.size <= 0:
+            return
+        entry = (trace.duration, next(self._sequence), trace)
+        if len(self._heap) < self.size:
+            heapq.heappush(self._heap, entry)
+        elif entry[0] > self._heap[0][0]:
+            heapq.heapreplace(self._heap, entry)
+
+    def slowest(self) -> List[Dict[str, Any]]:
+        """Recorded calls, slowest first."""
+        return [trace.as_dict() for _, _, trace in sorted(self._heap, reverse=True)]
+
+
+def _load_tracer() -> Any:
+    """OpenTelemetry tracer when ``IMGFLIP_OTEL`` is set and the API is installed."""
+    if os.getenv("IMGFLIP_OTEL", "").lower() not in ("1", "true", "yes"):
+        return None
+    try:
+        from opentelemetry import trace
+    except ImportError:
+        print("IMGFLIP_OTEL is set but opentelemetry-api is not installed",
+              file=sys.stderr)
+        return None
+    return trace.get_tracer("imgflip_meme_mcp")
+
+
+class Metrics:
+    """Instrumentation used on the request path."""
+
+    def __init__(self, registry: Optional[MetricsRegistry] = None):
+        self.registry = registry or MetricsRegistry()
+        self.slow_log = SlowRequestLog(
+            size=int(os.getenv("IMGFLIP_SLOW_LOG_SIZE", "20")),
+            threshold=float(os.getenv("IMGFLIP_SLOW_REQUEST_SECONDS", "1.0")),
+        )
+        self.tracer = _load_tracer()
+        registry = self.registry
+        self.tool_calls = registry.counter(
+            "imgflip_tool_calls_total",
+            "MCP tool calls by outcome.",
+            ("tool", "outcome"),
+        )
+        self.tool_seconds = registry.histogram(
+            "imgflip_tool_duration_seconds", "MCP tool call latency.", ("tool",)
+        )
+        self.tools_in_flight = registry.gauge(
+            "imgflip_tools_in_flight", "MCP tool calls in progress.", ("tool",)
+        )
+        self.stage_seconds = registry.histogram(
+            "imgflip_stage_duration_seconds",
+            "Latency of each stage of a tool call.",
+            ("tool", "stage"),
+        )
+        self.upstream_requests = registry.counter(
+            "imgflip_upstream_requests_total",
+            "Imgflip API requests by status code.",
+            ("method", "path", "status"),
+        )
+        self.upstream_seconds = registry.histogram(
+            "imgflip_upstream_duration_seconds",
+            "Imgflip API request latency.",
+            ("method", "path"),
+        )
+        self.upstream_in_flight = registry.gauge(
+            "imgflip_upstream_in_flight", "Imgflip API requests in progress."
+        ).labels()
+        self.loop_lag = registry.histogram(
+            "imgflip_event_loop_lag_seconds",
+            "How late the event loop ran a timer scheduled to fire.",
+            buckets=LAG_BUCKETS,
+        ).labels()
+        self.loop_lag_max = registry.gauge(
+            "imgflip_event_loop_lag_max_seconds",
+            "Largest event loop lag seen in the last minute.",
+        ).labels()
+
+
+class _Stage:
+    """Context manager timing one stage of the current tool call."""
+
+    __slots__ = ("name", "metrics", "start", "span")
+
+    def __init__(self, metrics: Metrics, name: str):
+        self.metrics = metrics
+        self.name = name
+        self.span: Any = None
+
+    def __enter__(self) -> "_Stage":
+        tracer = self.metrics.tracer
+        if tracer is not None:
+            self.span = tracer.start_as_current_span(self.name)
+            self.span.__enter__()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        elapsed = time.perf_counter() - self.start
+        trace = _current_trace.get()
+        tool = trace.tool if trace is not None else ""
+        self.metrics.stage_seconds.labels(tool, self.name).observe(elapsed)
+        if trace is not None:
+            trace.stages.append((self.name, elapsed))
+        if self.span is not None:
+            self.span.__exit__(*exc)
+
+
+class _ToolCall:
+    """Context manager recording one MCP tool call."""
+
+    __slots__ = ("metrics", "trace", "token", "span")
+
+    def __init__(self, metrics: Metrics, tool: str):
+        self.metrics = metrics
+        self.trace = RequestTrace(tool)
+        self.span: Any = None
+
+    def __enter__(self) -> RequestTrace:
+        metrics = self.metrics
+        if metrics.tracer is not None:
+            self.span = metrics.tracer.start_as_current_span(f"tool {self.trace.tool}")
+            self.span.__enter__()
+        self.token = _current_trace.set(self.trace)
+        metrics.tools_in_flight.labels(self.trace.tool).inc()
+        return self.trace
+
+    def __exit__(self, exc_type: Any, *exc: Any) -> None:
+        metrics, trace = self.metrics, self.trace
+        trace.duration = time.perf_counter() - trace.started
+        if exc_type is not None:
+            trace.outcome = "error"
+        _current_trace.reset(self.token)
+        metrics.tools_in_flight.labels(trace.tool).dec()
+        metrics.tool_seconds.labels(trace.tool).observe(trace.duration)
+        metrics.tool_calls.labels(trace.tool, trace.outcome).inc()
+        metrics.slow_log.offer(trace)
+        if self.span is not None:
+            self.span.__exit__(exc_type, *exc)
+
+
+class _UpstreamCall:
+    """Context manager recording one Imgflip API request."""
+
+    __slots__ = ("metrics", "method", "path", "status", "start")
+
+    def __init__(self, metrics: Metrics, method: str, path: str):
+        self.metrics = metrics
+        self.method = method
+        self.path = path
+        self.status = "error"
+
+    def __enter__(self) -> "_UpstreamCall":
+        self.metrics.upstream_in_flight.inc()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        elapsed = time.perf_counter() - self.start
+        metrics = self.metrics
+        metrics.upstream_in_flight.dec()
+        metrics.upstream_seconds.labels(self.method, self.path).observe(elapsed)
+        metrics.upstream_requests.labels(self.method, self.path, self.status).inc()
+        trace = _current_trace.get()
+        if trace is not None:
+            metrics.stage_seconds.labels(trace.tool, "upstream").observe(elapsed)
+            trace.stages.append(("upstream", elapsed))
+
+
+_current_trace: "ContextVar[Optional[RequestTrace]]" = ContextVar(
+    "imgflip_request_trace", default=None
+)
+_metrics: Optional[Metrics] = None
+
+
+def get_metrics() -> Metrics:
+    """Return the process-wide metrics."""
+    global _metrics
+    if _metrics is None:
+        _metrics = Metrics()
+    return _metrics
+
+
+def track_tool(tool: str) -> _ToolCall:
+    """Time an MCP tool call; stages timed inside it are attributed to it."""
+    return _ToolCall(get_metrics(), tool)
+
+
+def stage(name: str) -> _Stage:
+    """Time one stage of the current tool call."""
+    return _Stage(get_metrics(), name)
+
+
+def upstream_call(method: str, path: str) -> _UpstreamCall:
+    """Time one Imgflip API request; set ``.status`` once it has answered."""
+    return _UpstreamCall(get_metrics(), method, path)
+
+
+def mark_failed() -> None:
+    """Record the current tool call as failed even though it returned."""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.outcome = "error"
+
+
+async def watch_loop_lag(interval: float = 0.1, window: float = 60.0) -> None:
+    """Measure event loop lag every ``interval`` seconds until cancelled.
+
+    Lag is how much later than requested a sleep wakes up: the time other
+    work held the loop. Each sample goes into the lag histogram, and the
+    largest one over the last ``window`` seconds into a gauge.
+    """
+    metrics = get_metrics()
+    loop = asyncio.get_running_loop()
+    window_start = loop.time()
+    window_max = 0.0
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        now = loop.time()
+        lag = max(0.0, now - start - interval)
+        metrics.loop_lag.observe(lag)
+        if now - window_start >= window:
+            window_start, window_max = now, lag
+        else:
+            window_max = max(window_max, lag)
+        metrics.loop_lag_max.set(window_max)
+
+
+def cache_samples(cache: str, stats: Dict[str, Any]) -> List[Sample]:
+    """Collector samples for a cache's ``stats()`` dict."""
+    labels = {"cache": cache}
+    return [
+        ("imgflip_cache_hits_total", "counter", "Cache hits.", labels, stats["hits"]),
+        ("imgflip_cache_misses_total", "counter", "Cache misses.", labels,
+         stats["misses"]),
+        ("imgflip_cache_hit_ratio", "gauge", "Cache hit ratio since start.", labels,
+         stats["hit_ratio"]),
+        ("imgflip_cache_entries", "gauge", "Entries currently cached.", labels,
+         stats["size"]),
+    ]
+
+
+async def serve_metrics(host: str, port: int) -> None:
+    """Serve ``/metrics`` (Prometheus) and ``/debug/slow`` (JSON) over HTTP."""
+
+    async def handle(
+        reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            request_line = await reader.readline()
+            while (await reader.readline()).strip():
+                pass
+            parts = request_line.decode("latin-1").split()
+            path = parts[1].split("?")[0] if len(parts) > 1 else ""
+            metrics = get_metrics()
+            if path == "/metrics":
+                status, content_type = "200 OK", "text/plain; version=0.0.4"
+                body = metrics.registry.render().encode()
+            elif path == "/debug/slow":
+                status, content_type = "200 OK", "application/json"
+                body = json.dumps(metrics.slow_log.slowest(), indent=2).encode()
+            else:
+                status, content_type, body = "404 Not Found", "text/plain", b""
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode()
+                + body
+            )
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, host, port)
+    async with server:
+        await server.serve_forever()
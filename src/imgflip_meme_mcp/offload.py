@@ -0,0 +1,170 @@
+"""Running CPU-bound template scoring off the event loop."""
+
+import asyncio
+import functools
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from .template_index import TemplateIndex
+
+# op(index, token, *args): scoring work over one catalog version.
+ScoringOp = Callable[..., Any]
+
+
+class ScoringCancelledError(Exception):
+    """Raised inside a scoring job whose caller has gone away."""
+
+
+class CancelToken:
+    """Flag a running scoring job polls to stop early."""
+
+    __slots__ = ("_event",)
+
+    def __init__(self) -> None:
+        self._event = threading.Event()
+
+    def cancel(self) -> None:
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def check(self) -> None:
+        """Raise :class:`ScoringCancelledError` once the job has been cancelled."""
+        if self._event.is_set():
+            raise ScoringCancelledError()
+
+
+# Never cancelled; used for scoring that runs inline or in a worker process.
+NEVER_CANCELLED = CancelToken()
+
+# Index installed in each worker process of a process pool.
+_worker_index: Optional[TemplateIndex] = None
+
+
+def _install_index(templates: List[Dict[str, Any]]) -> None:
+    global _worker_index
+    _worker_index = TemplateIndex(templates)
+
+
+def _call_in_worker(op: ScoringOp, args: tuple) -> Any:
+    return op(_worker_index, NEVER_CANCELLED, *args)
+
+
+class ScoringPool:
+    """Runs scoring over large catalogs in a thread or process pool.
+
+    Catalogs smaller than ``threshold`` templates are scored inline, where a
+    scan takes less time than a hop to another thread. Larger ones are scored
+    by ``mode``:
+
+    - ``thread``: a thread pool. Scoring still holds the GIL, but the
+      interpreter hands it back to the event loop every few milliseconds, so
+      other sessions' I/O keeps flowing. A cancelled caller stops its job at
+      the next :meth:`CancelToken.check`.
+    - ``process``: a process pool whose workers each build their own copy of
+      the index, rebuilt when the catalog changes. Scoring runs in parallel
+      on several cores; a cancelled caller drops queued jobs, while running
+      ones finish and are discarded.
+    - ``off``: always inline.
+    """
+
+    def __init__(
+        self, threshold: int = 2000, mode: str = "thread", workers: int = 0
+    ):
+        if mode not in ("thread", "process", "off"):
+            raise ValueError(f"Unknown scoring offload mode: {mode!r}")
+        self.threshold = threshold
+        self.mode = mode
+        self.workers = workers or min(4, os.cpu_count() or 1)
+        self.offloaded = 0
+        self.cancelled = 0
+        self._executor: Optional[Executor] = None
+        self._executor_index: Optional[TemplateIndex] = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "ScoringPool":
+        return cls(
+            threshold=int(os.getenv("IMGFLIP_OFFLOAD_THRESHOLD", "2000")),
+            mode=os.getenv("IMGFLIP_OFFLOAD_MODE", "thread"),
+            workers=int(os.getenv("IMGFLIP_OFFLOAD_WORKERS", "0")),
+        )
+
+    def should_offload(self, index: TemplateIndex) -> bool:
+        return self.mode != "off" and len(index) >= self.threshold
+
+    async def run(self, index: TemplateIndex, op: ScoringOp, *args: Any) -> Any:
+        """Return ``op(index, token, *args)``, off the event loop for big catalogs.
+
+        ``op`` must be a module-level function so process workers can import it.
+        """
+        if not self.should_offload(index):
+            return op(index, NEVER_CANCELLED, *args)
+
+        loop = asyncio.get_running_loop()
+        token = NEVER_CANCELLED
+        if self.mode == "process":
+            call = functools.partial(_call_in_worker, op, args)
+        else:
+            token = CancelToken()
+            call = functools.partial(op, index, token, *args)
+        self.offloaded += 1
+        try:
+            return await loop.run_in_executor(self._executor_for(index), call)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            token.cancel()
+            raise
+
+    def _executor_for(self, index: TemplateIndex) -> Executor:
+        with self._lock:
+            if self.mode == "thread":
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        self.workers, thread_name_prefix="imgflip-scoring"
+                    )
+                return self._executor
+            if self._executor is None or self._executor_index is not index:
+                # Jobs already queued on the old pool finish against the
+                # catalog version they were submitted for.
+                if self._executor is not None:
+                    self._executor.shutdown(wait=False)
+                self._executor = ProcessPoolExecutor(
+                    self.workers,
+                    initializer=_install_index,
+                    initargs=(index.templates,),
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+                self._executor_index = index
+            return self._executor
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "threshold": self.threshold,
+            "offloaded": self.offloaded,
+            "cancelled": self.cancelled,
+        }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+                self._executor_index = None
+
+
+_scoring_pool: Optional[ScoringPool] = None
+
+
+def get_scoring_pool() -> ScoringPool:
+    """Return the process-wide scoring pool."""
+    global _scoring_pool
+    if _scoring_pool is None:
+        _scoring_pool = ScoringPool.from_env()
+    return _scoring_pool
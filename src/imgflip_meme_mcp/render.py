@@ -0,0 +1,401 @@
+"""Rendering memes locally with Pillow instead of ``/caption_image``.
+
+Template images are downloaded once into a disk cache and decoded images of
+recently used templates are kept in memory, so a repeated render only draws
+the captions and encodes the result. Captions are laid out like Imgflip's
+default boxes: upper-case white text with a black outline, one box at the
+top and one at the bottom, each shrunk and wrapped until it fits.
+"""
+
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import sys
+import tempfile
+from io import BytesIO
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from PIL import Image, ImageDraw, ImageFont
+
+from .cache import MISSING, LRUCache
+from .snapshot import default_cache_dir
+
+# Tried in order when IMGFLIP_RENDER_FONT is unset; Pillow searches the
+# system font directories for bare file names.
+FONT_CANDIDATES = (
+    "impact.ttf",
+    "Impact.ttf",
+    "Anton-Regular.ttf",
+    "DejaVuSans-Bold.ttf",
+    "LiberationSans-Bold.ttf",
+    "arialbd.ttf",
+)
+
+# Share of the image each caption box may cover.
+BOX_WIDTH = 0.94
+BOX_HEIGHT = 0.25
+MIN_FONT_SIZE = 10
+JPEG_QUALITY = 90
+
+Font = Any
+
+
+def render_key(template_id: str, top_text: str, bottom_text: str) -> str:
+    """File name stem of one render; equal captions share the output."""
+    payload = json.dumps(
+        [str(template_id), top_text.strip(), bottom_text.strip()],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()[:24]
+
+
+def wrap_text(text: str, font: Font, width: float) -> List[str]:
+    """Greedily wrap ``text`` into lines no wider than ``width``.
+
+    Each word is measured once and lines are summed from word and space
+    widths, which ignores kerning across spaces but saves measuring every
+    candidate line. Words wider than a whole line are split between
+    characters.
+    """
+    space = font.getlength(" ")
+    lines: List[str] = []
+    line = ""
+    line_width = 0.0
+    for word in text.split():
+        word_width = font.getlength(word)
+        if line and line_width + space + word_width <= width:
+            line += " " + word
+            line_width += space + word_width
+            continue
+        if line:
+            lines.append(line)
+        if word_width <= width:
+            line, line_width = word, word_width
+            continue
+        line = ""
+        for char in word:
+            if line and font.getlength(line + char) > width:
+                lines.append(line)
+                line = ""
+            line += char
+        line_width = font.getlength(line)
+    if line:
+        lines.append(line)
+    return lines
+
+
+def _stroke_width(size: int) -> int:
+    return max(1, size // 12)
+
+
+def _text_height(font: Font, size: int, lines: int) -> int:
+    ascent, descent = font.getmetrics()
+    return lines * (ascent + descent) + 2 * _stroke_width(size)
+
+
+class MemeRenderer:
+    """Draws captions on template images, caching templates on disk and in memory.
+
+    ``image_dir`` keeps downloaded template images across restarts (None
+    keeps them only in memory); rendered memes are written to ``output_dir``
+    under a name derived from the template and captions, so an identical
+    render is served from the existing file. ``cache_size`` decoded templates
+    are kept in an LRU, and :meth:`warm` pre-decodes the ``prewarm`` most
+    popular ones.
+    """
+
+    def __init__(
+        self,
+        output_dir: str,
+        image_dir: Optional[str] = None,
+        cache_size: int = 16,
+        prewarm: int = 8,
+        font_path: Optional[str] = None,
+        timeout: float = 30.0,
+    ):
+        self.output_dir = output_dir
+        self.image_dir = image_dir
+        self.prewarm = prewarm
+        self.timeout = timeout
+        self.images = LRUCache(max_size=cache_size)
+        self.rendered = 0
+        self.reused = 0
+        self.downloads = 0
+        self.font_path = font_path or _find_font()
+        self._fonts: Dict[int, Font] = {}
+        self._loading: Dict[str, "asyncio.Future[Image.Image]"] = {}
+        self._warm_task: Optional["asyncio.Task[None]"] = None
+
+    @classmethod
+    def from_env(cls) -> "MemeRenderer":
+        """Build the renderer from ``IMGFLIP_RENDER_*`` settings."""
+        cache_dir = default_cache_dir()
+        output_dir = os.getenv("IMGFLIP_RENDER_DIR") or (
+            os.path.join(cache_dir, "renders")
+            if cache_dir
+            else os.path.join(tempfile.gettempdir(), "imgflip-meme-renders")
+        )
+        return cls(
+            output_dir,
+            image_dir=os.path.join(cache_dir, "template-images") if cache_dir else None,
+            cache_size=int(os.getenv("IMGFLIP_RENDER_CACHE_SIZE", "16")),
+            prewarm=int(os.getenv("IMGFLIP_RENDER_PREWARM", "8")),
+            font_path=os.getenv("IMGFLIP_RENDER_FONT") or None,
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        """Render counters and the decoded-template cache's hit/miss counts."""
+        return {
+            "rendered": self.rendered,
+            "reused": self.reused,
+            "downloads": self.downloads,
+            "images": self.images.stats(),
+        }
+
+    async def render(
+        self,
+        template: Mapping[str, Any],
+        top_text: str,
+        bottom_text: str = "",
+        inline: bool = False,
+    ) -> Dict[str, Any]:
+        """Render one meme; returns result ``data`` like ``/caption_image``.
+
+        ``url`` is a ``file://`` URL of the output and ``path`` its location;
+        with ``inline`` the encoded image is included as base64 ``image``.
+        """
+        loop = asyncio.get_running_loop()
+        path = os.path.join(
+            self.output_dir,
+            render_key(template["id"], top_text, bottom_text) + ".jpg",
+        )
+        data: Optional[bytes] = None
+        if os.path.exists(path):
+            self.reused += 1
+        else:
+            image = await self.template_image(template)
+            data = await loop.run_in_executor(
+                None, self._draw, image, top_text, bottom_text
+            )
+            await loop.run_in_executor(None, _write_atomic, path, data)
+            self.rendered += 1
+        result = {
+            "url": "file://" + os.path.abspath(path),
+            "path": path,
+            "mime_type": "image/jpeg",
+            "renderer": "local",
+        }
+        if inline:
+            if data is None:
+                data = await loop.run_in_executor(None, _read, path)
+            result["image"] = base64.b64encode(data).decode("ascii")
+        return result
+
+    async def template_image(self, template: Mapping[str, Any]) -> Image.Image:
+        """Decoded image of ``template``, from memory, disk or its URL."""
+        template_id = str(template["id"])
+        image = self.images.get(template_id)
+        if image is not MISSING:
+            return image
+        # Concurrent renders of one template share a single load
+        future = self._loading.get(template_id)
+        if future is None or future.get_loop() is not asyncio.get_running_loop():
+            future = asyncio.ensure_future(self._load(template))
+            self._loading[template_id] = future
+            future.add_done_callback(lambda _: self._loading.pop(template_id, None))
+        return await asyncio.shield(future)
+
+    def warm(self, templates: Iterable[Mapping[str, Any]]) -> None:
+        """Start decoding the first ``prewarm`` templates in the background.
+
+        Templates come in catalog order, most popular first. Only the first
+        call starts anything.
+        """
+        if self._warm_task is not None or self.prewarm <= 0:
+            return
+        chosen = []
+        for template in templates:
+            if len(chosen) >= min(self.prewarm, self.images.max_size):
+                break
+            if template.get("url"):
+                chosen.append(template)
+        self._warm_task = asyncio.ensure_future(self._warm(chosen))
+
+    async def _warm(self, templates: List[Mapping[str, Any]]) -> None:
+        for template in templates:
+            try:
+                await self.template_image(template)
+            except Exception as e:
+                print(
+                    f"Could not pre-decode template {template['id']}: {e}",
+                    file=sys.stderr,
+                )
+
+    async def _load(self, template: Mapping[str, Any]) -> Image.Image:
+        loop = asyncio.get_running_loop()
+        url = str(template.get("url") or "")
+        if not url:
+            raise ValueError(f"template {template['id']} has no image URL")
+        cached_path = self._image_path(str(template["id"]), url)
+        data = None
+        if cached_path is not None:
+            data = await loop.run_in_executor(None, _read_if_exists, cached_path)
+        if data is None:
+            data = await self._fetch(url)
+            if cached_path is not None:
+                await loop.run_in_executor(None, _write_atomic, cached_path, data)
+        image = await loop.run_in_executor(None, _decode, data)
+        self.images.set(str(template["id"]), image)
+        return image
+
+    def _image_path(self, template_id: str, url: str) -> Optional[str]:
+        if self.image_dir is None:
+            return None
+        extension = os.path.splitext(url.split("?")[0])[1].lower()
+        digest = hashlib.sha1(template_id.encode()).hexdigest()[:16]
+        return os.path.join(self.image_dir, digest + (extension or ".img"))
+
+    async def _fetch(self, url: str) -> bytes:
+        """Template image bytes from an http(s) URL or a local path."""
+        if not url.startswith(("http://", "https://")):
+            path = url[len("file://"):] if url.startswith("file://") else url
+            return await asyncio.get_running_loop().run_in_executor(None, _read, path)
+        import httpx
+
+        async with httpx.AsyncClient(
+            timeout=self.timeout, follow_redirects=True
+        ) as client:
+            response = await client.get(url)
+            response.raise_for_status()
+        self.downloads += 1
+        return response.content
+
+    def _font(self, size: int) -> Font:
+        font = self._fonts.get(size)
+        if font is None:
+            if self.font_path:
+                font = ImageFont.truetype(self.font_path, size)
+            else:
+                try:
+                    font = ImageFont.load_default(size)
+                except TypeError:
+                    # Pillow < 10.1 only has a fixed-size bitmap font.
+                    font = ImageFont.load_default()
+            self._fonts[size] = font
+        return font
+
+    def fit_text(self, text: str, width: int, height: int) -> Tuple[Font, List[str]]:
+        """Largest font and line breaks that fit ``text`` in a box.
+
+        Falls back to the smallest size, even if the text overflows, when
+        nothing fits.
+        """
+        low, high = MIN_FONT_SIZE, max(MIN_FONT_SIZE, height)
+        best = None
+        while low <= high:
+            size = (low + high) // 2
+            font = self._font(size)
+            lines = wrap_text(text, font, width - 2 * _stroke_width(size))
+            if _text_height(font, size, len(lines)) <= height:
+                best = (font, lines)
+                low = size + 1
+            else:
+                high = size - 1
+        if best is None:
+            font = self._font(MIN_FONT_SIZE)
+            best = (font, wrap_text(text, font, width))
+        return best
+
+    def _draw(self, template: Image.Image, top_text: str, bottom_text: str) -> bytes:
+        """Caption a copy of ``template`` and encode it as JPEG (in a thread)."""
+        image = template.copy()
+        draw = ImageDraw.Draw(image)
+        width, height = image.size
+        box_width = int(width * BOX_WIDTH)
+        box_height = int(height * BOX_HEIGHT)
+        margin = max(2, height // 50)
+        for text, at_top in ((top_text, True), (bottom_text, False)):
+            text = text.strip().upper()
+            if not text:
+                continue
+            font, lines = self.fit_text(text, box_width, box_height)
+            size = getattr(font, "size", MIN_FONT_SIZE)
+            stroke = _stroke_width(size)
+            ascent, descent = font.getmetrics()
+            line_height = ascent + descent
+            y = margin if at_top else (
+                height - margin - _text_height(font, size, len(lines))
+            )
+            y += stroke
+            for line in lines:
+                x = (width - font.getlength(line)) / 2
+                draw.text(
+                    (x, y),
+                    line,
+                    font=font,
+                    fill="white",
+                    stroke_width=stroke,
+                    stroke_fill="black",
+                )
+                y += line_height
+        output = BytesIO()
+        image.save(output, format="JPEG", quality=JPEG_QUALITY)
+        return output.getvalue()
+
+
+def _find_font() -> Optional[str]:
+    """Path of the first installed font in FONT_CANDIDATES, if any."""
+    for name in FONT_CANDIDATES:
+        try:
+            return ImageFont.truetype(name, MIN_FONT_SIZE).path
+        except OSError:
+            continue
+    return None
+
+
+def _decode(data: bytes) -> Image.Image:
+    image = Image.open(BytesIO(data))
+    if image.mode in ("RGBA", "LA") or "transparency" in image.info:
+        # Flatten transparent templates onto white, as JPEG has no alpha.
+        background = Image.new("RGB", image.size, "white")
+        background.paste(image.convert("RGBA"), mask=image.convert("RGBA"))
+        return background
+    return image.convert("RGB")
+
+
+def _read(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def _read_if_exists(path: str) -> Optional[bytes]:
+    try:
+        return _read(path)
+    except FileNotFoundError:
+        return None
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".render-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+_renderer: Optional[MemeRenderer] = None
+
+
+def get_renderer() -> MemeRenderer:
+    """Return the process-wide renderer built from the environment."""
+    global _renderer
+    if _renderer is None:
+        _renderer = MemeRenderer.from_env()
+    return _renderer
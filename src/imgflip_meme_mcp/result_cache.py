@@ -0,0 +1,90 @@
+"""Cache of generated memes keyed by caption request."""
+
+import json
+import os
+from typing import Any, Dict, Optional
+
+from .cache import MISSING, LRUCache
+from .shared_cache import SQLiteCache
+
+
+def caption_key(
+    username: str, template_id: str, top_text: str, bottom_text: str
+) -> str:
+    """Normalized cache key for one ``/caption_image`` request."""
+    return json.dumps(
+        [username or "", str(template_id), top_text.strip(), bottom_text.strip()],
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+
+
+class MemeResultCache:
+    """Generated meme URLs by caption request, in memory and optionally SQLite.
+
+    The in-memory LRU answers repeated requests without touching disk; the
+    SQLite file, when configured, keeps results across restarts and lets
+    several processes share them.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 1024,
+        ttl: float = 86400.0,
+        path: Optional[str] = None,
+    ):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.path = path
+        self._memory = LRUCache(max_size=max_size, ttl=ttl)
+        self._store: Optional[SQLiteCache] = None
+        if path:
+            self._store = SQLiteCache(path, "memes", max_size=max_size, ttl=ttl)
+
+    @classmethod
+    def from_env(cls) -> "MemeResultCache":
+        """Build the cache from ``IMGFLIP_RESULT_CACHE_*`` settings."""
+        return cls(
+            max_size=int(os.getenv("IMGFLIP_RESULT_CACHE_SIZE", "1024")),
+            ttl=float(os.getenv("IMGFLIP_RESULT_CACHE_TTL", "86400")),
+            path=os.getenv("IMGFLIP_RESULT_CACHE_PATH") or None,
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters of the in-memory layer."""
+        return self._memory.stats()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Cached ``data`` of a successful caption response, or None."""
+        if self.max_size <= 0:
+            return None
+        value = self._memory.get(key)
+        if value is not MISSING:
+            return dict(value)
+        if self._store is None:
+            return None
+        stored = self._store.get(key)
+        if stored is None:
+            return None
+        data = json.loads(stored)
+        self._memory.set(key, data)
+        return dict(data)
+
+    def set(self, key: str, data: Dict[str, Any]) -> None:
+        """Store the ``data`` of a successful caption response."""
+        if self.max_size <= 0:
+            return
+        self._memory.set(key, dict(data))
+        if self._store is not None:
+            self._store.set(key, json.dumps(data))
+
+
+_result_cache: Optional[MemeResultCache] = None
+
+
+def get_result_cache() -> MemeResultCache:
+    """Return the process-wide result cache built from the environment."""
+    global _result_cache
+    if _result_cache is None:
+        _result_cache = MemeResultCache.from_env()
+    return _result_cache
@@ -1,16 +1,47 @@
 """MCP server for intelligent meme generation using Imgflip API."""
 
+import argparse
 import asyncio
 import json
-from typing import Any, Dict, List, Optional
+import os
+import signal
+import socket
+import sys
+import weakref
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence, Union
 
 from mcp.server import Server
 from mcp.server.stdio import stdio_server
-from mcp.types import Tool, TextContent
+from mcp.types import ImageContent, Tool, TextContent
 from pydantic import BaseModel
 
-from .imgflip_client import ImgflipClient
-from .template_matcher import TemplateMatcher
+from .alias_registry import get_alias_registry
+from .metrics import (
+    cache_samples,
+    get_metrics,
+    mark_failed,
+    serve_metrics,
+    stage,
+    track_tool,
+    watch_loop_lag,
+)
+
+if TYPE_CHECKING:
+    from .imgflip_client import ImgflipClient
+    from .template_matcher import TemplateMatcher
+
+RENDER_SCHEMA = {
+    "type": "string",
+    "enum": ["imgflip", "local", "auto"],
+    "description": "imgflip to caption with the Imgflip API, local to draw the meme on this machine, or auto to render locally only when Imgflip is unavailable (default from IMGFLIP_RENDER_MODE)"
+}
+
+TOOL_NAMES = (
+    "generate_meme",
+    "generate_memes_batch",
+    "search_meme_templates",
+    "list_popular_templates",
+)
 
 
 class MemeGenerationRequest(BaseModel):
@@ -18,17 +49,58 @@ class MemeGenerationRequest(BaseModel):
     template_hint: str
     top_text: str
     bottom_text: Optional[str] = None
+    render: Optional[str] = None
+    inline: bool = False
+
+
+class MemeBatchRequest(BaseModel):
+    """Request model for generating several memes in one call."""
+    memes: List[MemeGenerationRequest]
+    max_concurrency: Optional[int] = None
+    render: Optional[str] = None
 
 
 class MemeSearchRequest(BaseModel):
     """Request model for meme template search."""
     query: str
     limit: Optional[int] = 10
+    offset: Optional[int] = 0
+    cursor: Optional[str] = None
 
 
 app = Server("imgflip-meme-server")
-imgflip_client = ImgflipClient()
-template_matcher = TemplateMatcher()
+# Created on the first tool call, so the handshake and list_tools never load
+# the HTTP client, caches or scoring code.
+imgflip_client: Optional["ImgflipClient"] = None
+template_matcher: Optional["TemplateMatcher"] = None
+
+# Per-session concurrency limits; sessions share everything else.
+_session_limits: "weakref.WeakKeyDictionary[Any, asyncio.Semaphore]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_imgflip_client() -> "ImgflipClient":
+    """The server's Imgflip client, created on first use."""
+    global imgflip_client
+    if imgflip_client is None:
+        from .imgflip_client import ImgflipClient
+        
+        imgflip_client = ImgflipClient()
+        # Registered here rather than at import, so the metrics settings are
+        # read after main() has loaded .env.
+        get_metrics().registry.add_collector(_collect_component_metrics)
+    return imgflip_client
+
+
+def get_template_matcher() -> "TemplateMatcher":
+    """The server's template matcher, created on first use."""
+    global template_matcher
+    if template_matcher is None:
+        from .template_matcher import TemplateMatcher
+        
+        template_matcher = TemplateMatcher(get_imgflip_client())
+    return template_matcher
 
 
 @app.list_tools()
@@ -37,7 +109,7 @@ async def list_tools() -> List[Tool]:
     return [
         Tool(
             name="generate_meme",
-            description="Generate a meme using Imgflip API with intelligent template matching",
+            description="Generate a meme using Imgflip API with intelligent template matching, or render it locally",
             inputSchema={
                 "type": "object",
                 "properties": {
@@ -52,14 +124,50 @@ async def list_tools() -> List[Tool]:
                     "bottom_text": {
                         "type": "string",
                         "description": "Text for the bottom of the meme (optional for some templates)"
+                    },
+                    "render": RENDER_SCHEMA,
+                    "inline": {
+                        "type": "boolean",
+                        "description": "Return a locally rendered meme as an image in the result",
+                        "default": False
                     }
                 },
                 "required": ["template_hint", "top_text"]
             }
         ),
+        Tool(
+            name="generate_memes_batch",
+            description="Generate several memes in one call; templates are matched together and captions are generated concurrently",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "memes": {
+                        "type": "array",
+                        "description": "Memes to generate, each with the same fields as generate_meme",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "template_hint": {"type": "string"},
+                                "top_text": {"type": "string"},
+                                "bottom_text": {"type": "string"}
+                            },
+                            "required": ["template_hint", "top_text"]
+                        },
+                        "minItems": 1
+                    },
+                    "max_concurrency": {
+                        "type": "integer",
+                        "description": "Maximum number of memes generated at the same time",
+                        "minimum": 1
+                    },
+                    "render": RENDER_SCHEMA
+                },
+                "required": ["memes"]
+            }
+        ),
         Tool(
             name="search_meme_templates",
-            description="Search for available meme templates",
+            description="Search for available meme templates, ranked by relevance, with substring and fuzzy matches; long result lists are paginated",
             inputSchema={
                 "type": "object",
                 "properties": {
@@ -70,7 +178,18 @@ async def list_tools() -> List[Tool]:
                     "limit": {
                         "type": "integer",
                         "description": "Maximum number of results to return",
-                        "default": 10
+                        "default": 10,
+                        "minimum": 1
+                    },
+                    "offset": {
+                        "type": "integer",
+                        "description": "Number of ranked results to skip",
+                        "default": 0,
+                        "minimum": 0
+                    },
+                    "cursor": {
+                        "type": "string",
+                        "description": "Cursor from a previous search to fetch its next page (overrides offset)"
                     }
                 },
                 "required": ["query"]
@@ -94,51 +213,117 @@ async def list_tools() -> List[Tool]:
 
 
 @app.call_tool()
-async def call_tool(name: str, arguments: Dict[str, Any]) -> List[TextContent]:
+async def call_tool(
+    name: str, arguments: Dict[str, Any]
+) -> List[Union[TextContent, ImageContent]]:
     """Handle tool calls for meme generation."""
+    with track_tool(name if name in TOOL_NAMES else "unknown"):
+        limit = _session_limit()
+        if limit is None:
+            return await _dispatch_tool(name, arguments)
+        with stage("session_wait"):
+            await limit.acquire()
+        try:
+            return await _dispatch_tool(name, arguments)
+        finally:
+            limit.release()
+
+
+def _session_limit() -> Optional[asyncio.Semaphore]:
+    """Concurrency limit of the session making the current request.
+
+    Each session may run ``IMGFLIP_SESSION_CONCURRENCY`` tool calls at once.
+    """
+    concurrency = int(os.getenv("IMGFLIP_SESSION_CONCURRENCY", "4"))
+    if concurrency <= 0:
+        return None
+    try:
+        session = app.request_context.session
+    except LookupError:
+        return None
+    limit = _session_limits.get(session)
+    if limit is None:
+        limit = asyncio.Semaphore(concurrency)
+        _session_limits[session] = limit
+    return limit
+
+
+async def _dispatch_tool(
+    name: str, arguments: Dict[str, Any]
+) -> List[Union[TextContent, ImageContent]]:
+    """Run one tool call and format its result."""
     try:
+        imgflip_client = get_imgflip_client()
+        template_matcher = get_template_matcher()
         if name == "generate_meme":
-            request = MemeGenerationRequest(**arguments)
+            with stage("validate"):
+                request = MemeGenerationRequest(**arguments)
             
             # Find the best matching template
-            template = await template_matcher.find_best_match(request.template_hint)
+            with stage("match"):
+                template = await template_matcher.find_best_match(request.template_hint)
             if not template:
+                mark_failed()
                 return [TextContent(
                     type="text",
                     text=f"Could not find a suitable meme template for '{request.template_hint}'. Try using search_meme_templates to find available templates."
                 )]
             
             # Generate the meme
-            result = await imgflip_client.generate_meme(
-                template_id=template["id"],
-                top_text=request.top_text,
-                bottom_text=request.bottom_text or ""
-            )
+            with stage("generate"):
+                result = await imgflip_client.generate_meme(
+                    template_id=template["id"],
+                    top_text=request.top_text,
+                    bottom_text=request.bottom_text or "",
+                    render=request.render,
+                    inline=request.inline,
+                )
             
-            if result["success"]:
-                return [TextContent(
-                    type="text",
-                    text=f"Meme generated successfully!\n\nTemplate: {template['name']}\nURL: {result['data']['url']}\nPage URL: {result['data']['page_url']}"
-                )]
+            if result["success"] and result["data"].get("renderer") == "local":
+                with stage("format"):
+                    return _local_render_content(template, result["data"])
+            elif result["success"]:
+                with stage("format"):
+                    return [TextContent(
+                        type="text",
+                        text=f"Meme generated successfully!\n\nTemplate: {template['name']}\nURL: {result['data']['url']}\nPage URL: {result['data']['page_url']}"
+                    )]
             else:
+                mark_failed()
                 return [TextContent(
                     type="text",
                     text=f"Failed to generate meme: {result.get('error_message', 'Unknown error')}"
                 )]
         
+        elif name == "generate_memes_batch":
+            with stage("validate"):
+                request = MemeBatchRequest(**arguments)
+            return [TextContent(type="text", text=await _generate_batch(request))]
+        
         elif name == "search_meme_templates":
-            request = MemeSearchRequest(**arguments)
-            templates = await template_matcher.search_templates(request.query, request.limit)
+            with stage("validate"):
+                request = MemeSearchRequest(**arguments)
+            with stage("search"):
+                page = await template_matcher.search(
+                    request.query,
+                    10 if request.limit is None else request.limit,
+                    offset=request.offset or 0,
+                    cursor=request.cursor,
+                )
             
+            templates = page.templates
             if templates:
                 results = []
                 for template in templates:
                     results.append(f"• {template['name']} (ID: {template['id']})")
                 
-                return [TextContent(
-                    type="text",
-                    text=f"Found {len(templates)} matching templates:\n\n" + "\n".join(results)
-                )]
+                header = f"Found {len(templates)} matching templates"
+                if page.offset:
+                    header += f" (results {page.offset + 1}-{page.offset + len(templates)})"
+                text = header + ":\n\n" + "\n".join(results)
+                if page.next_cursor:
+                    text += f"\n\nMore results available: cursor={page.next_cursor}"
+                return [TextContent(type="text", text=text)]
             else:
                 return [TextContent(
                     type="text",
@@ -165,23 +350,294 @@ async def call_tool(name: str, arguments: Dict[str, Any]) -> List[TextContent]:
                 )]
         
         else:
+            mark_failed()
             return [TextContent(
                 type="text",
                 text=f"Unknown tool: {name}"
             )]
     
     except Exception as e:
+        mark_failed()
         return [TextContent(
             type="text",
             text=f"Error calling tool {name}: {str(e)}"
         )]
 
 
-async def main():
-    """Main entry point for the MCP server."""
+def _local_render_content(
+    template: Dict[str, Any], data: Dict[str, Any]
+) -> List[Union[TextContent, ImageContent]]:
+    """Result of a meme rendered locally, with the image when requested."""
+    text = f"Meme rendered locally!\n\nTemplate: {template['name']}\nFile: {data['path']}"
+    if data.get("fallback_reason"):
+        text += f"\n\nImgflip was unavailable: {data['fallback_reason']}"
+    content: List[Union[TextContent, ImageContent]] = [
+        TextContent(type="text", text=text)
+    ]
+    if data.get("image"):
+        content.append(ImageContent(
+            type="image", data=data["image"], mimeType=data["mime_type"]
+        ))
+    return content
+
+
+async def _generate_batch(request: MemeBatchRequest) -> str:
+    """Match templates for a batch, generate the memes and format the results."""
+    imgflip_client = get_imgflip_client()
+    template_matcher = get_template_matcher()
+    with stage("match"):
+        templates = await template_matcher.find_best_matches(
+            [meme.template_hint for meme in request.memes]
+        )
+    
+    lines: List[str] = [""] * len(request.memes)
+    batch = []
+    positions = []
+    for position, (meme, template) in enumerate(zip(request.memes, templates)):
+        if template is None:
+            lines[position] = f"{position + 1}. Failed: no template found for '{meme.template_hint}'"
+            continue
+        batch.append({
+            "template_id": template["id"],
+            "top_text": meme.top_text,
+            "bottom_text": meme.bottom_text or "",
+        })
+        positions.append(position)
+    
+    done = len(request.memes) - len(batch)
+    succeeded = 0
+    async for batch_position, result in imgflip_client.iter_memes_batch(
+        batch, request.max_concurrency, request.render
+    ):
+        position = positions[batch_position]
+        template = templates[position]
+        if result.get("success"):
+            succeeded += 1
+            data = result["data"]
+            if data.get("renderer") == "local":
+                lines[position] = f"{position + 1}. {template['name']}: {data['path']} (rendered locally)"
+            else:
+                lines[position] = f"{position + 1}. {template['name']}: {data['url']} ({data['page_url']})"
+        else:
+            lines[position] = f"{position + 1}. Failed ({template['name']}): {result.get('error_message', 'Unknown error')}"
+        done += 1
+        await _report_progress(done, len(request.memes))
+    
+    return f"Generated {succeeded} of {len(request.memes)} memes:\n\n" + "\n".join(lines)
+
+
+def _collect_component_metrics() -> List[Any]:
+    """Cache, catalog, flow control, breaker, scoring and render state for scrapes.
+    
+    Empty until the first tool call has created the client and matcher.
+    """
+    if imgflip_client is None or template_matcher is None:
+        return []
+    samples = cache_samples("hint", template_matcher.cache_stats())
+    samples += cache_samples("result", imgflip_client.result_cache.stats())
+    catalog = imgflip_client.catalog
+    samples.append((
+        "imgflip_catalog_templates", "gauge", "Templates in the cached catalog.",
+        {}, len(catalog.index),
+    ))
+    flow = imgflip_client.flow.stats()
+    samples.append((
+        "imgflip_upstream_concurrency_limit", "gauge",
+        "Current adaptive limit on concurrent Imgflip calls.",
+        {}, flow["concurrency_limit"],
+    ))
+    samples.append((
+        "imgflip_upstream_queued", "gauge", "Imgflip calls waiting for admission.",
+        {}, flow["queued"],
+    ))
+    samples.append((
+        "imgflip_upstream_retries_total", "counter", "Retried Imgflip calls.",
+        {}, flow["retries"],
+    ))
+    breaker = imgflip_client.breaker
+    for state in ("closed", "open", "half_open"):
+        samples.append((
+            "imgflip_circuit_state", "gauge", "Circuit breaker state (1 = current).",
+            {"state": state}, 1 if breaker.state == state else 0,
+        ))
+    for (old, new), count in breaker.transitions.items():
+        samples.append((
+            "imgflip_circuit_transitions_total", "counter",
+            "Circuit breaker state transitions.",
+            {"from": old, "to": new}, count,
+        ))
+    samples.append((
+        "imgflip_circuit_rejected_total", "counter",
+        "Calls rejected while the circuit was open.", {}, breaker.rejected,
+    ))
+    scoring = template_matcher.scoring_pool.stats()
+    samples.append((
+        "imgflip_scoring_offloaded_total", "counter",
+        "Template scoring jobs run off the event loop.", {}, scoring["offloaded"],
+    ))
+    samples.append((
+        "imgflip_scoring_cancelled_total", "counter",
+        "Offloaded scoring jobs abandoned by their tool call.",
+        {}, scoring["cancelled"],
+    ))
+    renderer = imgflip_client.renderer
+    if renderer is not None:
+        render = renderer.stats()
+        samples += cache_samples("template_image", render["images"])
+        samples.append((
+            "imgflip_local_renders_total", "counter",
+            "Memes drawn by the local renderer.", {}, render["rendered"],
+        ))
+    return samples
+
+
+async def _report_progress(done: int, total: int) -> None:
+    """Send a progress notification if the client asked for them."""
+    try:
+        context = app.request_context
+    except LookupError:
+        return
+    token = context.meta.progressToken if context.meta else None
+    if token is not None:
+        await context.session.send_progress_notification(token, done, total)
+
+
+def _report_failure(task: "asyncio.Task[None]") -> None:
+    """Log a background task that stopped with an error."""
+    if not task.cancelled() and task.exception() is not None:
+        print(
+            f"Background task {task.get_name()} failed: {task.exception()}",
+            file=sys.stderr,
+        )
+
+
+def _start_background_tasks(worker: int = 0) -> List["asyncio.Task[None]"]:
+    """Alias hot reload, loop lag and the metrics endpoint, when enabled.
+    
+    Each HTTP worker keeps its own metrics, so worker ``worker`` serves them
+    on ``IMGFLIP_METRICS_PORT + worker``.
+    """
+    tasks = []
+    lag_interval = float(os.getenv("IMGFLIP_LOOP_LAG_INTERVAL", "0.1"))
+    if lag_interval > 0:
+        tasks.append(asyncio.create_task(watch_loop_lag(lag_interval)))
+    reload_interval = float(os.getenv("IMGFLIP_ALIASES_RELOAD_INTERVAL", "2"))
+    if reload_interval > 0:
+        tasks.append(asyncio.create_task(
+            get_alias_registry().watch(reload_interval)
+        ))
+    metrics_port = os.getenv("IMGFLIP_METRICS_PORT")
+    if metrics_port:
+        tasks.append(asyncio.create_task(
+            serve_metrics(
+                os.getenv("IMGFLIP_METRICS_HOST", "127.0.0.1"),
+                int(metrics_port) + worker,
+            ),
+            name="metrics endpoint",
+        ))
+    for task in tasks:
+        task.add_done_callback(_report_failure)
+    return tasks
+
+
+async def serve_stdio() -> None:
+    """Serve a single client over stdin/stdout."""
+    tasks = _start_background_tasks()
     async with stdio_server() as (read_stream, write_stream):
-        await app.run(read_stream, write_stream, app.create_initialization_options())
+        try:
+            await app.run(read_stream, write_stream, app.create_initialization_options())
+        finally:
+            for task in tasks:
+                task.cancel()
+
+
+async def serve(args: argparse.Namespace) -> None:
+    """Run the server on the transport selected by ``args``."""
+    if args.transport == "stdio":
+        await serve_stdio()
+        return
+    
+    await serve_http_worker(args)
+
+
+async def serve_http_worker(
+    args: argparse.Namespace, sock: Optional[socket.socket] = None, worker: int = 0
+) -> None:
+    """Serve HTTP clients from this process, on ``sock`` when pre-bound."""
+    from .http_server import serve_http
+    
+    tasks = _start_background_tasks(worker)
+    try:
+        await serve_http(
+            app,
+            args.host,
+            args.port,
+            json_response=args.json_response,
+            stateless=args.stateless,
+            sock=sock,
+        )
+    finally:
+        for task in tasks:
+            task.cancel()
+        if imgflip_client is not None:
+            await imgflip_client.aclose()
+
+
+def _run_worker(sock: socket.socket, worker: int, args: argparse.Namespace) -> None:
+    """Entry point of worker number ``worker`` in multi-worker mode."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    asyncio.run(serve_http_worker(args, sock, worker))
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    """Command line options of the ``imgflip-mcp`` entry point."""
+    parser = argparse.ArgumentParser(
+        prog="imgflip-mcp", description="MCP server for generating Imgflip memes."
+    )
+    parser.add_argument(
+        "--transport",
+        choices=["stdio", "http"],
+        default=os.getenv("IMGFLIP_TRANSPORT", "stdio"),
+        help="stdio for one client, or http to serve streamable HTTP (/mcp) "
+        "and SSE (/sse) to many clients from one process",
+    )
+    parser.add_argument("--host", default=os.getenv("IMGFLIP_HOST", "127.0.0.1"))
+    parser.add_argument(
+        "--port", type=int, default=int(os.getenv("IMGFLIP_PORT", "8000"))
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.getenv("IMGFLIP_WORKERS", "1")),
+        help="HTTP worker processes sharing the port, catalog and caches",
+    )
+    parser.add_argument(
+        "--stateless",
+        action="store_true",
+        help="do not track sessions on /mcp (disables per-session limits)",
+    )
+    parser.add_argument(
+        "--json-response",
+        action="store_true",
+        help="answer /mcp requests with JSON instead of SSE streams",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    """Main entry point for the MCP server."""
+    from dotenv import load_dotenv
+    
+    # Before parsing, as option defaults come from the environment.
+    load_dotenv()
+    args = parse_args(argv)
+    if args.transport == "http" and args.workers > 1:
+        from .http_server import run_workers
+        
+        run_workers(args.workers, args.host, args.port, _run_worker, (args,))
+        return
+    asyncio.run(serve(args))
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    main()
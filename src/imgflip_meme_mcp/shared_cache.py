@@ -0,0 +1,83 @@
+"""SQLite-backed key/value cache shared between worker processes."""
+
+import os
+import sqlite3
+import sys
+import time
+from typing import Optional
+
+
+class SQLiteCache:
+    """String values by key in a SQLite file, with a TTL and size bound.
+
+    The database runs in WAL mode, so any number of processes can read while
+    one writes. Errors are reported on stderr and treated as misses; a file
+    that cannot be opened leaves the cache disabled.
+    """
+
+    def __init__(self, path: str, table: str, max_size: int, ttl: float):
+        self.path = path
+        self.table = table
+        self.max_size = max_size
+        self.ttl = ttl
+        self._db = self._open()
+
+    @property
+    def enabled(self) -> bool:
+        return self._db is not None
+
+    def _open(self) -> Optional[sqlite3.Connection]:
+        """Open the database, or return None after reporting the error."""
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            db = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} ("
+                " key TEXT PRIMARY KEY, data TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            db.execute(
+                f"CREATE INDEX IF NOT EXISTS {self.table}_created"
+                f" ON {self.table} (created_at)"
+            )
+            return db
+        except sqlite3.Error as e:
+            print(f"Shared cache disabled for {self.path}: {e}", file=sys.stderr)
+            return None
+
+    def get(self, key: str) -> Optional[str]:
+        """The value stored under ``key`` within the TTL, or None."""
+        if self._db is None:
+            return None
+        try:
+            row = self._db.execute(
+                f"SELECT data, created_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+        except sqlite3.Error:
+            return None
+        if row is None or time.time() - row[1] > self.ttl:
+            return None
+        return row[0]
+
+    def set(self, key: str, value: str) -> None:
+        """Store ``value`` and drop expired and least recent entries."""
+        if self._db is None:
+            return
+        now = time.time()
+        try:
+            self._db.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, data, created_at)"
+                " VALUES (?, ?, ?)",
+                (key, value, now),
+            )
+            self._db.execute(
+                f"DELETE FROM {self.table} WHERE created_at < ? OR key IN ("
+                f" SELECT key FROM {self.table} ORDER BY created_at DESC"
+                " LIMIT -1 OFFSET ?)",
+                (now - self.ttl, self.max_size),
+            )
+        except sqlite3.Error as e:
+            print(f"Error writing shared cache {self.path}: {e}", file=sys.stderr)
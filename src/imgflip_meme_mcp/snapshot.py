@@ -0,0 +1,135 @@
+"""On-disk snapshots of the template catalog for fast cold starts."""
+
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from .ingest import to_records
+
+SNAPSHOT_FORMAT = 1
+
+
+@dataclass
+class CatalogSnapshot:
+    """Templates plus the HTTP validators of the response they came from.
+
+    ``sources`` fingerprints the extra template sources merged in, so a
+    refresh knows whether the validators still describe the whole catalog.
+    """
+
+    templates: List[Dict[str, Any]]
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    content_hash: Optional[str] = None
+    saved_at: float = field(default_factory=time.time)
+    sources: Optional[str] = None
+
+
+def content_hash(body: bytes) -> str:
+    """Hash a raw ``/get_memes`` body so unchanged refreshes can skip parsing."""
+    return hashlib.sha256(body).hexdigest()
+
+
+def default_cache_dir() -> Optional[str]:
+    """``IMGFLIP_CACHE_DIR`` (``~/.cache/imgflip-meme-mcp`` by default).
+
+    Returns None when it is set to an empty value, which disables on-disk
+    caches.
+    """
+    cache_dir = os.getenv("IMGFLIP_CACHE_DIR")
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.expanduser("~"), ".cache", "imgflip-meme-mcp")
+    return cache_dir or None
+
+
+def default_snapshot_path(key: str) -> Optional[str]:
+    """Snapshot file for the catalog ``key``, or None when disabled."""
+    cache_dir = default_cache_dir()
+    if cache_dir is None:
+        return None
+    digest = hashlib.sha1(key.encode()).hexdigest()[:12]
+    return os.path.join(cache_dir, f"templates-{digest}.json")
+
+
+def load_snapshot(path: str) -> Optional[CatalogSnapshot]:
+    """Load a snapshot, returning None if it is missing or unreadable."""
+    try:
+        with open(path, "rb") as f:
+            data = json.loads(f.read())
+        if data.get("format") != SNAPSHOT_FORMAT:
+            return None
+        return CatalogSnapshot(
+            templates=list(to_records(data["templates"])),
+            etag=data.get("etag"),
+            last_modified=data.get("last_modified"),
+            content_hash=data.get("content_hash"),
+            saved_at=data.get("saved_at", 0.0),
+            sources=data.get("sources"),
+        )
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        print(f"Ignoring unreadable template snapshot {path}: {e}", file=sys.stderr)
+        return None
+
+
+def save_snapshot(path: str, snapshot: CatalogSnapshot) -> None:
+    """Atomically write ``snapshot`` to ``path``."""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    payload = json.dumps(
+        {
+            "format": SNAPSHOT_FORMAT,
+            "saved_at": snapshot.saved_at,
+            "etag": snapshot.etag,
+            "last_modified": snapshot.last_modified,
+            "content_hash": snapshot.content_hash,
+            "sources": snapshot.sources,
+            "templates": snapshot.templates,
+        },
+        separators=(",", ":"),
+        default=dict,
+    ).encode()
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".templates-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def lock_file(path: str) -> Optional[int]:
+    """Block until this process holds an exclusive lock on ``path``.
+
+    Returns the locked file descriptor, or None where ``fcntl`` is unavailable
+    and processes cannot coordinate.
+    """
+    try:
+        import fcntl
+    except ImportError:
+        return None
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+    except BaseException:
+        os.close(fd)
+        raise
+    return fd
+
+
+def unlock_file(fd: int) -> None:
+    """Release a lock taken with :func:`lock_file`."""
+    import fcntl
+
+    try:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    finally:
+        os.close(fd)
@@ -0,0 +1,202 @@
+"""Lookup and search indexes built once per template catalog refresh."""
+
+import bisect
+import re
+import threading
+from typing import TYPE_CHECKING, Any, Dict, FrozenSet, Iterator, List, Optional, Set
+
+if TYPE_CHECKING:
+    from .vector_index import VectorIndex
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def normalize(text: str) -> str:
+    """Normalize a hint, query or template name for matching."""
+    return text.lower().strip()
+
+
+def tokenize(text: str) -> FrozenSet[str]:
+    """Split already-normalized text into its set of word tokens."""
+    return frozenset(_WORD_RE.findall(text))
+
+
+def trigrams(text: str) -> Set[str]:
+    """Character trigrams of ``text``, padded so short words still produce some."""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TemplateIndex:
+    """Immutable indexes over one version of the template catalog.
+
+    Holds an id lookup table, the lowercased name and word-token set of every
+    template, and inverted indexes from word tokens and character trigrams to
+    template positions.
+    """
+
+    def __init__(self, templates: List[Dict[str, Any]]):
+        self.templates = templates
+        self.by_id: Dict[str, Dict[str, Any]] = {}
+        self.names: List[str] = []
+        self.tokens: List[FrozenSet[str]] = []
+        self.postings: Dict[str, List[int]] = {}
+        self.trigram_postings: Dict[str, List[int]] = {}
+        self.trigram_counts: List[int] = []
+        self.name_positions: Dict[str, int] = {}
+        self.max_name_length = 0
+        self._vectors: Any = None
+        self._vectors_lock = threading.Lock()
+
+        for position, template in enumerate(templates):
+            self.by_id.setdefault(str(template["id"]), template)
+            name = template["name"].lower()
+            tokens = tokenize(name)
+            self.names.append(name)
+            self.tokens.append(tokens)
+            self.name_positions.setdefault(name, position)
+            self.max_name_length = max(self.max_name_length, len(name))
+            for token in tokens:
+                self.postings.setdefault(token, []).append(position)
+            grams = trigrams(name)
+            self.trigram_counts.append(len(grams))
+            for gram in grams:
+                self.trigram_postings.setdefault(gram, []).append(position)
+        # Vocabulary sorted forwards and by reversed token, for prefix and
+        # suffix lookups by bisection.
+        self.sorted_tokens = sorted(self.postings)
+        self.sorted_reversed_tokens = sorted(token[::-1] for token in self.postings)
+        # Rank of every name by length, then position, for shortest-first scans.
+        by_length = sorted(range(len(self.names)), key=lambda p: len(self.names[p]))
+        self.length_ranks = [0] * len(by_length)
+        for rank, position in enumerate(by_length):
+            self.length_ranks[position] = rank
+
+    def __len__(self) -> int:
+        return len(self.templates)
+
+    def vectors(self) -> Optional["VectorIndex"]:
+        """TF-IDF vectors of the template names, built on first use.
+
+        Returns None when NumPy is not installed.
+        """
+        if self._vectors is None:
+            with self._vectors_lock:
+                if self._vectors is None:
+                    try:
+                        from .vector_index import VectorIndex
+                    except ImportError:
+                        self._vectors = False
+                    else:
+                        self._vectors = VectorIndex(self)
+        return self._vectors or None
+
+    def get(self, template_id: str) -> Optional[Dict[str, Any]]:
+        """Return the template with ``template_id``, if any."""
+        return self.by_id.get(str(template_id))
+
+    def _positions_for_word(
+        self, word: str, whole_start: bool, whole_end: bool
+    ) -> Set[int]:
+        """Positions of templates with a token that could contain ``word``.
+
+        ``whole_start``/``whole_end`` say whether the word is delimited on that
+        side within the query, in which case the token must start/end there.
+        Words delimited on neither side are looked up by trigram, which may
+        return extra positions; callers check the name itself.
+        """
+        if whole_start and whole_end:
+            return set(self.postings.get(word, ()))
+        if whole_start:
+            matches = _with_prefix(self.sorted_tokens, word)
+        elif whole_end:
+            matches = (
+                token[::-1]
+                for token in _with_prefix(self.sorted_reversed_tokens, word[::-1])
+            )
+        elif len(word) >= 3:
+            return self._positions_with_trigrams(word)
+        else:
+            matches = (t for t in self.postings if word in t)
+        positions: Set[int] = set()
+        for token in matches:
+            positions.update(self.postings[token])
+        return positions
+
+    def _positions_with_trigrams(self, word: str) -> Set[int]:
+        """Positions of templates with every trigram of ``word``.
+
+        A superset of the templates containing ``word``, which callers
+        confirm against the name.
+        """
+        grams = {word[i:i + 3] for i in range(len(word) - 2)}
+        postings = sorted(
+            (self.trigram_postings.get(gram, ()) for gram in grams), key=len
+        )
+        positions = set(postings[0])
+        for posting in postings[1:]:
+            if not positions:
+                break
+            positions.intersection_update(posting)
+        return positions
+
+    def substring_search(self, query: str) -> List[Dict[str, Any]]:
+        """Templates whose lowercased name contains ``query``, in catalog order."""
+        return [self.templates[i] for i in self.substring_positions(query)]
+
+    def substring_positions(self, query: str) -> List[int]:
+        """Positions of templates whose lowercased name contains ``query``."""
+        return list(self.iter_substring_positions(query))
+
+    def iter_substring_positions(
+        self, query: str, shortest_first: bool = False
+    ) -> Iterator[int]:
+        """Lazily yield positions whose lowercased name contains ``query``.
+
+        Each word of the query is looked up in the token vocabulary rather
+        than scanning every template name, and only templates that contain
+        all of the words are checked for the full substring. Positions come
+        in catalog order, or with ``shortest_first`` by name length and then
+        catalog order.
+        """
+        candidates: Optional[Set[int]] = None
+        for match in _WORD_RE.finditer(query):
+            positions = self._positions_for_word(
+                match.group(), match.start() > 0, match.end() < len(query)
+            )
+            candidates = positions if candidates is None else candidates & positions
+            if not candidates:
+                return
+
+        names = self.names
+        if shortest_first:
+            positions_to_check = sorted(
+                range(len(names)) if candidates is None else candidates,
+                key=self.length_ranks.__getitem__,
+            )
+        elif candidates is None:
+            positions_to_check = range(len(names))
+        else:
+            positions_to_check = sorted(candidates)
+        for i in positions_to_check:
+            if query in names[i]:
+                yield i
+
+    def names_within(self, text: str) -> Iterator[int]:
+        """Yield positions of templates whose whole name occurs inside ``text``."""
+        name_positions = self.name_positions
+        longest = self.max_name_length
+        for start in range(len(text)):
+            for end in range(start + 1, min(len(text), start + longest) + 1):
+                position = name_positions.get(text[start:end])
+                if position is not None:
+                    yield position
+
+
+def _with_prefix(sorted_tokens: List[str], prefix: str) -> Iterator[str]:
+    """Tokens of a sorted vocabulary that start with ``prefix``."""
+    for i in range(bisect.bisect_left(sorted_tokens, prefix), len(sorted_tokens)):
+        token = sorted_tokens[i]
+        if not token.startswith(prefix):
+            return
+        yield token
@@ -1,121 +1,319 @@
 """Template matching system for intelligent meme selection."""
 
-import re
+import base64
+import binascii
+import hashlib
+import json
+import os
+import sys
 from typing import Dict, List, Optional, Any
-from difflib import SequenceMatcher
+from .alias_registry import AliasRegistry, get_alias_registry
+from .aliases import AliasIndex
+from .cache import MISSING, LRUCache
+from .fuzzy import FuzzyMatcher, similarity
 from .imgflip_client import ImgflipClient
+from .metrics import stage
+from .offload import CancelToken, ScoringPool, get_scoring_pool
+from .shared_cache import SQLiteCache
+from .template_index import TemplateIndex, normalize, tokenize
+
+def _fuzzy_match(
+    index: TemplateIndex, token: CancelToken, hint_lower: str
+) -> Optional[int]:
+    """Position of the best fuzzy match for a normalized hint, if any."""
+    match = FuzzyMatcher(index).best_match(hint_lower, threshold=0.3, token=token)
+    return None if match is None else match[1]
+
+
+def _fuzzy_match_many(
+    index: TemplateIndex, token: CancelToken, hints_lower: List[str]
+) -> List[Optional[int]]:
+    """:func:`_fuzzy_match` for several hints, each scored separately."""
+    matches = FuzzyMatcher(index).best_matches(hints_lower, threshold=0.3, token=token)
+    return [None if match is None else match[1] for match in matches]
+
+
+def _search_page(
+    index: TemplateIndex, token: CancelToken, query: str, end: int
+) -> List[int]:
+    """Positions of the ``end`` best search results for a lowercased query.
+
+    The shortlist size is fixed, so every page ranks the same candidates and
+    the first ``end`` results of a query never depend on ``end``.
+    """
+    matcher = FuzzyMatcher(index)
+    return [
+        position for _, position in matcher.top_matches(query, end, token=token)
+    ]
+
+
+class SearchPage:
+    """One page of ranked search results."""
+    
+    __slots__ = ("templates", "offset", "next_cursor")
+    
+    def __init__(
+        self,
+        templates: List[Dict[str, Any]],
+        offset: int,
+        next_cursor: Optional[str],
+    ):
+        self.templates = templates
+        self.offset = offset
+        # Opaque token for the following page, or None on the last one
+        self.next_cursor = next_cursor
+
+
+def encode_cursor(query: str, offset: int) -> str:
+    """Cursor resuming a search for ``query`` at ``offset``."""
+    payload = json.dumps({"q": query, "o": offset}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, query: str) -> int:
+    """Offset stored in ``cursor``; raises ValueError if it is not for ``query``."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        offset = int(payload["o"])
+        cursor_query = payload["q"]
+    except (ValueError, KeyError, TypeError, binascii.Error) as e:
+        raise ValueError("Invalid search cursor") from e
+    if cursor_query != query or offset < 0:
+        raise ValueError("Search cursor does not belong to this query")
+    return offset
 
 
 class TemplateMatcher:
     """Intelligent system for matching meme requests to templates."""
     
-    def __init__(self):
-        self.imgflip_client = ImgflipClient()
-        self._template_aliases = {
-            # Men's Warehouse meme
-            "mens warehouse": ["181913649"],
-            "men's warehouse": ["181913649"],
-            "mens": ["181913649"],
-            "guarantee": ["181913649"],
-            "i guarantee it": ["181913649"],
-            
-            # Drake pointing/approving  
-            "drake": ["112126428"],
-            "drake pointing": ["112126428"],
-            "drake approve": ["112126428"],
-            "drake disapprove": ["112126428"],
-            
-            # Distracted boyfriend
-            "distracted boyfriend": ["112126428"],
-            "boyfriend looking back": ["112126428"],
-            "cheating boyfriend": ["112126428"],
-            
-            # Popular memes
-            "two buttons": ["87743020"],
-            "expanding brain": ["112126428"],
-            "woman yelling at cat": ["188390779"],
-            "surprised pikachu": ["155067746"],
-            "change my mind": ["129242436"],
-            "this is fine": ["55311130"],
-            "uno reverse": ["124055727"],
-            "always has been": ["216951317"],
-            
-            # Classic memes
-            "one does not simply": ["61579"],
-            "most interesting man": ["61532"],
-            "y u no": ["61527"],
-            "philosoraptor": ["61516"],
-            "success kid": ["61544"],
-            "bad luck brian": ["61585"],
-            "scumbag steve": ["61522"],
-            "good guy greg": ["61520"],
-            "first world problems": ["61539"],
-            "overly attached girlfriend": ["61518"],
-        }
+    def __init__(
+        self,
+        imgflip_client: Optional[ImgflipClient] = None,
+        alias_registry: Optional[AliasRegistry] = None,
+        scoring_pool: Optional[ScoringPool] = None,
+    ):
+        self.imgflip_client = imgflip_client or ImgflipClient()
+        self.alias_registry = alias_registry or get_alias_registry()
+        # Scores large catalogs off the event loop
+        self.scoring_pool = scoring_pool or get_scoring_pool()
+        self._alias_index: Optional[AliasIndex] = None
+        self._alias_index_sources: tuple = (None, None)
+        # Resolved hint -> template (or None), valid for one compiled alias index
+        cache_size = int(os.getenv("IMGFLIP_HINT_CACHE_SIZE", "1024"))
+        cache_ttl = float(os.getenv("IMGFLIP_HINT_CACHE_TTL", "3600"))
+        self._resolution_cache = LRUCache(max_size=cache_size, ttl=cache_ttl)
+        # Optional cross-process layer; keys are scoped to the catalog content
+        # and alias table, so workers only share compatible resolutions.
+        shared_path = os.getenv("IMGFLIP_HINT_CACHE_PATH")
+        self._shared_resolutions: Optional[SQLiteCache] = None
+        if shared_path and cache_size > 0:
+            self._shared_resolutions = SQLiteCache(
+                shared_path, "hints", max_size=cache_size * 16, ttl=cache_ttl
+            )
+        self._shared_namespace: Optional[str] = None
+    
+    @property
+    def _template_aliases(self) -> Dict[str, List[str]]:
+        """Current alias table from the registry."""
+        return self.alias_registry.aliases
+    
+    def _compiled_aliases(self, index: TemplateIndex) -> AliasIndex:
+        """Alias index for the current catalog, recompiled when either changes.
+        
+        The new index is built before it replaces the old one, so requests
+        already holding the previous index finish with it undisturbed.
+        """
+        compiled_for, compiled_aliases = self._alias_index_sources
+        aliases = self._template_aliases
+        if (
+            self._alias_index is None
+            or compiled_for is not index
+            or compiled_aliases is not aliases
+        ):
+            alias_index = AliasIndex(aliases, index)
+            if alias_index.unresolved and len(index):
+                unknown = ", ".join(
+                    f"{alias!r} -> {ids}"
+                    for alias, ids in alias_index.unresolved.items()
+                )
+                print(f"Aliases with unknown template ids: {unknown}", file=sys.stderr)
+            self._alias_index = alias_index
+            self._alias_index_sources = (index, aliases)
+            self._resolution_cache.clear()
+            self._shared_namespace = self._namespace_for(index, aliases)
+        return self._alias_index
+    
+    def _namespace_for(
+        self, index: TemplateIndex, aliases: Dict[str, List[str]]
+    ) -> Optional[str]:
+        """Shared-cache key prefix for a catalog version and alias table."""
+        if self._shared_resolutions is None:
+            return None
+        catalog = self.imgflip_client.catalog
+        snapshot = catalog.snapshot
+        if catalog.index is not index or snapshot is None or not snapshot.content_hash:
+            return None
+        alias_digest = hashlib.sha1(
+            json.dumps(aliases, sort_keys=True).encode()
+        ).hexdigest()
+        return f"{snapshot.content_hash[:16]}:{alias_digest[:16]}:"
+    
+    def _shared_get(self, hint_lower: str, index: TemplateIndex) -> Any:
+        """Resolution another worker stored for this hint, or MISSING."""
+        if self._shared_resolutions is None or self._shared_namespace is None:
+            return MISSING
+        stored = self._shared_resolutions.get(self._shared_namespace + hint_lower)
+        if stored is None:
+            return MISSING
+        template_id = json.loads(stored)
+        if template_id is None:
+            return None
+        template = index.get(template_id)
+        return MISSING if template is None else template
+    
+    def _shared_set(
+        self, hint_lower: str, template: Optional[Dict[str, Any]]
+    ) -> None:
+        if self._shared_resolutions is None or self._shared_namespace is None:
+            return
+        template_id = template["id"] if template is not None else None
+        self._shared_resolutions.set(
+            self._shared_namespace + hint_lower, json.dumps(template_id)
+        )
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters of the hint resolution cache."""
+        return self._resolution_cache.stats()
     
     async def find_best_match(self, hint: str) -> Optional[Dict[str, Any]]:
         """Find the best matching template for a given hint."""
-        hint_lower = hint.lower().strip()
+        hint_lower = normalize(hint)
+        with stage("catalog"):
+            index = await self.imgflip_client.catalog.get_index()
+        alias_index = self._compiled_aliases(index)
         
-        # Check direct aliases first
-        for alias, template_ids in self._template_aliases.items():
-            if alias in hint_lower or hint_lower in alias:
-                # Get template details from cache
-                templates = await self.imgflip_client.get_popular_templates()
-                for template in templates:
-                    if template["id"] in template_ids:
-                        return template
+        template = self._cached(hint_lower, index)
+        if template is MISSING:
+            template = await self._resolve(hint_lower, index, alias_index)
+            self._remember(hint_lower, template)
+        return template
+    
+    async def find_best_matches(
+        self, hints: List[str]
+    ) -> List[Optional[Dict[str, Any]]]:
+        """Resolve several hints at once; repeated hints are resolved once.
         
-        # If no direct match, search by similarity
-        templates = await self.imgflip_client.get_popular_templates()
-        if not templates:
-            return None
+        Hints that need fuzzy matching are scored separately, inside one
+        offloaded job.
+        """
+        with stage("catalog"):
+            index = await self.imgflip_client.catalog.get_index()
+        alias_index = self._compiled_aliases(index)
         
-        best_match = None
-        best_score = 0.0
+        resolved: Dict[str, Optional[Dict[str, Any]]] = {}
+        fuzzy: List[str] = []
+        for hint in hints:
+            key = normalize(hint)
+            if key in resolved:
+                continue
+            template = self._cached(key, index)
+            if template is MISSING:
+                with stage("alias"):
+                    template = alias_index.match(key)
+                if template is None:
+                    fuzzy.append(key)
+                else:
+                    self._remember(key, template)
+            resolved[key] = template
         
-        for template in templates:
-            score = self._calculate_similarity(hint_lower, template["name"].lower())
-            if score > best_score and score > 0.3:  # Minimum similarity threshold
-                best_score = score
-                best_match = template
+        if fuzzy:
+            with stage("fuzzy"):
+                positions = await self.scoring_pool.run(
+                    index, _fuzzy_match_many, fuzzy
+                )
+            for key, position in zip(fuzzy, positions):
+                template = None if position is None else index.templates[position]
+                self._remember(key, template)
+                resolved[key] = template
+        return [resolved[normalize(hint)] for hint in hints]
+    
+    def _cached(self, hint_lower: str, index: TemplateIndex) -> Any:
+        """Resolution from the local or shared cache, or MISSING."""
+        cached = self._resolution_cache.get(hint_lower)
+        if cached is not MISSING:
+            return cached
+        shared = self._shared_get(hint_lower, index)
+        if shared is not MISSING:
+            self._resolution_cache.set(hint_lower, shared)
+        return shared
+    
+    def _remember(
+        self, hint_lower: str, template: Optional[Dict[str, Any]]
+    ) -> None:
+        self._shared_set(hint_lower, template)
+        self._resolution_cache.set(hint_lower, template)
+    
+    async def _resolve(
+        self, hint_lower: str, index: TemplateIndex, alias_index: AliasIndex
+    ) -> Optional[Dict[str, Any]]:
+        """Resolve a normalized hint without consulting the cache."""
+        # Check direct aliases first
+        with stage("alias"):
+            template = alias_index.match(hint_lower)
+        if template is not None:
+            return template
         
-        return best_match
+        # If no direct match, search by similarity over a pruned shortlist
+        with stage("fuzzy"):
+            position = await self.scoring_pool.run(index, _fuzzy_match, hint_lower)
+        if position is None:
+            return None
+        return index.templates[position]
     
     def _calculate_similarity(self, hint: str, template_name: str) -> float:
         """Calculate similarity between hint and template name."""
-        # Direct substring match gets high score
-        if hint in template_name or template_name in hint:
-            return 0.9
-        
-        # Use sequence matcher for fuzzy matching
-        sequence_score = SequenceMatcher(None, hint, template_name).ratio()
-        
-        # Word-level matching
-        hint_words = set(re.findall(r'\w+', hint.lower()))
-        template_words = set(re.findall(r'\w+', template_name.lower()))
-        
-        if hint_words and template_words:
-            word_score = len(hint_words & template_words) / len(hint_words | template_words)
-        else:
-            word_score = 0.0
-        
-        # Combine scores with weights
-        return 0.6 * sequence_score + 0.4 * word_score
+        return similarity(
+            hint, tokenize(hint.lower()), template_name, tokenize(template_name.lower())
+        )
     
     async def search_templates(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
         """Search for templates matching a query."""
-        templates = await self.imgflip_client.search_templates(query)
-        
-        # Sort by similarity to query
-        scored_templates = []
-        for template in templates:
-            score = self._calculate_similarity(query.lower(), template["name"].lower())
-            scored_templates.append((score, template))
+        return (await self.search(query, limit)).templates
+    
+    async def search(
+        self,
+        query: str,
+        limit: int = 10,
+        offset: int = 0,
+        cursor: Optional[str] = None,
+    ) -> SearchPage:
+        """One page of templates ranked by similarity to ``query``.
         
-        # Sort by score (descending) and return top results
-        scored_templates.sort(key=lambda x: x[0], reverse=True)
-        return [template for _, template in scored_templates[:limit]]
+        Substring matches come first, closest in length to the query first,
+        followed by fuzzy matches. Pages start at ``offset``, or where the
+        page that returned ``cursor`` ended; consecutive pages never repeat
+        or skip a result. Only the results up to the end of the page are kept
+        ranked, so the heap grows with ``offset + limit`` rather than with
+        the number of matches.
+        """
+        query_lower = normalize(query)
+        if cursor:
+            offset = decode_cursor(cursor, query_lower)
+        if limit < 1 or offset < 0:
+            raise ValueError("limit must be positive and offset non-negative")
+        index = await self.imgflip_client.catalog.get_index()
+        # One extra result tells whether another page follows.
+        positions = await self.scoring_pool.run(
+            index, _search_page, query_lower, offset + limit + 1
+        )
+        page = positions[offset:offset + limit]
+        next_cursor = None
+        if len(positions) > offset + limit:
+            next_cursor = encode_cursor(query_lower, offset + limit)
+        return SearchPage(
+            [index.templates[position] for position in page], offset, next_cursor
+        )
     
     def get_template_suggestions(self) -> List[str]:
         """Get a list of supported template hints."""
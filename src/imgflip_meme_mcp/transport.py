@@ -0,0 +1,143 @@
+"""Pooled async HTTP transport for the Imgflip API."""
+
+import asyncio
+import os
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+import httpx
+
+
+def _env_int(name: str, default: int) -> int:
+    """Read an integer setting from the environment."""
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+def _env_float(name: str, default: float) -> float:
+    """Read a float setting from the environment."""
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+def _http2_available() -> bool:
+    """Return True when the optional ``h2`` package is installed."""
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+@dataclass
+class TransportConfig:
+    """Connection pool and timeout settings for the Imgflip transport."""
+
+    max_connections: int = field(
+        default_factory=lambda: _env_int("IMGFLIP_MAX_CONNECTIONS", 20)
+    )
+    max_keepalive_connections: int = field(
+        default_factory=lambda: _env_int("IMGFLIP_MAX_KEEPALIVE", 20)
+    )
+    keepalive_expiry: float = field(
+        default_factory=lambda: _env_float("IMGFLIP_KEEPALIVE_EXPIRY", 30.0)
+    )
+    connect_timeout: float = field(
+        default_factory=lambda: _env_float("IMGFLIP_CONNECT_TIMEOUT", 5.0)
+    )
+    pool_timeout: float = field(
+        default_factory=lambda: _env_float("IMGFLIP_POOL_TIMEOUT", 10.0)
+    )
+    http2: Optional[bool] = None
+
+    def limits(self) -> httpx.Limits:
+        """Build the httpx connection limits for this config."""
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+    def timeout(self, read_timeout: float) -> httpx.Timeout:
+        """Build an httpx timeout using ``read_timeout`` for read and write."""
+        return httpx.Timeout(
+            read_timeout,
+            connect=self.connect_timeout,
+            pool=self.pool_timeout,
+        )
+
+
+class HttpTransport:
+    """Shared keep-alive connection pool for calls to a single Imgflip host.
+
+    The underlying ``httpx.AsyncClient`` is created lazily and recreated if the
+    transport is used from a different event loop, since pooled connections are
+    bound to the loop that opened them.
+    """
+
+    def __init__(self, base_url: str, config: Optional[TransportConfig] = None):
+        self.base_url = base_url.rstrip("/")
+        self.config = config or TransportConfig()
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def http2(self) -> bool:
+        """Whether HTTP/2 is negotiated for this transport."""
+        if self.config.http2 is None:
+            return _http2_available()
+        return self.config.http2 and _http2_available()
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Return the pooled client for the running event loop."""
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client.is_closed or self._loop is not loop:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                limits=self.config.limits(),
+                timeout=self.config.timeout(30.0),
+                http2=self.http2,
+            )
+            self._loop = loop
+        return self._client
+
+    async def request(
+        self, method: str, path: str, timeout: float = 30.0, **kwargs: Any
+    ) -> httpx.Response:
+        """Send a request over the shared connection pool."""
+        client = self._get_client()
+        return await client.request(
+            method, path, timeout=self.config.timeout(timeout), **kwargs
+        )
+
+    async def get(
+        self, path: str, timeout: float = 10.0, **kwargs: Any
+    ) -> httpx.Response:
+        """Send a GET request."""
+        return await self.request("GET", path, timeout=timeout, **kwargs)
+
+    async def post(
+        self, path: str, timeout: float = 30.0, **kwargs: Any
+    ) -> httpx.Response:
+        """Send a POST request."""
+        return await self.request("POST", path, timeout=timeout, **kwargs)
+
+    async def aclose(self) -> None:
+        """Close pooled connections."""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+        self._loop = None
+
+
+_transports: Dict[str, HttpTransport] = {}
+
+
+def get_transport(base_url: str) -> HttpTransport:
+    """Return the process-wide transport for ``base_url``."""
+    key = base_url.rstrip("/")
+    transport = _transports.get(key)
+    if transport is None:
+        transport = HttpTransport(key)
+        _transports[key] = transport
+    return transport
@@ -3,6 +3,7 @@
 
 import asyncio
 import os
+from dotenv import load_dotenv
 from src.imgflip_meme_mcp.imgflip_client import ImgflipClient
 from src.imgflip_meme_mcp.template_matcher import TemplateMatcher
 
@@ -78,5 +79,6 @@ async def test_search_functionality():
 
 
 if __name__ == "__main__":
+    load_dotenv()
     asyncio.run(test_mens_warehouse_meme())
     asyncio.run(test_search_functionality())
\ No newline at end of file
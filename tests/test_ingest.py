@@ -0,0 +1,65 @@
+"""Tests for streaming template dumps."""
+
+import io
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), "src"))
+
+from imgflip_meme_mcp import ingest  # noqa: E402
+
+DOCUMENTS = [
+    "[1.5e-07, 4500.0, -12, 3E+2, 0.25]",
+    '[{"id": "1", "name": "Drake", "width": 1200.0}, {"id": "2", "name": "a\\"b"}]',
+    '["a long string split across chunks", "\\u00e9t\\u00e9", "x"]',
+    "[true, false, null, 7]",
+    "[]",
+    "[1,2 , 3]",
+]
+
+
+def parse(text: str) -> list:
+    return list(ingest._iter_json_array(io.StringIO(text)))
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 4, 5, 7, 16])
+@pytest.mark.parametrize("document", DOCUMENTS)
+def test_items_split_across_chunks(monkeypatch, chunk_size, document):
+    monkeypatch.setattr(ingest, "_CHUNK_SIZE", chunk_size)
+    assert parse(document) == json.loads(document)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 8])
+def test_whitespace_only_chunks(monkeypatch, chunk_size):
+    monkeypatch.setattr(ingest, "_CHUNK_SIZE", chunk_size)
+    document = " \n\t" * 20 + "[ 1 ,\n" + " " * 40 + "2.5e1" + " " * 40 + "]\n"
+    assert parse(document) == [1, 25.0]
+
+
+def test_number_at_end_of_each_chunk(monkeypatch):
+    # Every item ends exactly where a chunk ends.
+    monkeypatch.setattr(ingest, "_CHUNK_SIZE", 4)
+    assert parse("[1.5,2.5,3.5]") == [1.5, 2.5, 3.5]
+
+
+@pytest.mark.parametrize("document", ["", "   ", '{"a": 1}', "[1, 2"])
+def test_invalid_documents(monkeypatch, document):
+    monkeypatch.setattr(ingest, "_CHUNK_SIZE", 2)
+    with pytest.raises(ValueError):
+        parse(document)
+
+
+def test_template_file_with_tiny_chunks(monkeypatch, tmp_path):
+    monkeypatch.setattr(ingest, "_CHUNK_SIZE", 3)
+    templates = [
+        {"id": str(i), "name": f"Template {i}", "width": 500.0 + i / 4}
+        for i in range(20)
+    ]
+    path = tmp_path / "templates.json"
+    path.write_text("   " + json.dumps(templates))
+    records = list(ingest.iter_template_file(str(path)))
+    assert [r.id for r in records] == [t["id"] for t in templates]
+    assert [r.width for r in records] == [int(t["width"]) for t in templates]
@@ -0,0 +1,80 @@
+"""Tests for ranked, paginated template search."""
+
+import asyncio
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), "src"))
+
+from imgflip_meme_mcp import fuzzy  # noqa: E402
+from imgflip_meme_mcp.alias_registry import AliasRegistry  # noqa: E402
+from imgflip_meme_mcp.catalog import TemplateCatalog  # noqa: E402
+from imgflip_meme_mcp.imgflip_client import ImgflipClient  # noqa: E402
+from imgflip_meme_mcp.offload import ScoringPool  # noqa: E402
+from imgflip_meme_mcp.snapshot import CatalogSnapshot  # noqa: E402
+from imgflip_meme_mcp.template_matcher import TemplateMatcher  # noqa: E402
+
+WORDS = [
+    "drake", "hotline", "bling", "distracted", "boyfriend", "woman", "yelling",
+    "cat", "surprised", "pikachu", "expanding", "brain", "uno", "reverse",
+    "success", "kid", "bad", "luck", "brian", "monkey", "puppet", "doge",
+]
+
+
+def catalog(count: int):
+    rng = random.Random(0)
+    templates = []
+    for i in range(count):
+        name = " ".join(rng.choice(WORDS).title() for _ in range(rng.randint(2, 4)))
+        templates.append({"id": str(100000 + i), "name": f"{name} {i}"})
+    return templates
+
+
+async def search_pages(templates, query, limit, total):
+    """Ids from cursor paging ``limit`` at a time, and from one ``total`` search."""
+
+    async def fetch(current):
+        return CatalogSnapshot(templates)
+
+    client = ImgflipClient(catalog=TemplateCatalog(fetch))
+    matcher = TemplateMatcher(
+        client, alias_registry=AliasRegistry([]), scoring_pool=ScoringPool(mode="off")
+    )
+    try:
+        paged, cursor = [], None
+        while len(paged) < total:
+            page = await matcher.search(query, limit, cursor=cursor)
+            paged.extend(template["id"] for template in page.templates)
+            cursor = page.next_cursor
+            if cursor is None:
+                break
+        whole = await matcher.search(query, len(paged))
+        return paged, [template["id"] for template in whole.templates]
+    finally:
+        await client.aclose()
+
+
+@pytest.mark.parametrize("vectors", [False, True])
+@pytest.mark.parametrize("query", ["pikachu surprised", "cat", "brian kid"])
+def test_cursor_pages_join_into_one_ranking(monkeypatch, vectors, query):
+    if vectors:
+        pytest.importorskip("numpy")
+        monkeypatch.setattr(fuzzy, "VECTOR_THRESHOLD", 0)
+    paged, whole = asyncio.run(search_pages(catalog(3000), query, 10, 300))
+    assert len(paged) == len(set(paged))
+    assert paged == whole
+
+
+def test_exact_name_outranks_longer_names_containing_it():
+    templates = [
+        {"id": "1", "name": "Grumpy Cat"},
+        {"id": "2", "name": "Woman Yelling At Cat"},
+        {"id": "3", "name": "Cat"},
+        {"id": "4", "name": "Cats"},
+    ]
+    paged, whole = asyncio.run(search_pages(templates, "cat", 2, 4))
+    assert whole == ["3", "4", "1", "2"]
+    assert paged == whole